@@ -1,269 +1,441 @@
-from flask import Flask, render_template, request, jsonify
-import pandas as pd
+from flask import Flask, Response, g, render_template, request, jsonify
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
-import xgboost as xgb
-import joblib
-import os
-from datetime import datetime
+import io
+import gc
 import json
+import math
+import os
+import threading
+import time
+from catalog import SEARCH_LIMIT, VALIDATE_CATALOG, Catalog
+from prediction_cache import PredictionCache
+from response_formats import FORMATS, encode, negotiate, not_acceptable, prediction_columns
+from http_api import (RequestError, conditional, encode_prediction, performance_document, prediction_document,
+                      prediction_options, read_car, training_document)
+from micro_batcher import MicroBatcher
+from training_jobs import TrainingJobManager
+from feature_encoder import CATEGORICAL_FEATURES
+# The predictor and its settings, re-exported for the routes, asgi.py and scripts that use app.<name>
+from price_predictor import (CURVE_AXES, CURVE_CHUNK_ROWS, CURVE_MAX_POINTS, LATENCY_BUCKETS, CarPricePredictor,
+                             coerce_car, metrics_registry, parse_stage, serialize_stage)
 
 app = Flask(__name__)
 
-class CarPricePredictor:
-    def __init__(self):
-        self.models = {}
-        self.encoders = {}
-        self.scaler = StandardScaler()
-        self.feature_names = []
-        self.is_trained = False
-        
-    def load_sample_data(self):
-        """Load sample car data for training"""
-        data = {
-            'make': ['Toyota', 'Toyota', 'Toyota', 'Toyota', 'Toyota', 'BMW', 'BMW', 'BMW', 'BMW', 'Tesla', 'Tesla', 
-                    'Honda', 'Honda', 'Honda', 'Mercedes', 'Mercedes', 'Mercedes', 'Audi', 'Audi', 'Audi',
-                    'Volkswagen', 'Volkswagen', 'Nissan', 'Ford', 'Ford', 'Hyundai', 'Hyundai', 'Hyundai', 'Hyundai', 'Hyundai'],
-            'model': ['Glanza', 'Hyryder', 'Innova Crysta', 'Fortuner', 'Camry', '3 Series', 'X1', 'X3', '5 Series', 'Model 3', 'Model Y',
-                     'Amaze', 'City', 'Elevate', 'C-Class', 'GLC', 'E-Class', 'A4', 'Q3', 'Q5',
-                     'Virtus', 'Taigun', 'Magnite', 'EcoSport', 'Figo', 'i20', 'Creta', 'Verna', 'Venue', 'Alcazar'],
-            'year': [2022, 2023, 2021, 2020, 2022, 2021, 2020, 2022, 2021, 2023, 2022,
-                    2021, 2022, 2023, 2021, 2022, 2020, 2021, 2022, 2020,
-                    2022, 2021, 2022, 2020, 2019, 2021, 2022, 2021, 2020, 2022],
-            'mileage': [15000, 8000, 25000, 35000, 12000, 18000, 28000, 15000, 22000, 5000, 12000,
-                       22000, 18000, 8000, 20000, 15000, 25000, 22000, 18000, 28000,
-                       15000, 20000, 18000, 35000, 40000, 20000, 15000, 18000, 25000, 12000],
-            'condition': ['Very Good', 'Excellent', 'Very Good', 'Good', 'Excellent', 'Very Good', 'Good', 'Excellent', 'Very Good', 'Excellent', 'Very Good',
-                         'Good', 'Very Good', 'Excellent', 'Very Good', 'Excellent', 'Good', 'Very Good', 'Excellent', 'Good',
-                         'Very Good', 'Good', 'Very Good', 'Good', 'Fair', 'Good', 'Very Good', 'Good', 'Good', 'Excellent'],
-            'fuel_type': ['Petrol', 'Hybrid', 'Diesel', 'Diesel', 'Hybrid', 'Petrol', 'Diesel', 'Petrol', 'Petrol', 'Electric', 'Electric',
-                         'Petrol', 'Petrol', 'Petrol', 'Petrol', 'Petrol', 'Diesel', 'Petrol', 'Petrol', 'Diesel',
-                         'Petrol', 'Petrol', 'Petrol', 'Petrol', 'Petrol', 'Petrol', 'Petrol', 'Petrol', 'Petrol', 'Petrol'],
-            'transmission': ['Manual', 'Automatic', 'Manual', 'Automatic', 'Automatic', 'Automatic', 'Automatic', 'Automatic', 'Automatic', 'Automatic', 'Automatic',
-                           'Manual', 'Automatic', 'Manual', 'Automatic', 'Automatic', 'Automatic', 'Automatic', 'Automatic', 'Automatic',
-                           'Automatic', 'Manual', 'Manual', 'Automatic', 'Manual', 'Manual', 'Automatic', 'Automatic', 'Manual', 'Automatic'],
-            'body_type': ['Hatchback', 'SUV', 'SUV', 'SUV', 'Sedan', 'Sedan', 'SUV', 'SUV', 'Sedan', 'Sedan', 'SUV',
-                         'Sedan', 'Sedan', 'SUV', 'Sedan', 'SUV', 'Sedan', 'Sedan', 'SUV', 'SUV',
-                         'Sedan', 'SUV', 'SUV', 'SUV', 'Hatchback', 'Hatchback', 'SUV', 'Sedan', 'SUV', 'SUV'],
-            'engine_size': [1.2, 1.5, 2.4, 2.8, 2.5, 2.0, 2.0, 2.0, 2.0, 0, 0,
-                           1.2, 1.5, 1.5, 2.0, 2.0, 2.0, 2.0, 2.0, 2.0,
-                           1.0, 1.0, 1.0, 1.5, 1.2, 1.2, 1.5, 1.5, 1.0, 1.5],
-            'previous_owners': [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1,
-                               1, 1, 1, 1, 1, 1, 1, 1, 1,
-                               1, 1, 1, 2, 2, 1, 1, 1, 2, 1],
-            'price': [850000, 1550000, 2200000, 4400000, 4900000, 6000000, 5250000, 7300000, 7750000, 6500000, 8250000,
-                     825000, 1450000, 1450000, 6750000, 7500000, 9000000, 4750000, 5250000, 6850000,
-                     1500000, 1550000, 875000, 1000000, 725000, 900000, 1575000, 1450000, 1080000, 1835000]
-        }
-        
-        return pd.DataFrame(data)
+# Seconds clients and proxies may reuse catalog responses without revalidating
+CATALOG_MAX_AGE = int(os.environ.get('CATALOG_MAX_AGE', 300))
+
+# HTTP metrics, exposed at /metrics with the predictor's stage timings
+request_seconds = metrics_registry.histogram(
+    'autoprice_http_request_seconds', 'HTTP request latency by route', LATENCY_BUCKETS, ('method', 'route'))
+requests_total = metrics_registry.counter(
+    'autoprice_http_requests_total', 'HTTP requests by route and status', ('method', 'route', 'status'))
+request_errors_total = metrics_registry.counter(
+    'autoprice_http_request_errors_total', 'HTTP requests answered with a 5xx status', ('method', 'route'))
+
+# Initialize predictor, and the catalog, prediction cache and micro-batcher shared by every model version
+catalog = Catalog.from_env()
+prediction_cache = PredictionCache.from_env()
+micro_batcher = MicroBatcher.from_env()
+predictor = CarPricePredictor()
+predictor.catalog = catalog if VALIDATE_CATALOG else None
+predictor.cache = prediction_cache
+predictor.batcher = micro_batcher
+
+def install_predictor(new_predictor):
+    """Atomically replace the active predictor
     
-    def prepare_features(self, df):
-        """Prepare features for training"""
-        # Create a copy to avoid modifying original data
-        df_processed = df.copy()
-        
-        # Calculate age
-        current_year = datetime.now().year
-        df_processed['age'] = current_year - df_processed['year']
-        
-        # Encode categorical variables
-        categorical_features = ['make', 'model', 'condition', 'fuel_type', 'transmission', 'body_type']
-        
-        for feature in categorical_features:
-            if feature not in self.encoders:
-                self.encoders[feature] = LabelEncoder()
-                df_processed[feature + '_encoded'] = self.encoders[feature].fit_transform(df_processed[feature])
-            else:
-                # Handle unseen categories
-                try:
-                    df_processed[feature + '_encoded'] = self.encoders[feature].transform(df_processed[feature])
-                except ValueError:
-                    # If unseen category, assign most common category
-                    most_common = self.encoders[feature].classes_[0]
-                    df_processed[feature] = df_processed[feature].fillna(most_common)
-                    df_processed[feature + '_encoded'] = self.encoders[feature].transform(df_processed[feature])
-        
-        # Select features for training
-        feature_columns = ['age', 'mileage', 'engine_size', 'previous_owners'] + \
-                         [f + '_encoded' for f in categorical_features]
-        
-        self.feature_names = feature_columns
-        return df_processed[feature_columns]
+    Requests read the module-level predictor once, so in-flight predictions
+    finish on the models they started with.
+    """
+    global predictor
+    new_predictor.catalog = catalog if VALIDATE_CATALOG else None
+    new_predictor.cache = prediction_cache
+    new_predictor.batcher = micro_batcher
+    predictor = new_predictor
+
+def preload_models(load_all=True):
+    """Load and warm up the current model version in the module-level predictor
     
-    def train_models(self):
-        """Train all ML models"""
-        # Load and prepare data
-        df = self.load_sample_data()
-        X = self.prepare_features(df)
-        y = df['price']
-        
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        
-        # Scale features
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
-        
-        # Train Random Forest
-        rf_model = RandomForestRegressor(n_estimators=100, random_state=42, max_depth=10)
-        rf_model.fit(X_train, y_train)
-        self.models['random_forest'] = rf_model
-        
-        # Train Gradient Boosting
-        gb_model = GradientBoostingRegressor(n_estimators=100, learning_rate=0.1, random_state=42)
-        gb_model.fit(X_train, y_train)
-        self.models['gradient_boosting'] = gb_model
-        
-        # Train XGBoost
-        xgb_model = xgb.XGBRegressor(n_estimators=100, learning_rate=0.1, random_state=42)
-        xgb_model.fit(X_train, y_train)
-        self.models['xgboost'] = xgb_model
-        
-        self.is_trained = True
-        
-        # Calculate and store performance metrics
-        self.performance_metrics = {}
-        for name, model in self.models.items():
-            y_pred = model.predict(X_test)
-            self.performance_metrics[name] = {
-                'rmse': np.sqrt(mean_squared_error(y_test, y_pred)),
-                'r2': r2_score(y_test, y_pred),
-                'mae': mean_absolute_error(y_test, y_pred),
-                'cv_score': cross_val_score(model, X_train, y_train, cv=5).mean()
-            }
-        
-        # Save models
-        self.save_models()
-        
-        return self.performance_metrics
+    Run once in the gunicorn master (see gunicorn.conf.py) so forked workers
+    start with every model already in memory, shared copy-on-write.
+    load_all=False leaves the library models on disk until a batch needs them.
+    gc.freeze() moves everything loaded so far out of the collector's reach,
+    so collections in the workers do not touch (and so copy) those pages.
+    """
+    loaded = predictor.load_models()
+    if loaded:
+        predictor.warm_up(load_all)
+    gc.freeze()
+    return loaded
+
+# CURRENT's pointer_stamp() when the active predictor was last checked against it
+_pointer_stamp = None
+_reload_lock = threading.Lock()
+
+def get_ready_predictor():
+    """Return the active predictor, loading saved models if needed, or None
     
-    def predict_price(self, car_data):
-        """Predict car price using all models"""
-        if not self.is_trained:
-            self.train_models()
-        
-        # Convert single prediction to DataFrame
-        df = pd.DataFrame([car_data])
-        X = self.prepare_features(df)
-        
-        predictions = {}
-        for name, model in self.models.items():
-            pred = model.predict(X)[0]
-            
-            # Calculate confidence interval (simplified)
-            if name == 'random_forest':
-                # Use tree predictions for variance
-                tree_predictions = [tree.predict(X)[0] for tree in model.estimators_]
-                std = np.std(tree_predictions)
-                confidence_interval = (pred - 1.96 * std, pred + 1.96 * std)
-            else:
-                # Use RMSE for confidence interval
-                rmse = self.performance_metrics[name]['rmse']
-                confidence_interval = (pred - rmse, pred + rmse)
-            
-            predictions[name] = {
-                'predicted_price': max(0, pred),
-                'confidence_interval': {
-                    'lower': max(0, confidence_interval[0]),
-                    'upper': confidence_interval[1]
-                },
-                'confidence': self.performance_metrics[name]['r2']
-            }
-        
-        return predictions
+    CURRENT is replaced when another process finishes training or a version
+    is activated or rolled back, so its stamp (a stat call) is compared on
+    every request and a changed version is loaded and installed. One
+    request thread loads it while the others keep serving the old version.
+    """
+    global _pointer_stamp
+    current = predictor
+    stamp = current.registry.pointer_stamp()
+    if stamp == _pointer_stamp and current.is_trained:
+        return current
+    if not _reload_lock.acquire(blocking=not current.is_trained):
+        return current
+    try:
+        current = predictor
+        version = current.registry.current_version()
+        if version is not None and version != current.model_version:
+            loaded = CarPricePredictor()
+            loaded.registry = current.registry
+            if loaded.load_models(version):
+                install_predictor(loaded)
+                current = loaded
+        _pointer_stamp = stamp
+    finally:
+        _reload_lock.release()
+    return current if current.is_trained else None
+
+def training_in_progress():
+    """503 response for requests that arrive before any model is available"""
+    return jsonify(training_document(training_jobs)), 503
+
+def install_trained(state):
+    """Install the state of a finished training job, reading later versions from the registry it trained into"""
+    trained = CarPricePredictor.from_state(state)
+    trained.registry = training_jobs.registry
+    install_predictor(trained)
+
+training_jobs = TrainingJobManager(on_success=install_trained, registry=predictor.registry)
+
+def record_request(method, route, status, seconds):
+    """Count a finished HTTP request and observe its latency"""
+    request_seconds.labels(method, route).observe(seconds)
+    requests_total.labels(method, route, str(status)).inc()
+    if status >= 500:
+        request_errors_total.labels(method, route).inc()
+
+CACHE_COUNTERS = {
+    'hits': 'Predictions answered from the in-process cache',
+    'shared_hits': 'Predictions answered from the shared SQLite cache',
+    'misses': 'Predictions that had to be scored',
+    'evictions': 'Cache entries evicted to stay within the size limit',
+    'expirations': 'Cache entries dropped after their TTL',
+    'invalidations': 'Cache flushes caused by a model version change'
+}
+
+@metrics_registry.add_collector
+def collect_service_metrics():
+    """Model, cache and micro-batcher metrics read at scrape time"""
+    current = predictor
+    yield ('autoprice_model_info', 'gauge', 'Active model version (1 when loaded)',
+           [('', {'version': current.model_version or ''}, 1 if current.is_trained else 0)])
+    if current.load_seconds is not None:
+        yield ('autoprice_model_load_seconds', 'gauge', 'Seconds taken to load the active model version',
+               [('', {}, current.load_seconds)])
     
-    def save_models(self):
-        """Save trained models to disk"""
-        if not os.path.exists('models'):
-            os.makedirs('models')
-        
-        for name, model in self.models.items():
-            joblib.dump(model, f'models/{name}_model.pkl')
-        
-        joblib.dump(self.encoders, 'models/encoders.pkl')
-        joblib.dump(self.scaler, 'models/scaler.pkl')
-        
-        with open('models/feature_names.json', 'w') as f:
-            json.dump(self.feature_names, f)
+    if prediction_cache is not None:
+        stats = prediction_cache.stats()
+        for key, documentation in CACHE_COUNTERS.items():
+            yield (f'autoprice_cache_{key}_total', 'counter', documentation, [('', {}, stats[key])])
+        yield ('autoprice_cache_entries', 'gauge', 'Entries in the in-process cache', [('', {}, stats['size'])])
+        yield ('autoprice_cache_hit_ratio', 'gauge', 'Share of predictions answered from a cache',
+               [('', {}, stats['hit_rate'])])
     
-    def load_models(self):
-        """Load trained models from disk"""
-        try:
-            for name in ['random_forest', 'gradient_boosting', 'xgboost']:
-                self.models[name] = joblib.load(f'models/{name}_model.pkl')
-            
-            self.encoders = joblib.load('models/encoders.pkl')
-            self.scaler = joblib.load('models/scaler.pkl')
-            
-            with open('models/feature_names.json', 'r') as f:
-                self.feature_names = json.load(f)
-            
-            self.is_trained = True
-            return True
-        except FileNotFoundError:
-            return False
+    grid = current.valuation_grid
+    if grid is not None:
+        yield ('autoprice_valuation_grid_lookups_total', 'counter',
+               'Single-car predictions looked up in the valuation grid, by outcome',
+               [('', {'result': 'hit'}, grid.hits), ('', {'result': 'miss'}, grid.misses)])
+    
+    if micro_batcher is not None:
+        yield ('autoprice_batch_rows', 'histogram', 'Rows per micro-batch',
+               micro_batcher.batch_size.samples({}))
+        yield ('autoprice_batch_queue_wait_milliseconds', 'histogram',
+               'Milliseconds requests waited for their micro-batch', micro_batcher.queue_wait_ms.samples({}))
 
-# Initialize predictor
-predictor = CarPricePredictor()
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
 
-# Car data
-CAR_MAKES = ['Toyota', 'BMW', 'Tesla', 'Honda', 'Ford', 'Mercedes', 'Audi', 'Volkswagen', 'Nissan', 'Hyundai']
-
-CAR_MODELS = {
-    'Toyota': ['Glanza', 'Taisor', 'Hyryder', 'Rumion', 'Innova Crysta', 'Hycross', 'Fortuner', 'Hilux', 'Camry', 'Vellfire', 'Land Cruiser 300'],
-    'BMW': ['2 Series', '3 Series', '5 Series', '6 Series GT', '7 Series', 'X1', 'X3', 'X5', 'X7', 'i4', 'iX1', 'iX'],
-    'Tesla': ['Model 3', 'Model Y', 'Model S', 'Model X'],
-    'Honda': ['Amaze', 'City', 'City Hybrid', 'Elevate'],
-    'Ford': ['EcoSport', 'Figo', 'Aspire', 'Endeavour', 'Mustang'],
-    'Mercedes': ['A-Class', 'C-Class', 'E-Class', 'S-Class', 'GLA', 'GLC', 'GLE', 'GLS', 'EQB', 'EQS', 'AMG GT'],
-    'Audi': ['A4', 'A6', 'A8 L', 'Q3', 'Q5', 'Q7', 'Q8', 'e-tron'],
-    'Volkswagen': ['Virtus', 'Taigun', 'Tiguan', 'Polo'],
-    'Nissan': ['Magnite', 'GT-R'],
-    'Hyundai': ['Exter', 'Grand i10 Nios', 'i20', 'Aura', 'Venue', 'Creta', 'Creta EV', 'Verna', 'Alcazar', 'Tucson', 'Ioniq 5', 'Ioniq 6']
-}
+@app.after_request
+def record_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    start = g.get('request_start')
+    if start is not None:
+        record_request(request.method, route, response.status_code, time.perf_counter() - start)
+    return response
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Service metrics in the Prometheus text format"""
+    return Response(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 @app.route('/')
 def index():
-    return render_template('index.html', car_makes=CAR_MAKES, car_models=CAR_MODELS)
+    return render_template('index.html', car_makes=catalog.makes, car_models=catalog.models)
 
 @app.route('/about')
 def about():
     return render_template('about.html')
 
+def conditional_response(version, build, max_age=None):
+    """JSON response from build(), with an ETag and Cache-Control (see http_api.conditional)
+    
+    A request whose If-None-Match already holds the ETag gets a 304
+    without build() running.
+    """
+    headers, not_modified = conditional(version, request.full_path, request.headers.get('If-None-Match'), max_age)
+    response = Response(status=304) if not_modified else jsonify(build())
+    response.headers.update(headers)
+    return response
+
+def catalog_response(build):
+    """conditional_response for data that comes from the catalog"""
+    return conditional_response(catalog.version, build, CATALOG_MAX_AGE)
+
 @app.route('/api/models/<make>')
 def get_models(make):
     """Get models for a specific make"""
-    models = CAR_MODELS.get(make, [])
-    return jsonify(models)
+    return catalog_response(lambda: catalog.models.get(make, []))
+
+@app.route('/api/catalog')
+def get_catalog():
+    """Every make with its models"""
+    return catalog_response(lambda: {
+        'success': True,
+        'version': catalog.version,
+        'variants': len(catalog),
+        'makes': catalog.models
+    })
+
+@app.route('/api/catalog/search')
+def search_catalog():
+    """Autocomplete variants by name (?q=fortuner&limit=10)"""
+    try:
+        limit = int(request.args.get('limit', SEARCH_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    query = request.args.get('q', '')
+    
+    def build():
+        results, match = catalog.search(query, limit)
+        return {'success': True, 'query': query, 'match': match, 'results': results}
+    
+    return catalog_response(build)
+
+def negotiated_format():
+    """Response format for a prediction request (see response_formats.negotiate)"""
+    return negotiate(request.headers.get('Accept'), request.args.get('format'))
+
+def format_response(fmt, document, rows_key=None, columns=None):
+    """Response for a prediction document in a negotiated format other than JSON"""
+    with serialize_stage.time():
+        body = encode(fmt, document, rows_key, columns)
+    return Response(body, content_type=FORMATS[fmt])
 
 @app.route('/api/predict', methods=['POST'])
 def predict():
     """Predict car price"""
     try:
-        data = request.json
+        fmt = negotiated_format()
+        if fmt is None:
+            return jsonify(not_acceptable()), 406
+        
+        try:
+            with parse_stage.time():
+                car = read_car(request.get_json(silent=True))
+            
+            # Load models if not already loaded
+            current = get_ready_predictor()
+            if current is None:
+                return training_in_progress()
+            models, ensemble = prediction_options(current, request.args, car, car)
+        except RequestError as e:
+            return jsonify({'error': str(e)}), e.status
+        
+        # Make predictions
+        predictions = current.predict_price(car, models, ensemble)
+        
+        with serialize_stage.time():
+            if fmt != 'json':
+                return Response(encode_prediction(fmt, predictions), content_type=FORMATS[fmt])
+            return jsonify(prediction_document(predictions))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def read_batch_request():
+    """Parse a batch body (JSON array, CSV or NDJSON) into a DataFrame"""
+    import pandas as pd
+    
+    mimetype = request.mimetype
+    
+    if mimetype == 'text/csv':
+        return pd.read_csv(io.BytesIO(request.get_data()),
+                           dtype={feature: str for feature in CATEGORICAL_FEATURES})
+    
+    if mimetype in ('application/x-ndjson', 'application/jsonl'):
+        return pd.read_json(io.BytesIO(request.get_data()), lines=True, dtype=False)
+    
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('cars')
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array of cars, CSV or NDJSON body')
+    if not all(isinstance(row, dict) for row in data):
+        raise ValueError('Each car must be a JSON object')
+    return pd.DataFrame(data)
+
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_batch():
+    """Predict prices for many cars in one request"""
+    try:
+        fmt = negotiated_format()
+        if fmt is None:
+            return jsonify(not_acceptable()), 406
         
-        # Validate required fields
-        required_fields = ['make', 'model', 'year', 'mileage', 'condition', 'fuel_type', 'transmission', 'body_type', 'engine_size', 'previous_owners']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
+        try:
+            with parse_stage.time():
+                df = read_batch_request()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Load models if not already loaded
-        if not predictor.is_trained:
-            if not predictor.load_models():
-                predictor.train_models()
+        current = get_ready_predictor()
+        if current is None:
+            return training_in_progress()
         
-        # Make predictions
-        predictions = predictor.predict_price(data)
+        try:
+            models, ensemble = prediction_options(current, request.args, request.get_json(silent=True))
+        except RequestError as e:
+            return jsonify({'error': str(e)}), e.status
         
-        return jsonify({
+        if fmt == 'arrow':
+            # Straight from the score arrays to columns, without per-row dicts
+            errors, columns = current.predict_columns(df, models, ensemble)
+            document = {
+                'success': True,
+                'count': len(errors),
+                'failed': sum(1 for error in errors if error is not None)
+            }
+            return format_response(fmt, document, columns=dict(columns, error=errors))
+        
+        results = current.predict_prices(df, models, ensemble)
+        document = {
             'success': True,
-            'predictions': predictions
-        })
+            'count': len(results),
+            'failed': sum(1 for result in results if not result['success']),
+            'results': results
+        }
+        
+        if fmt != 'json':
+            return format_response(fmt, document, 'results')
+        with serialize_stage.time():
+            return jsonify(document)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def curve_axis_values(name, spec):
+    """Values of one sweep axis: a list, or for numeric axes a {start, stop, step} range including stop"""
+    if isinstance(spec, dict) and name != 'condition':
+        try:
+            start, stop, step = (float(spec[key]) for key in ('start', 'stop', 'step'))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f'{name} range needs numeric start, stop and step')
+        if step <= 0 or stop < start:
+            raise ValueError(f'{name} range needs step > 0 and stop >= start')
+        count = int((stop - start) / step + 1e-9) + 1
+        if count > CURVE_MAX_POINTS:
+            raise ValueError(f'{name} range has more than {CURVE_MAX_POINTS} values')
+        values = (start + step * np.arange(count)).tolist()
+        return [int(value) if value.is_integer() else value for value in values]
+    
+    if isinstance(spec, list) and spec:
+        return spec
+    raise ValueError(f'{name} must be a non-empty list of values'
+                     + ('' if name == 'condition' else ' or a {start, stop, step} range'))
+
+def read_curve_request():
+    """Parse a curve body into the base car and {axis: values}"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('car'), dict) \
+            or not isinstance(data.get('sweep'), dict) or not data['sweep']:
+        raise ValueError('Expected {"car": {...}, "sweep": {axis: values, ...}}')
+    
+    axes = {}
+    for name, spec in data['sweep'].items():
+        if name not in CURVE_AXES:
+            raise ValueError(f"Cannot sweep {name}; choose from {', '.join(CURVE_AXES)}")
+        axes[name] = curve_axis_values(name, spec)
+    if math.prod(len(values) for values in axes.values()) > CURVE_MAX_POINTS:
+        raise ValueError(f'Sweep has more than {CURVE_MAX_POINTS} points')
+    
+    car, error = coerce_car(data['car'], swept=axes)
+    if error is not None:
+        raise ValueError(error)
+    return car, axes
+
+def stream_json(document, key, chunks):
+    """Yield document as JSON text, with document[key] written from a generator of item lists"""
+    head = json.dumps(document)
+    yield f'{head[:-1]}, "{key}": ['
+    separator = ''
+    for items in chunks:
+        if items:
+            yield separator + ', '.join(json.dumps(item) for item in items)
+            separator = ', '
+    yield ']}'
+
+@app.route('/api/predict/curve', methods=['POST'])
+def predict_curve():
+    """Price one car over a sweep of years, mileages, conditions or owner counts"""
+    try:
+        fmt = negotiated_format()
+        if fmt is None:
+            return jsonify(not_acceptable()), 406
+        
+        try:
+            with parse_stage.time():
+                car, axes = read_curve_request()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Load models if not already loaded
+        current = get_ready_predictor()
+        if current is None:
+            return training_in_progress()
+        
+        try:
+            models, ensemble = prediction_options(current, request.args, request.get_json(silent=True), car)
+        except RequestError as e:
+            return jsonify({'error': str(e)}), e.status
+        
+        try:
+            count, chunks = current.predict_curve(car, axes, models=models, ensemble=ensemble)
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'Invalid car or sweep value: {e}'}), 400
+        
+        document = {'success': True, 'axes': axes, 'count': count}
+        if fmt in ('ndjson', 'msgpack'):
+            return format_response(fmt, dict(document, points=chunks), 'points')
+        if fmt == 'arrow':
+            points = [point for chunk in chunks for point in chunk]
+            columns = {name: [point[name] for point in points] for name in axes}
+            columns.update(prediction_columns([point['predictions'] for point in points]))
+            return format_response(fmt, document, columns=columns)
+        if count > CURVE_CHUNK_ROWS:
+            return Response(stream_json(document, 'points', chunks), mimetype='application/json')
+        
+        points = [point for chunk in chunks for point in chunk]
+        with serialize_stage.time():
+            return jsonify(dict(document, points=points))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -272,34 +444,61 @@ def predict():
 def get_performance():
     """Get model performance metrics"""
     try:
-        if not predictor.is_trained:
-            if not predictor.load_models():
-                metrics = predictor.train_models()
-            else:
-                metrics = predictor.performance_metrics
-        else:
-            metrics = predictor.performance_metrics
+        current = get_ready_predictor()
+        if current is None:
+            return training_in_progress()
         
-        return jsonify({
-            'success': True,
-            'performance': metrics
-        })
+        # Metrics only change with the model version; clients revalidate with If-None-Match
+        return conditional_response(current.model_version, lambda: performance_document(current))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/train')
+@app.route('/api/cache')
+def cache_stats():
+    """Get prediction cache counters"""
+    if prediction_cache is None:
+        return jsonify({'success': True, 'enabled': False})
+    return jsonify({
+        'success': True,
+        'enabled': True,
+        'cache': prediction_cache.stats()
+    })
+
+@app.route('/api/batcher')
+def batcher_stats():
+    """Get micro-batcher counters and batch-size / queue-wait histograms"""
+    if micro_batcher is None:
+        return jsonify({'success': True, 'enabled': False})
+    return jsonify({
+        'success': True,
+        'enabled': True,
+        'batcher': micro_batcher.stats()
+    })
+
+@app.route('/api/train', methods=['POST'])
 def train_models():
-    """Train models endpoint"""
+    """Start a background training job"""
     try:
-        metrics = predictor.train_models()
+        job_id = training_jobs.submit()
         return jsonify({
             'success': True,
-            'message': 'Models trained successfully',
-            'performance': metrics
-        })
+            'message': 'Training started',
+            'job_id': job_id
+        }), 202
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/train/<job_id>')
+def training_status(job_id):
+    """Get the status of a training job"""
+    job = training_jobs.status(job_id)
+    if job is None:
+        return jsonify({'error': f'Unknown training job: {job_id}'}), 404
+    return jsonify({
+        'success': True,
+        'job': job
+    })
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
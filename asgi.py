@@ -0,0 +1,399 @@
+"""
+ASGI serving mode for AutoPrice AI
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4
+
+Serves the same application as app.py. The API routes (/api/predict,
+/api/models/<make>, /api/performance, /api/train and /api/train/<job_id>)
+are handled natively: requests are parsed and answered on the event loop,
+and only model work (loading, encoding and scoring) runs in a bounded
+thread pool. Every other route (pages, static files, /api/predict/batch,
+/api/cache, ...) is handed to the Flask app in that same pool.
+
+The pool accepts at most ASGI_MAX_PENDING queued or running calls; beyond
+that requests are rejected at once with 503 and Retry-After instead of
+queueing without bound. A call that does not finish within
+ASGI_REQUEST_TIMEOUT seconds is answered with 504. A slow call holds a
+pool thread, not the event loop, so other requests keep being served.
+"""
+
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+from werkzeug.exceptions import HTTPException
+
+import app as service
+from http_api import (RequestError, conditional, encode_prediction, performance_document, prediction_document,
+                      prediction_options, read_car, training_document)
+from response_formats import FORMATS, negotiate, not_acceptable
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+
+class Overloaded(Exception):
+    """The inference pool already has max_pending calls queued or running"""
+
+
+class InferenceExecutor:
+    """Bounded thread pool for blocking model work, used from one event loop
+
+    A slot is held from submission until the pool thread actually finishes,
+    so a timed-out call that is still running keeps counting against
+    max_pending.
+    """
+
+    def __init__(self, max_workers, max_pending, timeout):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='inference')
+
+    @classmethod
+    def from_env(cls):
+        # Like ThreadPoolExecutor's default: a few more threads than cores, so
+        # one slow call does not hold up every fast one behind it
+        max_workers = int(os.environ.get('ASGI_INFERENCE_THREADS', min(32, (os.cpu_count() or 1) + 4)))
+        return cls(
+            max_workers=max_workers,
+            max_pending=int(os.environ.get('ASGI_MAX_PENDING', max_workers * 8)),
+            timeout=float(os.environ.get('ASGI_REQUEST_TIMEOUT', 30))
+        )
+
+    async def run(self, func, *args):
+        """Run func(*args) in the pool; raises Overloaded or asyncio.TimeoutError"""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise Overloaded()
+
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        future = self._executor.submit(func, *args)
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    def _release(self):
+        self.pending -= 1
+        self.completed += 1
+
+    def stats(self):
+        return {
+            'max_workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'timeout_seconds': self.timeout,
+            'pending': self.pending,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'timeouts': self.timeouts
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+executor = InferenceExecutor.from_env()
+
+
+class Response:
+    def __init__(self, body, status=200, headers=None, content_type='application/json'):
+        self.body = body
+        self.status = status
+        self.headers = [(b'content-type', content_type.encode('latin-1'))]
+        self.headers.extend(headers or [])
+
+
+def json_response(data, status=200, headers=None):
+    return Response(json.dumps(data).encode('utf-8'), status, headers)
+
+
+def error_response(message, status, headers=None):
+    return json_response({'error': message}, status, headers)
+
+
+def conditional_response(request, version, build, max_age=None):
+    """JSON response from build() with an ETag, or 304 (see http_api.conditional)"""
+    path = request.scope['path'] + '?' + request.scope['query_string'].decode('latin-1')
+    headers, not_modified = conditional(version, path, request.header('if-none-match'), max_age)
+    headers = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers.items()]
+    if not_modified:
+        return Response(b'', 304, headers)
+    return json_response(build(), headers=headers)
+
+
+def _training_in_progress():
+    """503 response for requests that arrive before any model is available"""
+    return json_response(training_document(service.training_jobs), 503)
+
+
+async def predict(request):
+    """Predict car price"""
+    fmt = negotiate(request.header('accept'), request.args.get('format'))
+    if fmt is None:
+        return json_response(not_acceptable(), 406)
+
+    try:
+        with service.parse_stage.time():
+            car = read_car(request.json())
+
+        current = await executor.run(service.get_ready_predictor)
+        if current is None:
+            return _training_in_progress()
+        models, ensemble = prediction_options(current, request.args, car, car)
+    except RequestError as e:
+        return error_response(str(e), e.status)
+
+    predictions = await executor.run(current.predict_price, car, models, ensemble)
+    with service.serialize_stage.time():
+        if fmt != 'json':
+            return Response(encode_prediction(fmt, predictions), content_type=FORMATS[fmt])
+        return json_response(prediction_document(predictions))
+
+
+async def get_models(request, make):
+    """Get models for a specific make"""
+    return conditional_response(request, service.catalog.version,
+                                lambda: service.catalog.models.get(make, []), service.CATALOG_MAX_AGE)
+
+
+async def get_performance(request):
+    """Get model performance metrics"""
+    current = await executor.run(service.get_ready_predictor)
+    if current is None:
+        return _training_in_progress()
+    return conditional_response(request, current.model_version, lambda: performance_document(current))
+
+
+async def train_models(request):
+    """Start a background training job"""
+    job_id = service.training_jobs.submit()
+    return json_response({
+        'success': True,
+        'message': 'Training started',
+        'job_id': job_id
+    }, 202)
+
+
+async def training_status(request, job_id):
+    """Get the status of a training job"""
+    job = service.training_jobs.status(job_id)
+    if job is None:
+        return error_response(f'Unknown training job: {job_id}', 404)
+    return json_response({
+        'success': True,
+        'job': job
+    })
+
+
+async def executor_stats(request):
+    """Get inference pool counters"""
+    return json_response({
+        'success': True,
+        'executor': executor.stats()
+    })
+
+
+# (method, path segments) -> handler; segments starting with '<' capture one path segment
+ROUTES = [
+    ('POST', ('api', 'predict'), predict),
+    ('GET', ('api', 'models', '<make>'), get_models),
+    ('GET', ('api', 'performance'), get_performance),
+    ('POST', ('api', 'train'), train_models),
+    ('GET', ('api', 'train', '<job_id>'), training_status),
+    ('GET', ('api', 'executor'), executor_stats),
+]
+
+
+def match_route(method, path):
+    """Return (handler, path params, rule) for a native route, or (None, None, None)
+
+    rule is the route in Flask's notation (/api/models/<make>), used as the
+    route label in request metrics.
+    """
+    segments = tuple(segment for segment in path.split('/') if segment)
+    for route_method, pattern, handler in ROUTES:
+        if route_method != method or len(pattern) != len(segments):
+            continue
+        params = []
+        for expected, actual in zip(pattern, segments):
+            if expected.startswith('<'):
+                params.append(actual)
+            elif expected != actual:
+                break
+        else:
+            return handler, params, '/' + '/'.join(pattern)
+    return None, None, None
+
+
+class Request:
+    def __init__(self, scope, body):
+        self.scope = scope
+        self.body = body
+
+    def json(self):
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            return None
+
+    def header(self, name, default=None):
+        """Value of a request header (name in lowercase)"""
+        for key, value in self.scope['headers']:
+            if key.decode('latin-1').lower() == name:
+                return value.decode('latin-1')
+        return default
+
+    @property
+    def args(self):
+        """Query parameters, first value of each"""
+        return dict(reversed(parse_qsl(self.scope['query_string'].decode('latin-1'))))
+
+
+def call_wsgi(scope, body):
+    """Run one request through the Flask app and return a buffered Response"""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                              for name, value in headers]
+
+    result = service.app.wsgi_app(environ, start_response)
+    try:
+        response_body = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+
+    response = Response(response_body, started['status'])
+    response.headers = started['headers']
+    return response
+
+
+def flask_route(method, path):
+    """The route rule Flask's request hooks would label a request with, or 'unmatched'"""
+    try:
+        rule, _ = service.app.url_map.bind('').match(path, method, return_rule=True)
+    except HTTPException:
+        return 'unmatched'
+    return rule.rule
+
+
+async def read_body(receive):
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise ValueError('Request body too large')
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def send_response(send, response):
+    headers = list(response.headers)
+    headers.append((b'content-length', str(len(response.body)).encode('latin-1')))
+    await send({'type': 'http.response.start', 'status': response.status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': response.body})
+
+
+async def handle_http(scope, receive, send):
+    try:
+        body = await read_body(receive)
+    except ValueError as e:
+        await send_response(send, error_response(str(e), 413))
+        return
+    if body is None:
+        return
+
+    start = time.perf_counter()
+    answered_by_flask = False
+    try:
+        handler, params, rule = match_route(scope['method'], scope['path'])
+        if handler is not None:
+            response = await handler(Request(scope, body), *params)
+        else:
+            response = await executor.run(call_wsgi, scope, body)
+            answered_by_flask = True
+    except Overloaded:
+        response = error_response('Server busy, please retry shortly', 503, [(b'retry-after', b'1')])
+    except asyncio.TimeoutError:
+        response = error_response('Request timed out', 504)
+    except Exception as e:
+        response = error_response(str(e), 500)
+
+    # Flask's request hooks count the responses it produced; a 503 or 504 answered
+    # here instead (the call was rejected or is still running) is counted under its route
+    if not answered_by_flask:
+        if handler is None:
+            rule = flask_route(scope['method'], scope['path'])
+        service.record_request(scope['method'], rule, response.status, time.perf_counter() - start)
+    await send_response(send, response)
+
+
+async def handle_lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Load the current model version before taking traffic. Every uvicorn worker
+            # loads its own copy, so leave the library models on disk until a batch needs them
+            await asyncio.get_running_loop().run_in_executor(None, service.preload_models, False)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            executor.shutdown()
+            service.training_jobs.shutdown()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'http':
+        await handle_http(scope, receive, send)
+    elif scope['type'] == 'lifespan':
+        await handle_lifespan(receive, send)
@@ -0,0 +1,126 @@
+"""
+Catalog autocomplete and validation benchmark
+
+Writes a synthetic catalog of --variants variants (made-up makes, models
+and trims) and reports, for Catalog:
+
+  load          reading the CSV
+  index builds  the prefix and trigram indexes, built on first search
+  prefix / fuzzy search latency (median of --queries queries, from
+                prefixes and misspellings of real names)
+  validation    check_columns on --rows rows, against a check() per row
+
+    python -m benchmarks.catalog --variants 100000
+"""
+
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from catalog import CATALOG_FIELDS, Catalog
+
+SYLLABLES = ['ka', 'ro', 'tu', 'mi', 'zen', 'vor', 'lex', 'an', 'qu', 'is', 'ter', 'ga', 'do', 'sy', 'ne']
+BODY_TYPES = ['Sedan', 'SUV', 'Hatchback', 'Coupe', 'Convertible', 'Wagon']
+
+
+def word(rng, syllables):
+    return ''.join(rng.choice(SYLLABLES, syllables)).capitalize()
+
+
+def write_catalog(path, n_variants, seed=0):
+    """A catalog CSV with about 50 variants per model and 200 models per make"""
+    rng = np.random.default_rng(seed)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CATALOG_FIELDS)
+        written = 0
+        while written < n_variants:
+            make = word(rng, 3)
+            for _ in range(200):
+                model = f'{word(rng, 2)} {rng.integers(1, 900)}'
+                body_type = rng.choice(BODY_TYPES)
+                for _ in range(50):
+                    variant = f'{word(rng, 2)} {rng.choice(["MT", "AT", "CVT", "DCT"])} {rng.integers(1, 99)}'
+                    writer.writerow([make, model, variant, body_type, 'Petrol', 'Manual', 1.5, 10])
+                    written += 1
+                    if written == n_variants:
+                        return
+
+
+def median_us(func, queries):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        func(query)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1e6
+
+
+def misspell(name, rng):
+    """Drop one character of a name"""
+    i = int(rng.integers(1, len(name) - 1))
+    return name[:i] + name[i + 1:]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--variants', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--rows', type=int, default=100000, help="rows per validation batch")
+    args = parser.parse_args(argv)
+    rng = np.random.default_rng(1)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'catalog.csv')
+        write_catalog(path, args.variants)
+        start = time.perf_counter()
+        catalog = Catalog.load(path)
+        load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    catalog._prefix_index()
+    prefix_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    catalog._fuzzy_index()
+    fuzzy_seconds = time.perf_counter() - start
+
+    sample = rng.integers(0, len(catalog), args.queries)
+    prefixes = [catalog.columns['model'][i][:4] for i in sample]
+    typos = [misspell(f"{catalog.columns['model'][i]} {catalog.columns['variant'][i]}", rng) for i in sample]
+    prefix_us = median_us(lambda query: catalog.search(query), prefixes)
+    fuzzy_us = median_us(lambda query: catalog.search(query), typos)
+    found = sum(catalog.search(query)[1] == 'fuzzy' for query in typos)
+
+    # A batch with one row in ten given a body type its model is not sold in
+    rows = rng.integers(0, len(catalog), args.rows)
+    columns = {field: np.array(catalog.columns[field], dtype=object)[rows]
+               for field in ('make', 'model', 'body_type')}
+    wrong = rng.random(args.rows) < 0.1
+    columns['body_type'][wrong] = 'Convertible'
+    catalog.check_columns({field: values[:10] for field, values in columns.items()})
+    start = time.perf_counter()
+    errors = catalog.check_columns(columns)
+    vectorized_ms = (time.perf_counter() - start) * 1000
+    records = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    start = time.perf_counter()
+    expected = [catalog.check(record) for record in records]
+    loop_ms = (time.perf_counter() - start) * 1000
+    assert errors == expected
+
+    print(f"{len(catalog):,} variants, {len(catalog.makes):,} makes, {len(catalog._prefix_index()[0]):,} prefix keys")
+    print(f"load                 {load_seconds * 1000:>9.0f} ms")
+    print(f"prefix index build   {prefix_seconds * 1000:>9.0f} ms")
+    print(f"fuzzy index build    {fuzzy_seconds * 1000:>9.0f} ms")
+    print(f"prefix search        {prefix_us:>9.0f} µs median")
+    print(f"fuzzy search         {fuzzy_us:>9.0f} µs median ({found}/{len(typos)} misspellings matched)")
+    print(f"validate {args.rows:,} rows   {vectorized_ms:>9.1f} ms vectorized, {loop_ms:.1f} ms per-row check "
+          f"({sum(error is not None for error in errors):,} rejected)")
+
+
+if __name__ == '__main__':
+    main()
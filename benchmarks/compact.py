@@ -0,0 +1,136 @@
+"""
+Compact model artifact report
+
+Trains the three models with ModelTrainer's settings on synthetic data and
+compares the forms a serving worker can hold them in:
+
+  pickles            the library models, as unpickled for large batches
+  engine             FusedTreeEnsemble.from_models: int64 indices, float64 values
+  compact            .compact(): int16 features, int32 children, float32
+                     thresholds and leaves, redundant nodes pruned
+  compact-quantized  .compact(quantize_leaves=True): 16-bit leaf codes
+
+For each it prints the artifact size on disk, the node count, the largest
+prediction error against the library models on held-out rows (relative to
+the largest prediction, as FusedTreeEnsemble.verify measures it) and the
+mean absolute error in rupees. It also prints the memory of a fresh worker
+process that loads the artifact the way the registry does
+(joblib mmap_mode='r') and scores 100 rows. RSS is the whole process;
+private is its anonymous memory, which no other worker can share.
+Memory figures come from /proc and need Linux.
+
+    python -m benchmarks.compact --rows 20000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import warnings
+
+import joblib
+import numpy as np
+
+from benchmarks.startup import run_snippet
+from dataset import generate_synthetic_data, write_synthetic_dataset
+from feature_encoder import FeatureEncoder, encoder_categories
+from model_registry import ModelRegistry
+from model_trainer import ModelTrainer
+from tree_engine import FusedTreeEnsemble
+
+SNIPPET = """
+import json
+import numpy as np
+import joblib
+{imports}
+
+def memory():
+    fields = {{}}
+    with open('/proc/self/status') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            fields[key] = int(value.split()[0]) * 1024 if value.strip().endswith('kB') else None
+    return fields
+
+artifact = joblib.load({path!r}, mmap_mode='r')
+X = np.load({x_path!r})
+if isinstance(artifact, dict):
+    for model in artifact.values():
+        model.predict(X)
+else:
+    artifact.tree_values(X)
+status = memory()
+print(json.dumps({{'rss': status['VmRSS'], 'private': status['RssAnon']}}))
+"""
+
+
+def train(n_rows, workdir):
+    """Models trained by ModelTrainer on n_rows synthetic listings, and their feature encoder"""
+    data_path = os.path.join(workdir, 'train.parquet')
+    write_synthetic_dataset(data_path, n_rows)
+    trainer = ModelTrainer()
+    trainer.registry = ModelRegistry(os.path.join(workdir, 'models'))
+    trainer.feature_store = None
+    trainer.grid_configurations = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        trainer.train_all_models(data_path=data_path)
+    processor = trainer.data_processor
+    return trainer.models, FeatureEncoder(encoder_categories(processor.encoders), processor.reference_year)
+
+
+def accuracy(engine, expected, X):
+    """(max relative error, mean absolute error) over all models"""
+    worst, errors = 0.0, []
+    for name, predictions in engine.predict(X).items():
+        error = np.abs(predictions - expected[name])
+        worst = max(worst, error.max() / max(np.abs(expected[name]).max(), 1.0))
+        errors.append(error)
+    return worst, float(np.concatenate(errors).mean())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000, help="synthetic training rows")
+    parser.add_argument('--test-rows', type=int, default=5000)
+    args = parser.parse_args(argv)
+    warnings.filterwarnings('ignore')
+
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"Training on {args.rows:,} synthetic rows...")
+        models, encoder = train(args.rows, workdir)
+        X = encoder.encode_columns(generate_synthetic_data(args.test_rows, seed=11))
+        expected = {name: np.asarray(model.predict(X), dtype=np.float64) for name, model in models.items()}
+        x_path = os.path.join(workdir, 'X.npy')
+        np.save(x_path, X[:100])
+
+        engine = FusedTreeEnsemble.from_models(models)
+        variants = {
+            'pickles': models,
+            'engine': engine,
+            'compact': engine.compact(),
+            'compact-quantized': engine.compact(quantize_leaves=True)
+        }
+
+        print(f"{'artifact':<18} {'MiB':>7} {'nodes':>9} {'max rel err':>12} {'mean abs err':>13} "
+              f"{'RSS MiB':>8} {'private MiB':>12}")
+        for name, artifact in variants.items():
+            path = os.path.join(workdir, f'{name}.pkl')
+            joblib.dump(artifact, path)
+            if name == 'pickles':
+                nodes = sum(tree.tree_.node_count for tree in models['random_forest'].estimators_)
+                nodes += sum(tree.tree_.node_count for tree in models['gradient_boosting'].estimators_[:, 0])
+                nodes += int(models['xgboost'].get_booster().trees_to_dataframe().shape[0])
+                error, mean_error = 0.0, 0.0
+                imports = 'import sklearn.ensemble, xgboost'
+            else:
+                nodes = len(artifact.feature)
+                error, mean_error = accuracy(artifact, expected, X)
+                imports = 'import tree_engine'
+            memory = run_snippet(SNIPPET.format(imports=imports, path=path, x_path=x_path))
+            print(f"{name:<18} {os.path.getsize(path) / 2**20:>7.1f} {nodes:>9,} {error:>12.1e} "
+                  f"{mean_error:>13,.2f} {memory['rss'] / 2**20:>8.1f} {memory['private'] / 2**20:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Batch response encoding benchmark
+
+Predicts --rows cars once and reports, for each response format, the
+time to encode the /api/predict/batch response (best of --repeats) and
+its size, next to the inference time it is added to:
+
+  json      Flask's jsonify, as the JSON route answers, and plain json.dumps
+  ndjson    one JSON object per result
+  msgpack   the JSON document as MessagePack (needs msgpack)
+  arrow     columns from predict_columns as an Arrow IPC stream (needs pyarrow)
+
+The arrow route scores with predict_columns instead of predict_prices,
+which never builds per-row result dicts, so its inference time is
+reported separately.
+
+    python -m benchmarks.encoding --rows 10000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+import app as service
+from model_registry import ModelRegistry
+from response_formats import available_formats, encode
+
+
+def best_of(func, repeats):
+    """(best wall-clock time in milliseconds, last result) of several runs"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args(argv)
+    warnings.filterwarnings('ignore')
+
+    # Publish into a throwaway registry, not the served models/ directory
+    with tempfile.TemporaryDirectory() as tmp:
+        predictor = service.CarPricePredictor()
+        predictor.registry = ModelRegistry(os.path.join(tmp, 'models'))
+        predictor.train_models()
+    sample = predictor.load_sample_data()
+    rng = np.random.default_rng(42)
+    df = sample.iloc[rng.integers(0, len(sample), args.rows)].reset_index(drop=True)
+
+    predict_ms, results = best_of(lambda: predictor.predict_prices(df), args.repeats)
+    columns_ms, (errors, columns) = best_of(lambda: predictor.predict_columns(df), args.repeats)
+    document = {
+        'success': True,
+        'count': len(results),
+        'failed': sum(1 for result in results if not result['success']),
+        'results': results
+    }
+
+    def flask_json():
+        with service.app.app_context():
+            return service.jsonify(document).get_data()
+
+    encoders = {
+        'json (jsonify)': flask_json,
+        'json (json.dumps)': lambda: json.dumps(document).encode(),
+        'ndjson': lambda: b''.join(encode('ndjson', document, 'results')),
+    }
+    if 'msgpack' in available_formats():
+        encoders['msgpack'] = lambda: encode('msgpack', document, 'results')
+    if 'arrow' in available_formats():
+        metadata = {key: value for key, value in document.items() if key != 'results'}
+        encoders['arrow'] = lambda: encode('arrow', metadata, columns=dict(columns, error=errors))
+
+    per_10k = 10000 / args.rows
+    print(f"{args.rows:,} predictions; inference {predict_ms:.0f} ms (predict_prices), "
+          f"{columns_ms:.0f} ms (predict_columns)")
+    print(f"{'format':<20} {'ms/10k':>9} {'MB/10k':>8} {'% of inference':>15}")
+    for name, func in encoders.items():
+        encode_ms, body = best_of(func, args.repeats)
+        inference_ms = columns_ms if name == 'arrow' else predict_ms
+        print(f"{name:<20} {encode_ms * per_10k:>9.1f} {len(body) * per_10k / 1e6:>8.2f} "
+              f"{100 * encode_ms / inference_ms:>14.0f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Serving import-time budget check
+
+Imports app in a fresh interpreter, loads the current model version the way
+a serving worker does (preload_models(load_all=False)) and predicts one
+car. Fails (exit status 1) if that pulled in any training-only library or
+if importing app took longer than the budget. Each measurement is the best
+of a few runs.
+
+    python -m benchmarks.imports
+    python -m benchmarks.imports --budget 0.4
+
+tests/test_imports.py runs the same check under pytest; it only enforces
+the time budget when IMPORT_BUDGET_S is set, since timings depend on the
+machine. The default budget is about a third over the import time measured
+on a single-core container (about 0.35s, down from 1.4s when app imported
+pandas, scikit-learn and xgboost at module level), so a regression of that
+size fails; set IMPORT_BUDGET_S (or --budget) per machine.
+"""
+
+import argparse
+import os
+import sys
+
+from benchmarks.startup import SAMPLE_CAR, run_snippet
+
+IMPORT_BUDGET_S = float(os.environ.get('IMPORT_BUDGET_S') or 0.5)
+# Modules a serving worker must not import for single-car predictions
+TRAINING_ONLY_MODULES = ('pandas', 'sklearn', 'scipy', 'xgboost', 'matplotlib', 'seaborn')
+
+SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+loaded = app.preload_models(load_all=False)
+ready = time.perf_counter()
+if loaded:
+    app.predictor.predict_price({car!r})
+done = time.perf_counter()
+print(json.dumps({{
+    'import_s': imported - start,
+    'load_s': ready - imported,
+    'first_prediction_s': done - ready,
+    'loaded': loaded,
+    'modules': [name for name in {modules!r} if name in sys.modules]
+}}))
+"""
+
+
+def measure(repeats=3):
+    runs = [run_snippet(SNIPPET.format(car=SAMPLE_CAR, modules=TRAINING_ONLY_MODULES))
+            for _ in range(repeats)]
+    result = {key: min(run[key] for run in runs) for key in ('import_s', 'load_s', 'first_prediction_s')}
+    result['loaded'] = all(run['loaded'] for run in runs)
+    result['modules'] = sorted({name for run in runs for name in run['modules']})
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the serving path's import time and imports")
+    parser.add_argument('--budget', type=float, default=IMPORT_BUDGET_S, help="seconds allowed for 'import app'")
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    result = measure(args.repeats)
+    print(f"import app          {result['import_s']:.3f}s (budget {args.budget:.3f}s)")
+    if result['loaded']:
+        print(f"load model version  {result['load_s']:.3f}s")
+        print(f"first prediction    {result['first_prediction_s']:.3f}s")
+    else:
+        print("No published model version; only the import was checked")
+
+    failures = []
+    if result['import_s'] > args.budget:
+        failures.append(f"import took {result['import_s']:.3f}s, over the {args.budget:.3f}s budget")
+    if result['modules']:
+        failures.append(f"serving path imported {', '.join(result['modules'])}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Incremental retraining benchmark
+
+Trains a base version on synthetic listings, then brings it up to date with
+a delta of newer sales two ways: ModelTrainer.update_models (new trees on
+the delta only) and a full retrain on base + delta. Some delta listings are
+of a model name the base version has never seen. Prints the wall time of
+each and the RMSE / R² of every model family on a separate test set, and
+checks the update kept every existing category code.
+
+    python -m benchmarks.incremental --base-rows 20000 --delta-rows 3000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_squared_error, r2_score
+
+from dataset import generate_synthetic_data
+from feature_encoder import FeatureEncoder
+from model_registry import ModelRegistry
+from model_trainer import ModelTrainer
+
+
+def delta_listings(n_rows, seed):
+    """Synthetic new sales, a tenth of the most common model renamed to a new one"""
+    df = generate_synthetic_data(n_rows, seed=seed)
+    df['model'] = df['model'].astype(str)
+    common = df['model'].value_counts().index[0]
+    rows = np.flatnonzero(df['model'].to_numpy() == common)[::10]
+    df.loc[df.index[rows], 'model'] = f'{common} Facelift'
+    return df
+
+
+def evaluate(registry, version, test):
+    """{family: (rmse, r2)} of a published version on the test listings"""
+    state = registry.load(version)
+    encoder = FeatureEncoder(state['categories'], state['metadata']['reference_year'])
+    X = encoder.encode_columns(test)
+    scores = {}
+    for name, model in state['models'].items():
+        y_pred = model.predict(X)
+        scores[name] = (np.sqrt(mean_squared_error(test['price'], y_pred)), r2_score(test['price'], y_pred))
+    return scores
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--base-rows', type=int, default=20000)
+    parser.add_argument('--delta-rows', type=int, default=3000)
+    parser.add_argument('--test-rows', type=int, default=5000)
+    parser.add_argument('--new-trees', type=int, default=20)
+    args = parser.parse_args(argv)
+    warnings.filterwarnings('ignore')
+
+    base = generate_synthetic_data(args.base_rows, seed=1)
+    delta = delta_listings(args.delta_rows, seed=2)
+    test = generate_synthetic_data(args.test_rows, seed=3)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base_path = os.path.join(tmp, 'base.parquet')
+        delta_path = os.path.join(tmp, 'delta.parquet')
+        full_path = os.path.join(tmp, 'full.parquet')
+        base.to_parquet(base_path)
+        delta.to_parquet(delta_path)
+        pd.concat([base, delta], ignore_index=True).astype({'model': str}).to_parquet(full_path)
+
+        registry = ModelRegistry(os.path.join(tmp, 'models'))
+        trainer = ModelTrainer()
+        trainer.registry = registry
+        trainer.feature_store = None
+        base_seconds = timed(trainer.train_all_models, data_path=base_path)
+        base_version = trainer.model_version
+
+        updater = ModelTrainer()
+        updater.registry = registry
+        updater.feature_store = None
+        update_seconds = timed(updater.update_models, delta_path, base_version=base_version,
+                               new_trees=args.new_trees)
+
+        retrainer = ModelTrainer()
+        retrainer.registry = registry
+        retrainer.feature_store = None
+        retrain_seconds = timed(retrainer.train_all_models, data_path=full_path)
+
+        before = registry.load(base_version)['categories']
+        after = registry.load(updater.model_version)['categories']
+        for feature, categories in before.items():
+            assert after[feature][:len(categories)] == categories, f"{feature} codes changed"
+        added = {feature: after[feature][len(categories):] for feature, categories in before.items()
+                 if len(after[feature]) > len(categories)}
+
+        results = {
+            'base': (base_seconds, evaluate(registry, base_version, test)),
+            'incremental': (update_seconds, evaluate(registry, updater.model_version, test)),
+            'full retrain': (retrain_seconds, evaluate(registry, retrainer.model_version, test))
+        }
+
+    print(f"{args.base_rows:,} base rows, {args.delta_rows:,} delta rows, {args.new_trees} new trees per family")
+    print(f"Existing category codes unchanged; added {added}")
+    families = list(results['base'][1])
+    print(f"{'':<13} {'seconds':>8} " + ' '.join(f"{name + ' rmse':>24} {'r2':>6}" for name in families))
+    for label, (seconds, scores) in results.items():
+        print(f"{label:<13} {seconds:>8.1f} "
+              + ' '.join(f"{scores[name][0]:>24,.0f} {scores[name][1]:>6.3f}" for name in families))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Random forest prediction interval benchmark
+
+Compares the original per-tree loop (one ``tree.predict`` call per estimator)
+with ForestIntervalEngine for a range of batch sizes, on a forest trained
+on a synthetic dataset of train_rows rows.
+
+    python -m benchmarks.intervals
+"""
+
+import os
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+from price_predictor import CarPricePredictor
+from dataset import write_synthetic_dataset
+from model_registry import ModelRegistry
+from prediction_intervals import ForestIntervalEngine
+
+
+def loop_intervals(forest, X):
+    """The original per-tree interval computation"""
+    tree_predictions = np.array([tree.predict(X) for tree in forest.estimators_])
+    prediction = forest.predict(X)
+    std = tree_predictions.std(axis=0)
+    return prediction, prediction - 1.96 * std, prediction + 1.96 * std
+
+
+def best_of(func, repeats):
+    """Best wall-clock time of several runs, in milliseconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main(batch_sizes=(1, 100, 1000, 10000), repeats=5, train_rows=10000):
+    warnings.filterwarnings('ignore')
+
+    # Publish into a throwaway registry, not the served models/ directory
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, 'train.csv')
+        write_synthetic_dataset(data_path, train_rows)
+        predictor = CarPricePredictor()
+        predictor.registry = ModelRegistry(os.path.join(tmp, 'models'))
+        predictor.train_models(data_path)
+    forest = predictor.models['random_forest']
+    engine = ForestIntervalEngine(forest)
+
+    sample = predictor.load_sample_data()
+    rng = np.random.default_rng(42)
+
+    print(f"{'rows':>8} {'loop ms':>10} {'engine ms':>10} {'speedup':>8}")
+    for n_rows in batch_sizes:
+        df = sample.iloc[rng.integers(0, len(sample), n_rows)].reset_index(drop=True)
+        X = predictor.prepare_features(df)
+        X_values = X.to_numpy()
+
+        expected = loop_intervals(forest, X_values)
+        actual = engine.intervals(X)
+        for a, b in zip(expected, actual):
+            np.testing.assert_allclose(a, b, rtol=1e-9)
+
+        loop_ms = best_of(lambda: loop_intervals(forest, X_values), repeats)
+        engine_ms = best_of(lambda: engine.intervals(X), repeats)
+        print(f"{n_rows:>8} {loop_ms:>10.2f} {engine_ms:>10.2f} {loop_ms / engine_ms:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+WSGI vs ASGI load test
+
+Starts the app under gunicorn (sync workers, as deployed today) and under
+uvicorn (asgi.py) with the same number of worker processes. Each server
+gets the same load: concurrent clients sending single-car /api/predict
+requests over keep-alive connections for a fixed time. Optionally, slow
+clients send large /api/predict/batch requests at the same time, to show
+how one slow request affects everyone else. Prints throughput and p50/p99
+latency of the single-car requests.
+
+    python -m benchmarks.load_test --clients 16 --duration 10 --slow-clients 1
+
+The prediction cache is disabled in the servers so every request is scored.
+The servers use the same registry as benchmarks.startup (a temporary one
+when $MODEL_REGISTRY has no published version). uvicorn must be installed
+(pip install uvicorn).
+"""
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.startup import ROOT, registry_env
+from dataset import generate_synthetic_data
+
+SERVERS = {
+    'wsgi': lambda port, workers: [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+    'asgi': lambda port, workers: [sys.executable, '-m', 'uvicorn', 'asgi:app', '--port', str(port),
+                                   '--workers', str(workers), '--log-level', 'warning']
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def sample_cars(n_cars):
+    """Request bodies for synthetic cars"""
+    df = generate_synthetic_data(n_cars, seed=1)
+    records = json.loads(df.to_json(orient='records'))
+    return [json.dumps(record).encode('utf-8') for record in records]
+
+
+def start_server(kind, port, workers, env):
+    env = dict(env, PORT=str(port), WEB_CONCURRENCY=str(workers), PREDICTION_CACHE_SIZE='0')
+    process = subprocess.Popen(SERVERS[kind](port, workers), cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/api/models/Toyota')
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{kind} server did not start on port {port}")
+
+
+def client(port, path, bodies, stop, latencies, statuses):
+    """Send requests back to back on one keep-alive connection until stop is set"""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    headers = {'Content-Type': 'application/json'}
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            connection.request('POST', path, body=bodies[i % len(bodies)], headers=headers)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+        except OSError:
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+            status = 'error'
+        latencies.append(time.perf_counter() - start)
+        statuses[status] = statuses.get(status, 0) + 1
+        i += 1
+    connection.close()
+
+
+def run_load(port, cars, batch_body, clients, slow_clients, duration):
+    stop = threading.Event()
+    latencies, statuses = [], {}
+    threads = [threading.Thread(target=client, args=(port, '/api/predict', cars[i::clients], stop,
+                                                     latencies, statuses))
+               for i in range(clients)]
+    threads += [threading.Thread(target=client, args=(port, '/api/predict/batch', [batch_body], stop,
+                                                      [], {}))
+                for _ in range(slow_clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    ok = statuses.get(200, 0)
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000 if latencies else (0.0, 0.0)
+    return {'requests': len(latencies), 'ok': ok, 'rps': ok / duration, 'p50_ms': p50, 'p99_ms': p99,
+            'statuses': {str(status): count for status, count in statuses.items()}}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare WSGI (gunicorn) and ASGI (uvicorn) serving")
+    parser.add_argument('--servers', nargs='+', default=list(SERVERS), choices=list(SERVERS))
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--slow-clients', type=int, default=0,
+                        help="clients sending large batch requests alongside")
+    parser.add_argument('--batch-rows', type=int, default=5000, help="rows per slow batch request")
+    parser.add_argument('--duration', type=float, default=10)
+    args = parser.parse_args(argv)
+
+    cars = sample_cars(1000)
+    batch_body = b'[' + b','.join(sample_cars(args.batch_rows)) + b']'
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = registry_env(tmp)
+        for kind in args.servers:
+            port = free_port()
+            process = start_server(kind, port, args.workers, env)
+            try:
+                results[kind] = run_load(port, cars, batch_body, args.clients, args.slow_clients, args.duration)
+            finally:
+                process.terminate()
+                process.wait()
+
+    print(f"{args.workers} workers, {args.clients} clients, {args.slow_clients} slow clients, "
+          f"{args.duration:.0f}s")
+    print(f"{'server':<8} {'ok':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}  statuses")
+    for kind, result in results.items():
+        print(f"{kind:<8} {result['ok']:>8} {result['rps']:>8.1f} {result['p50_ms']:>8.1f} "
+              f"{result['p99_ms']:>8.1f}  {result['statuses']}")
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Cold start benchmark
+
+Measures, each in a fresh interpreter, how long it takes to get from nothing
+to a first prediction:
+
+  retrain   import app, train all models (the old cold start path)
+  load      import app, load the current model version from the registry
+  preload   as load, plus warm_up() and gc.freeze() as done in the gunicorn master
+
+and how long a forked worker needs to serve its first prediction after the
+master preloaded the models.
+
+The load scenarios use the registry at $MODEL_REGISTRY (models/ by
+default). If it has no published version, one is trained into a temporary
+registry that the scenarios are pointed at, so the benchmark never writes
+into the served models/ directory.
+
+    python -m benchmarks.startup
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_CAR = {
+    'make': 'Toyota', 'model': 'Fortuner', 'year': 2021, 'mileage': 25000,
+    'condition': 'Good', 'fuel_type': 'Diesel', 'transmission': 'Automatic',
+    'body_type': 'SUV', 'engine_size': 2.8, 'previous_owners': 1
+}
+
+SCENARIOS = {
+    'retrain': """
+import tempfile
+from app import CarPricePredictor
+from model_registry import ModelRegistry
+registry_dir = tempfile.TemporaryDirectory()
+predictor = CarPricePredictor()
+predictor.registry = ModelRegistry(registry_dir.name)
+predictor.train_models()
+""",
+    'load': """
+from app import predictor
+assert predictor.load_models()
+""",
+    'preload': """
+from app import predictor, preload_models
+assert preload_models()
+""",
+}
+
+TEMPLATE = """
+import json, time, warnings
+warnings.filterwarnings('ignore')
+start = time.perf_counter()
+{setup}
+ready = time.perf_counter()
+predictor.predict_price({car!r})
+done = time.perf_counter()
+print(json.dumps({{'ready_s': ready - start, 'first_prediction_s': done - start}}))
+"""
+
+FORK_TEMPLATE = """
+import json, os, time, warnings
+warnings.filterwarnings('ignore')
+from app import predictor, preload_models
+assert preload_models()
+read_end, write_end = os.pipe()
+start = time.perf_counter()
+pid = os.fork()
+if pid == 0:
+    predictor.predict_price({car!r})
+    os.write(write_end, str(time.perf_counter() - start).encode())
+    os._exit(0)
+os.waitpid(pid, 0)
+print(json.dumps({{'worker_first_prediction_s': float(os.read(read_end, 64))}}))
+"""
+
+
+def run_snippet(code, env=None):
+    """Run code in a fresh interpreter from the repo root and parse its JSON output"""
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def registry_env(tmp):
+    """Environment for the repo's processes, with MODEL_REGISTRY pointing at a registry that has a version
+
+    That is the configured registry when it has one; otherwise a version is
+    trained into a new registry under tmp.
+    """
+    from model_registry import ModelRegistry
+
+    env = dict(os.environ)
+    env['MODEL_REGISTRY'] = os.path.join(ROOT, env.get('MODEL_REGISTRY') or 'models')
+    if ModelRegistry(env['MODEL_REGISTRY']).current_version() is None:
+        print("No published model version; training one into a temporary registry first...")
+        env['MODEL_REGISTRY'] = os.path.join(tmp, 'models')
+        run_snippet("from price_predictor import CarPricePredictor; CarPricePredictor().train_models(); print('{}')",
+                    env)
+    return env
+
+
+def main(repeats=3):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = registry_env(tmp)
+        for name, setup in SCENARIOS.items():
+            runs = [run_snippet(TEMPLATE.format(setup=setup, car=SAMPLE_CAR), env) for _ in range(repeats)]
+            results[name] = {key: min(run[key] for run in runs) for key in runs[0]}
+
+        if hasattr(os, 'fork'):
+            runs = [run_snippet(FORK_TEMPLATE.format(car=SAMPLE_CAR), env) for _ in range(repeats)]
+            results['forked_worker'] = {'first_prediction_s': min(run['worker_first_prediction_s'] for run in runs)}
+
+    print(f"{'scenario':<15} {'ready s':>9} {'first prediction s':>19}")
+    for name, timings in results.items():
+        ready = f"{timings['ready_s']:.3f}" if 'ready_s' in timings else '-'
+        print(f"{name:<15} {ready:>9} {timings['first_prediction_s']:>19.3f}")
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,270 @@
+"""
+Benchmark suite for the inference and training paths
+
+Runs a fixed set of benchmarks on synthetic data and writes the results as
+JSON, together with the library versions and machine they were measured on:
+
+  predict     single-row and batch latency of each model's predict()
+  end_to_end  CarPricePredictor.predict_price / predict_prices latency
+  intervals   random forest interval computation
+  features    prepare_features throughput
+  training    ModelTrainer.train_all_models wall time per dataset size
+
+    python -m benchmarks.suite --output baseline.json
+    python -m benchmarks.suite --compare baseline.json           # run, then compare
+    python -m benchmarks.suite --compare baseline.json --results new.json
+
+Comparison flags every metric that got worse by more than --threshold
+(default 15%) and exits with status 1 if any did. Latencies compare the
+median; metrics ending in _per_s are throughputs, where higher is better.
+Compare runs from the same machine only.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+
+import numpy as np
+
+SUITES = ('predict', 'end_to_end', 'intervals', 'features', 'training')
+PACKAGES = ('numpy', 'pandas', 'sklearn', 'xgboost', 'flask')
+
+
+def latencies(func, repeats, warmup=5):
+    """Per-call wall-clock times in milliseconds, after a few warm-up calls"""
+    for _ in range(warmup):
+        func()
+    timings = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings[i] = time.perf_counter() - start
+    return timings * 1000
+
+
+def latency_metrics(prefix, timings):
+    p50, p99 = np.percentile(timings, [50, 99])
+    return {f'{prefix}.p50_ms': float(p50), f'{prefix}.p99_ms': float(p99)}
+
+
+def environment():
+    """Library versions and machine details stored with every result file"""
+    versions = {}
+    for package in PACKAGES:
+        module = __import__(package)
+        versions[package] = getattr(module, '__version__', 'unknown')
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'packages': versions
+    }
+
+
+def train_predictor(n_rows, workdir):
+    """A CarPricePredictor trained on n_rows of synthetic data, published to workdir"""
+    from price_predictor import CarPricePredictor
+    from dataset import write_synthetic_dataset
+    from model_registry import ModelRegistry
+
+    data_path = os.path.join(workdir, 'serving.csv')
+    write_synthetic_dataset(data_path, n_rows)
+    predictor = CarPricePredictor()
+    predictor.registry = ModelRegistry(os.path.join(workdir, 'serving-models'))
+    predictor.train_models(data_path)
+    return predictor
+
+
+def bench_predict(predictor, batch_sizes, repeats):
+    from dataset import generate_synthetic_data
+
+    results = {}
+    encoder = predictor.get_feature_encoder()
+    for n_rows in batch_sizes:
+        X = encoder.encode_columns(generate_synthetic_data(n_rows, seed=n_rows))
+        for name, model in predictor.models.items():
+            timings = latencies(lambda: model.predict(X), repeats)
+            results.update(latency_metrics(f'predict.{name}.rows_{n_rows}', timings))
+    return results
+
+
+def bench_end_to_end(predictor, batch_sizes, repeats):
+    from dataset import generate_synthetic_data
+
+    results = {}
+    for n_rows in batch_sizes:
+        df = generate_synthetic_data(n_rows, seed=n_rows)
+        if n_rows == 1:
+            car = json.loads(df.to_json(orient='records'))[0]
+            timings = latencies(lambda: predictor.predict_price(car), repeats)
+        else:
+            timings = latencies(lambda: predictor.predict_prices(df), repeats)
+        results.update(latency_metrics(f'end_to_end.rows_{n_rows}', timings))
+    return results
+
+
+def bench_intervals(predictor, batch_sizes, repeats):
+    from dataset import generate_synthetic_data
+
+    results = {}
+    encoder = predictor.get_feature_encoder()
+    engine = predictor._get_interval_engine(predictor.models['random_forest'])
+    for n_rows in batch_sizes:
+        X = encoder.encode_columns(generate_synthetic_data(n_rows, seed=n_rows))
+        timings = latencies(lambda: engine.intervals(X), repeats)
+        results.update(latency_metrics(f'intervals.random_forest.rows_{n_rows}', timings))
+    return results
+
+
+def bench_features(predictor, n_rows, repeats):
+    from dataset import generate_synthetic_data
+
+    df = generate_synthetic_data(n_rows, seed=7)
+    timings = latencies(lambda: predictor.prepare_features(df), repeats, warmup=1)
+    best_s = timings.min() / 1000
+    return {
+        f'features.prepare_features.rows_{n_rows}.p50_ms': float(np.median(timings)),
+        f'features.prepare_features.rows_per_s': n_rows / best_s
+    }
+
+
+def bench_training(train_rows, workdir):
+    from dataset import write_synthetic_dataset
+    from model_registry import ModelRegistry
+    from model_trainer import ModelTrainer
+
+    results = {}
+    for n_rows in train_rows:
+        data_path = os.path.join(workdir, f'train-{n_rows}.parquet')
+        write_synthetic_dataset(data_path, n_rows)
+        trainer = ModelTrainer()
+        trainer.registry = ModelRegistry(os.path.join(workdir, f'models-{n_rows}'))
+        trainer.feature_store = None
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            metrics = trainer.train_all_models(data_path=data_path)
+        results[f'training.rows_{n_rows}.wall_s'] = time.perf_counter() - start
+        for name, family in metrics.items():
+            results[f'training.rows_{n_rows}.{name}_s'] = family['train_seconds']
+        os.remove(data_path)
+    return results
+
+
+def run(suites, batch_sizes, train_rows, serving_rows, feature_rows, repeats):
+    warnings.filterwarnings('ignore')
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        if set(suites) - {'training'}:
+            predictor = train_predictor(serving_rows, workdir)
+        if 'predict' in suites:
+            results.update(bench_predict(predictor, batch_sizes, repeats))
+        if 'end_to_end' in suites:
+            results.update(bench_end_to_end(predictor, batch_sizes, repeats))
+        if 'intervals' in suites:
+            results.update(bench_intervals(predictor, batch_sizes, repeats))
+        if 'features' in suites:
+            results.update(bench_features(predictor, feature_rows, max(3, repeats // 20)))
+        if 'training' in suites:
+            results.update(bench_training(train_rows, workdir))
+    return results
+
+
+def higher_is_better(metric):
+    return metric.endswith('_per_s')
+
+
+def compare(baseline, current, threshold):
+    """(metric, baseline, current, relative change, regressed) for metrics in both runs
+
+    p99 latencies are reported but never flagged: they are too noisy for a
+    fixed threshold.
+    """
+    rows = []
+    for metric, before in baseline['results'].items():
+        after = current['results'].get(metric)
+        if after is None or not before:
+            continue
+        change = (after - before) / before
+        worse = -change if higher_is_better(metric) else change
+        regressed = worse > threshold and not metric.endswith('.p99_ms')
+        rows.append((metric, before, after, change, regressed))
+    return rows
+
+
+def print_results(results):
+    width = max(len(metric) for metric in results)
+    for metric, value in results.items():
+        print(f"{metric:<{width}} {value:>14.3f}")
+
+
+def print_comparison(rows, baseline, current):
+    print(f"baseline {baseline['environment']['created']}  current {current['environment']['created']}")
+    for package, version in current['environment']['packages'].items():
+        before = baseline['environment']['packages'].get(package)
+        if before != version:
+            print(f"  {package}: {before} -> {version}")
+
+    width = max(len(row[0]) for row in rows)
+    print(f"{'metric':<{width}} {'baseline':>12} {'current':>12} {'change':>8}")
+    for metric, before, after, change, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{metric:<{width}} {before:>12.3f} {after:>12.3f} {change:>+7.1%}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inference and training benchmark suite")
+    parser.add_argument('--suites', nargs='+', default=list(SUITES), choices=SUITES)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 100, 1000])
+    parser.add_argument('--train-rows', type=int, nargs='+', default=[10000, 100000, 1000000],
+                        help="dataset sizes for the training benchmark")
+    parser.add_argument('--serving-rows', type=int, default=10000,
+                        help="training rows for the models used by the inference benchmarks")
+    parser.add_argument('--feature-rows', type=int, default=100000, help="rows per prepare_features call")
+    parser.add_argument('--repeats', type=int, default=200)
+    parser.add_argument('--output', help="write the results JSON here")
+    parser.add_argument('--compare', metavar='BASELINE', help="results JSON to compare against")
+    parser.add_argument('--results', help="compare this results JSON instead of running the suite")
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help="relative slowdown flagged as a regression")
+    args = parser.parse_args(argv)
+
+    if args.results:
+        with open(args.results) as f:
+            current = json.load(f)
+    else:
+        current = {
+            'environment': environment(),
+            'results': run(args.suites, args.batch_sizes, args.train_rows, args.serving_rows,
+                           args.feature_rows, args.repeats)
+        }
+        print_results(current['results'])
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = compare(baseline, current, args.threshold)
+        print_comparison(rows, baseline, current)
+        regressions = [row[0] for row in rows if row[4]]
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+Fused tree engine benchmark
+
+Trains the three models on synthetic data, then compares per-call latency
+(p50/p99) of CarPricePredictor.score_matrix through each library's
+predict() against the fused tree engine, for a range of batch sizes.
+Outputs are checked to match before timing.
+
+    python -m benchmarks.tree_engine --rows 10000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+from price_predictor import CarPricePredictor
+from dataset import generate_synthetic_data, write_synthetic_dataset
+from model_registry import ModelRegistry
+
+
+def latencies(func, repeats):
+    """Per-call wall-clock times in milliseconds"""
+    timings = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings[i] = time.perf_counter() - start
+    return timings * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000, help="synthetic training rows")
+    parser.add_argument('--repeats', type=int, default=200)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10, 100, 1000])
+    args = parser.parse_args(argv)
+    warnings.filterwarnings('ignore')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, 'train.csv')
+        write_synthetic_dataset(data_path, args.rows)
+        predictor = CarPricePredictor()
+        predictor.registry = ModelRegistry(os.path.join(tmp, 'models'))
+        predictor.train_models(data_path)
+
+    engine = predictor._get_tree_engine()
+    print(f"{len(engine.roots)} trees, {len(engine.feature):,} nodes, depth {len(engine.active_trees)}")
+
+    encoder = predictor.get_feature_encoder()
+    print(f"{'rows':>6} {'library p50':>12} {'p99':>8} {'fused p50':>10} {'p99':>8} {'speedup':>8}")
+    for n_rows in args.batch_sizes:
+        X = encoder.encode_columns(generate_synthetic_data(n_rows, seed=n_rows))
+
+        predictor.fused_max_rows = 0
+        expected = predictor.score_matrix(X)
+        library = latencies(lambda: predictor.score_matrix(X), args.repeats)
+
+        predictor.fused_max_rows = n_rows
+        actual = predictor.score_matrix(X)
+        fused = latencies(lambda: predictor.score_matrix(X), args.repeats)
+
+        for name in expected:
+            for a, b in zip(expected[name], actual[name]):
+                np.testing.assert_allclose(a, b, rtol=1e-5, atol=1.0)
+
+        library_p50, library_p99 = np.percentile(library, [50, 99])
+        fused_p50, fused_p99 = np.percentile(fused, [50, 99])
+        print(f"{n_rows:>6} {library_p50:>10.2f}ms {library_p99:>6.2f}ms "
+              f"{fused_p50:>8.2f}ms {fused_p99:>6.2f}ms {library_p50 / fused_p50:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
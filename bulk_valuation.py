@@ -0,0 +1,169 @@
+"""
+Bulk valuation of listing files
+
+Streams a CSV or Parquet file through the current model version in chunks,
+scores every chunk with one vectorized pass per model across a pool of
+worker processes, and writes results incrementally, so memory stays flat
+whatever the input size.
+
+    python -m bulk_valuation listings.csv valuations.csv
+    python -m bulk_valuation listings.parquet valuations.parquet --workers 8
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from feature_encoder import CATEGORICAL_FEATURES
+
+# Set in each worker process by _init_worker
+_worker_predictor = None
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        sys.exit("Parquet input/output needs pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+def _file_format(path):
+    return 'parquet' if path.lower().endswith(('.parquet', '.pq')) else 'csv'
+
+
+def read_chunks(path, chunk_size):
+    """Yield DataFrames of at most chunk_size rows from a CSV or Parquet file"""
+    if _file_format(path) == 'parquet':
+        pyarrow = _require_pyarrow()
+        parquet_file = pyarrow.parquet.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        dtype = {feature: str for feature in CATEGORICAL_FEATURES}
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=dtype)
+
+
+class ResultWriter:
+    """Appends scored chunks to a CSV or Parquet file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.format = _file_format(path)
+        self._parquet_writer = None
+        self._wrote_header = False
+
+    def write(self, df):
+        if self.format == 'parquet':
+            pyarrow = _require_pyarrow()
+            # Every chunk must share one schema: a chunk with a missing value
+            # would otherwise turn an int64 column into double
+            df = df.astype({column: 'float64' for column in df.select_dtypes('number').columns})
+            table = pyarrow.Table.from_pandas(df, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pyarrow.parquet.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='a' if self._wrote_header else 'w',
+                      header=not self._wrote_header, index=False)
+            self._wrote_header = True
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def _init_worker(model_version):
+    """Load the pinned model version once per worker process"""
+    global _worker_predictor
+    from catalog import VALIDATE_CATALOG, Catalog
+    from price_predictor import CarPricePredictor
+
+    warnings.filterwarnings('ignore')
+    predictor = CarPricePredictor()
+    predictor.catalog = Catalog.from_env() if VALIDATE_CATALOG else None
+    if not predictor.load_models(model_version):
+        raise RuntimeError("No published model version; train models first")
+    predictor.warm_up()
+    _worker_predictor = predictor
+
+
+def score_chunk(df):
+    """Validate, encode and score one chunk; returns the chunk with result columns appended"""
+    df = df.reset_index(drop=True)
+    errors, columns = _worker_predictor.predict_columns(df)
+
+    result = df.copy()
+    for name, column in columns.items():
+        result[name] = column
+    result['error'] = pd.Series(errors, dtype='string')
+    return result
+
+
+def run(input_path, output_path, chunk_size=100000, workers=None, model_version=None):
+    """Score input_path into output_path and return (rows, seconds)"""
+    from model_registry import ModelRegistry
+
+    model_version = model_version or ModelRegistry.from_env().current_version()
+    if model_version is None:
+        sys.exit("No published model version; train models first")
+    workers = workers or os.cpu_count() or 1
+
+    writer = ResultWriter(output_path)
+    rows = 0
+    start = time.perf_counter()
+
+    def report(df):
+        nonlocal rows
+        writer.write(df)
+        rows += len(df)
+        elapsed = time.perf_counter() - start
+        print(f"\r{rows:,} rows  {rows / elapsed:,.0f} rows/sec", end='', file=sys.stderr, flush=True)
+
+    try:
+        if workers == 1:
+            _init_worker(model_version)
+            for chunk in read_chunks(input_path, chunk_size):
+                report(score_chunk(chunk))
+        else:
+            # Keep at most two chunks per worker in flight so memory stays bounded,
+            # and write results in input order
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(model_version,)) as executor:
+                pending = deque()
+                for chunk in read_chunks(input_path, chunk_size):
+                    pending.append(executor.submit(score_chunk, chunk))
+                    if len(pending) >= workers * 2:
+                        report(pending.popleft().result())
+                while pending:
+                    report(pending.popleft().result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    print(file=sys.stderr)
+    return rows, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Price every listing in a CSV or Parquet file")
+    parser.add_argument('input', help="listings file (.csv or .parquet)")
+    parser.add_argument('output', help="where to write valuations (.csv or .parquet)")
+    parser.add_argument('--chunk-size', type=int, default=100000, help="rows per chunk (default: 100000)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--model-version', default=None, help="model version (default: current)")
+    args = parser.parse_args(argv)
+
+    rows, elapsed = run(args.input, args.output, args.chunk_size, args.workers, args.model_version)
+    print(f"Valued {rows:,} listings in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/sec)")
+
+
+if __name__ == '__main__':
+    main()
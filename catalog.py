@@ -0,0 +1,245 @@
+"""
+Make / model / variant catalog
+
+The catalog is a CSV data file (data/catalog.csv, or $CATALOG_PATH) with
+one row per variant: make, model, variant, body_type, fuel_type,
+transmission, engine_size and the new-car price_lakh. The first variant of
+a model is its base variant. It is the single source for the web form's
+make and model lists, /api/models/<make>, the synthetic data generator's
+base prices and request validation: a car's make, model and body type must
+belong together.
+
+Two indexes serve autocomplete over "make model variant" names. Each is
+built on first use, so workers that never autocomplete don't pay for them:
+
+- prefix: every word-start suffix of every name, casefolded, in one sorted
+  list searched with bisect, so "fort" finds Toyota Fortuner variants in
+  O(log n) plus the matches returned
+- fuzzy: character trigram postings in CSR arrays, scored with one
+  np.bincount per query, for queries with typos
+
+Validation of whole columns (check_columns) factorizes make, model and
+body type and checks each distinct combination once, however many rows
+repeat it.
+"""
+
+import bisect
+import csv
+import hashlib
+import os
+import threading
+
+import numpy as np
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'catalog.csv')
+CATALOG_FIELDS = ('make', 'model', 'variant', 'body_type', 'fuel_type', 'transmission', 'engine_size', 'price_lakh')
+SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 100
+# Fuzzy matches must share at least this fraction of the query's trigrams
+FUZZY_MIN_OVERLAP = 0.5
+# Check that make, model and body type belong together in the catalog before scoring
+VALIDATE_CATALOG = os.environ.get('CATALOG_VALIDATION', '1') not in ('', '0')
+
+
+def normalize(text):
+    """Casefolded text with runs of whitespace collapsed to one space"""
+    return ' '.join(str(text).casefold().split())
+
+
+def trigrams(text):
+    """Character trigrams of normalized text, padded with a space on each side"""
+    padded = f' {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Catalog:
+    """Variants of every make and model, with autocomplete indexes and validation"""
+
+    def __init__(self, rows, version):
+        self.version = version
+        self.columns = {field: [row[field] for row in rows] for field in CATALOG_FIELDS}
+        self.columns['engine_size'] = [float(value) for value in self.columns['engine_size']]
+        self.columns['price_lakh'] = [float(value) for value in self.columns['price_lakh']]
+        self.names = [normalize(f"{row['make']} {row['model']} {row['variant']}") for row in rows]
+
+        # Makes and models in file order; body types per (make, model)
+        self.models = {}
+        self._body_types = {}
+        for row in rows:
+            models = self.models.setdefault(row['make'], [])
+            key = (row['make'], row['model'])
+            if key not in self._body_types:
+                models.append(row['model'])
+                self._body_types[key] = []
+            if row['body_type'] not in self._body_types[key]:
+                self._body_types[key].append(row['body_type'])
+        self.makes = list(self.models)
+
+        self._prefix = None
+        self._fuzzy = None
+        self._index_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path=CATALOG_PATH):
+        """Read a catalog CSV; its version is a hash of the file's bytes"""
+        with open(path, 'rb') as f:
+            content = f.read()
+        rows = list(csv.DictReader(content.decode('utf-8').splitlines()))
+        missing = [field for field in CATALOG_FIELDS if rows and field not in rows[0]]
+        if missing:
+            raise ValueError(f"Catalog {path} is missing columns: {', '.join(missing)}")
+        return cls(rows, hashlib.sha256(content).hexdigest()[:16])
+
+    @classmethod
+    def from_env(cls):
+        """The catalog at $CATALOG_PATH, or the bundled one"""
+        return cls.load(os.environ.get('CATALOG_PATH') or CATALOG_PATH)
+
+    def __len__(self):
+        return len(self.names)
+
+    def variant(self, i):
+        """One variant as a dict of CATALOG_FIELDS"""
+        return {field: self.columns[field][i] for field in CATALOG_FIELDS}
+
+    def body_types(self, make, model):
+        """Body types a model is sold in (first one first), or None for an unknown model"""
+        return self._body_types.get((make, model))
+
+    def base_prices(self):
+        """{make: {model: new-car price in lakhs of its base variant}}"""
+        prices = {make: {} for make in self.makes}
+        for make, model, price in zip(self.columns['make'], self.columns['model'], self.columns['price_lakh']):
+            prices[make].setdefault(model, price)
+        return prices
+
+    # Validation
+
+    def check(self, car):
+        """Error message for a car dict whose make, model and body type don't belong together, or None"""
+        make, model, body_type = str(car.get('make')), str(car.get('model')), str(car.get('body_type'))
+        if make not in self.models:
+            return f'Unknown make: {make}'
+        body_types = self._body_types.get((make, model))
+        if body_types is None:
+            return f'Unknown {make} model: {model}'
+        if body_type not in body_types:
+            return f"{make} {model} is not sold as a {body_type} (choose from {', '.join(body_types)})"
+        return None
+
+    def check_columns(self, columns):
+        """check() for whole columns (a DataFrame or dict of arrays); returns one error or None per row"""
+        import pandas as pd
+
+        codes, uniques = [], []
+        for field in ('make', 'model', 'body_type'):
+            field_codes, field_uniques = _factorize(pd, columns[field])
+            codes.append(field_codes)
+            uniques.append(field_uniques)
+
+        # Each distinct (make, model, body type) as one integer, checked once
+        n_models, n_body_types = len(uniques[1]), len(uniques[2])
+        inverse, combinations = pd.factorize((codes[0] * n_models + codes[1]) * n_body_types + codes[2])
+        messages = np.empty(len(combinations), dtype=object)
+        messages[:] = [self.check({'make': uniques[0][combination // (n_models * n_body_types)],
+                                   'model': uniques[1][combination // n_body_types % n_models],
+                                   'body_type': uniques[2][combination % n_body_types]})
+                       for combination in combinations.tolist()]
+        return messages[inverse].tolist()
+
+    # Autocomplete
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """Variants matching a partial name, best first, and how they matched
+
+        Returns (variants, 'prefix' | 'fuzzy' | None). Prefix matches are
+        names with a word starting with the query (in name order); only when
+        there are none does the fuzzy index rank names by shared trigrams.
+        """
+        query = normalize(query)
+        limit = max(1, min(int(limit), MAX_SEARCH_LIMIT))
+        if not query:
+            return [], None
+
+        ids = self._prefix_matches(query, limit)
+        match = 'prefix'
+        if not len(ids):
+            ids = self._fuzzy_matches(query, limit)
+            match = 'fuzzy' if len(ids) else None
+        return [self.variant(i) for i in ids], match
+
+    def _prefix_index(self):
+        """(sorted word-start suffixes, name id of each), built once"""
+        if self._prefix is None:
+            with self._index_lock:
+                if self._prefix is None:
+                    keys = []
+                    for i, name in enumerate(self.names):
+                        words = name.split(' ')
+                        for start in range(len(words)):
+                            keys.append((' '.join(words[start:]), i))
+                    keys.sort()
+                    self._prefix = ([key for key, _ in keys], np.array([i for _, i in keys], dtype=np.int32))
+        return self._prefix
+
+    def _prefix_matches(self, query, limit):
+        keys, key_ids = self._prefix_index()
+        start = bisect.bisect_left(keys, query)
+        # Every key with the prefix sorts before the prefix followed by the largest code point
+        end = bisect.bisect_left(keys, query + '\U0010ffff', start)
+        ids = key_ids[start:end]
+        # A name can match at several word starts: keep its first (best sorted) match
+        _, first = np.unique(ids, return_index=True)
+        return ids[np.sort(first)[:limit]]
+
+    def _fuzzy_index(self):
+        """(trigram -> id, CSR offsets, postings of name ids, trigram count per name), built once"""
+        if self._fuzzy is None:
+            with self._index_lock:
+                if self._fuzzy is None:
+                    vocabulary = {}
+                    grams = []
+                    names = []
+                    counts = np.empty(len(self.names), dtype=np.int32)
+                    for i, name in enumerate(self.names):
+                        name_grams = trigrams(name)
+                        counts[i] = len(name_grams)
+                        for gram in name_grams:
+                            grams.append(vocabulary.setdefault(gram, len(vocabulary)))
+                        names.extend([i] * len(name_grams))
+                    grams = np.array(grams, dtype=np.int32)
+                    order = np.argsort(grams, kind='stable')
+                    offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+                    np.cumsum(np.bincount(grams, minlength=len(vocabulary)), out=offsets[1:])
+                    self._fuzzy = (vocabulary, offsets, np.array(names, dtype=np.int32)[order], counts)
+        return self._fuzzy
+
+    def _fuzzy_matches(self, query, limit):
+        vocabulary, offsets, postings, counts = self._fuzzy_index()
+        query_grams = trigrams(query)
+        known = [vocabulary[gram] for gram in query_grams if gram in vocabulary]
+        if not known:
+            return np.empty(0, dtype=np.int32)
+
+        shared = np.bincount(np.concatenate([postings[offsets[g]:offsets[g + 1]] for g in known]),
+                             minlength=len(self.names))
+        candidates = np.flatnonzero(shared >= FUZZY_MIN_OVERLAP * len(query_grams))
+        # Most shared trigrams first, then the closest in length (Dice coefficient)
+        dice = 2 * shared[candidates] / (len(query_grams) + counts[candidates])
+        order = np.lexsort((-dice, -shared[candidates]))
+        return candidates[order[:limit]]
+
+
+def _factorize(pd, values):
+    """(codes, unique values as str) of a column; missing values become the string 'nan'"""
+    if hasattr(values, 'cat'):
+        codes = values.cat.codes.to_numpy().astype(np.int64)
+        uniques = np.asarray(values.cat.categories, dtype=str).tolist()
+    else:
+        codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+        uniques = [str(value) for value in uniques]
+    missing = codes < 0
+    if missing.any():
+        codes[missing] = len(uniques)
+        uniques.append('nan')
+    return codes, uniques
@@ -0,0 +1,214 @@
+"""
+Dataset loading and synthetic data generation
+
+    python -m dataset generate listings.parquet --rows 5000000 --seed 42
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from catalog import CATALOG_PATH, Catalog
+from feature_encoder import CATEGORICAL_FEATURES
+
+SAMPLE_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sample_cars.csv')
+
+NUMERIC_DTYPES = {
+    'year': 'int16',
+    'mileage': 'int32',
+    'engine_size': 'float32',
+    'previous_owners': 'int8',
+    'price': 'float64'
+}
+
+# The bundled catalog, whatever $CATALOG_PATH says, so synthetic data only depends on the seed
+CATALOG = Catalog.load(CATALOG_PATH)
+# New-car prices in lakhs of each model's base variant, used by the synthetic price generator
+BASE_PRICES = CATALOG.base_prices()
+
+# (values, sampling probabilities, price multipliers)
+CONDITIONS = (['Poor', 'Fair', 'Good', 'Very Good', 'Excellent'],
+              [0.05, 0.15, 0.35, 0.35, 0.10],
+              [0.65, 0.80, 0.95, 1.10, 1.25])
+FUEL_TYPES = (['Petrol', 'Diesel', 'Electric', 'Hybrid', 'CNG'],
+              [0.58, 0.20, 0.10, 0.08, 0.04],
+              [1.0, 1.15, 1.40, 1.30, 0.90])
+TRANSMISSIONS = (['Manual', 'Automatic'],
+                 [0.4, 0.6],
+                 [0.95, 1.10])
+BODY_TYPES = (['Sedan', 'SUV', 'Hatchback', 'Coupe', 'Convertible', 'Wagon'],
+              [0.32, 0.46, 0.16, 0.04, 0.01, 0.01],
+              [1.0, 1.20, 0.85, 1.15, 1.30, 0.90])
+ENGINE_SIZES = ([1.0, 1.2, 1.5, 2.0, 2.4, 2.8, 3.0],
+                [0.16, 0.21, 0.26, 0.21, 0.08, 0.05, 0.03])
+PREVIOUS_OWNERS = ([1, 2, 3, 4],
+                   [0.70, 0.20, 0.08, 0.02])
+
+REFERENCE_YEAR = 2024
+
+
+def _categorical_dtypes():
+    return {feature: 'category' for feature in CATEGORICAL_FEATURES}
+
+
+def load_dataset(path, chunk_size=None, columns=None):
+    """Load a CSV or Parquet listing file with explicit dtypes
+
+    Categorical columns are read as pandas categoricals and numeric columns
+    with the narrowest dtype in NUMERIC_DTYPES. Parquet files are memory
+    mapped. With chunk_size, an iterator of DataFrames is returned instead
+    of one DataFrame.
+    """
+    if path.lower().endswith(('.parquet', '.pq')):
+        return _load_parquet(path, chunk_size, columns)
+
+    dtype = dict(NUMERIC_DTYPES)
+    dtype.update(_categorical_dtypes())
+    if columns is not None:
+        dtype = {column: dtype[column] for column in columns if column in dtype}
+
+    if chunk_size is None:
+        return pd.read_csv(path, dtype=dtype, usecols=columns)
+    return pd.read_csv(path, dtype=dtype, usecols=columns, chunksize=chunk_size)
+
+
+def _load_parquet(path, chunk_size, columns):
+    import pyarrow.parquet
+
+    if chunk_size is None:
+        table = pyarrow.parquet.read_table(path, columns=columns, memory_map=True)
+        return _apply_dtypes(table.to_pandas())
+
+    parquet_file = pyarrow.parquet.ParquetFile(path, memory_map=True)
+    return (_apply_dtypes(batch.to_pandas())
+            for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns))
+
+
+def _apply_dtypes(df):
+    dtype = {column: kind for column, kind in NUMERIC_DTYPES.items() if column in df.columns}
+    dtype.update({column: 'category' for column in CATEGORICAL_FEATURES if column in df.columns})
+    return df.astype(dtype)
+
+
+def load_sample_data():
+    """The small bundled sample used when no training data is configured"""
+    return load_dataset(SAMPLE_DATA_PATH)
+
+
+def generate_synthetic_data(n_rows, seed=42):
+    """Generate n_rows of synthetic Indian-market listings with realistic prices
+
+    Fully vectorized and reproducible: the same (n_rows, seed) always gives
+    the same frame.
+    """
+    rng = np.random.default_rng(seed)
+
+    makes = list(BASE_PRICES)
+    model_makes = np.array([i for i, models in enumerate(BASE_PRICES.values()) for _ in models])
+    models = [model for models in BASE_PRICES.values() for model in models]
+    base_prices = np.array([price for models in BASE_PRICES.values() for price in models.values()])
+
+    model_index = rng.integers(0, len(models), n_rows)
+    year = rng.integers(2015, REFERENCE_YEAR, n_rows)
+    mileage = rng.integers(5000, 150000, n_rows)
+    condition = rng.choice(len(CONDITIONS[0]), n_rows, p=CONDITIONS[1])
+    fuel_type = rng.choice(len(FUEL_TYPES[0]), n_rows, p=FUEL_TYPES[1])
+    transmission = rng.choice(len(TRANSMISSIONS[0]), n_rows, p=TRANSMISSIONS[1])
+    body_type = rng.choice(len(BODY_TYPES[0]), n_rows, p=BODY_TYPES[1])
+    previous_owners = rng.choice(PREVIOUS_OWNERS[0], n_rows, p=PREVIOUS_OWNERS[1])
+
+    # Body types a model is not sold in become the catalog's first one for it
+    sold_as = np.zeros((len(models), len(BODY_TYPES[0])), dtype=bool)
+    pairs = [(make, model) for make, make_models in BASE_PRICES.items() for model in make_models]
+    for i, (make, model) in enumerate(pairs):
+        sold_as[i, [BODY_TYPES[0].index(body) for body in CATALOG.body_types(make, model)]] = True
+    body_type = np.where(sold_as[model_index, body_type], body_type, sold_as.argmax(axis=1)[model_index])
+
+    # Electric cars have no engine displacement
+    engine_size = rng.choice(ENGINE_SIZES[0], n_rows, p=ENGINE_SIZES[1])
+    electric = fuel_type == FUEL_TYPES[0].index('Electric')
+    engine_size[electric] = 0.0
+
+    # Base price in rupees, depreciated by age and mileage
+    age = REFERENCE_YEAR - year
+    price = base_prices[model_index] * 100000
+    price *= np.maximum(0.3, np.exp(-age * 0.15))
+    price *= np.maximum(0.4, 1 - (mileage / 200000) * 0.6)
+
+    price *= np.asarray(CONDITIONS[2])[condition]
+    price *= np.asarray(FUEL_TYPES[2])[fuel_type]
+    price *= np.asarray(TRANSMISSIONS[2])[transmission]
+    price *= np.asarray(BODY_TYPES[2])[body_type]
+    price *= np.where(engine_size > 0, 1 + np.log(engine_size + 1) * 0.1, 1.3)
+    price *= np.maximum(0.75, 1 - (previous_owners - 1) * 0.08)
+
+    # Add some realistic noise, with a minimum of 1 lakh
+    price += rng.normal(0, price * 0.05)
+    price = np.maximum(100000, price).astype(np.int64)
+
+    def categorical(codes, categories):
+        return pd.Categorical.from_codes(codes, categories=categories)
+
+    return pd.DataFrame({
+        'make': categorical(model_makes[model_index], makes),
+        'model': categorical(model_index, models),
+        'year': year.astype(NUMERIC_DTYPES['year']),
+        'mileage': mileage.astype(NUMERIC_DTYPES['mileage']),
+        'condition': categorical(condition, CONDITIONS[0]),
+        'fuel_type': categorical(fuel_type, FUEL_TYPES[0]),
+        'transmission': categorical(transmission, TRANSMISSIONS[0]),
+        'body_type': categorical(body_type, BODY_TYPES[0]),
+        'engine_size': engine_size.astype(NUMERIC_DTYPES['engine_size']),
+        'previous_owners': previous_owners.astype(NUMERIC_DTYPES['previous_owners']),
+        'price': price.astype(NUMERIC_DTYPES['price'])
+    })
+
+
+def generate_synthetic_chunks(n_rows, chunk_size=1000000, seed=42):
+    """Yield synthetic data in chunks; each chunk has its own seed derived from seed"""
+    seeds = np.random.SeedSequence(seed).spawn((n_rows + chunk_size - 1) // chunk_size)
+    for i, chunk_seed in enumerate(seeds):
+        yield generate_synthetic_data(min(chunk_size, n_rows - i * chunk_size), seed=chunk_seed)
+
+
+def write_synthetic_dataset(path, n_rows, chunk_size=1000000, seed=42):
+    """Write n_rows of synthetic data to a CSV or Parquet file, one chunk at a time"""
+    parquet_writer = None
+    try:
+        for i, chunk in enumerate(generate_synthetic_chunks(n_rows, chunk_size, seed)):
+            if path.lower().endswith(('.parquet', '.pq')):
+                import pyarrow
+                import pyarrow.parquet
+
+                # Plain strings keep the schema identical across chunks
+                chunk = chunk.astype({feature: str for feature in CATEGORICAL_FEATURES})
+                table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+                if parquet_writer is None:
+                    parquet_writer = pyarrow.parquet.ParquetWriter(path, table.schema)
+                parquet_writer.write_table(table)
+            else:
+                chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    finally:
+        if parquet_writer is not None:
+            parquet_writer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Synthetic listing data for training and load tests")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    generate = subparsers.add_parser('generate', help="write a synthetic dataset to CSV or Parquet")
+    generate.add_argument('output')
+    generate.add_argument('--rows', type=int, default=1000000)
+    generate.add_argument('--seed', type=int, default=42)
+    generate.add_argument('--chunk-size', type=int, default=1000000)
+    args = parser.parse_args(argv)
+
+    write_synthetic_dataset(args.output, args.rows, args.chunk_size, args.seed)
+    print(f"Wrote {args.rows:,} rows to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+import numpy as np
+
+CATEGORICAL_FEATURES = ['make', 'model', 'condition', 'fuel_type', 'transmission', 'body_type']
+NUMERIC_FEATURES = ['mileage', 'engine_size', 'previous_owners']
+FEATURE_NAMES = ['age'] + NUMERIC_FEATURES + [f + '_encoded' for f in CATEGORICAL_FEATURES]
+
+
+def encoder_categories(encoders):
+    """The classes of fitted LabelEncoders as plain lists, for storing without pickles"""
+    return {feature: np.asarray(encoder.classes_, dtype=str).tolist() for feature, encoder in encoders.items()}
+
+
+class FeatureEncoder:
+    """Precompiled feature encoder built from fitted LabelEncoders
+
+    The sorted ``classes_`` of every LabelEncoder are compiled once into a
+    dict lookup table (for single records) and a string array searched with
+    ``np.searchsorted`` (for whole columns). Encoders extended with new
+    categories (DataProcessor.extend_encoders) keep their old codes and are
+    no longer sorted; those are searched through an argsort permutation. Both paths write straight into a
+    float32 matrix laid out in FEATURE_NAMES order, so no DataFrame copy or
+    LabelEncoder.transform call happens per request. ``encoders`` may also
+    map each feature straight to its sorted classes (see encoder_categories),
+    which needs no scikit-learn import.
+
+    Unknown categories are handled the same way on both paths:
+    unknown='first' maps them to code 0 (``classes_[0]``), unknown='error'
+    raises ValueError.
+    """
+
+    UNKNOWN_POLICIES = ('first', 'error')
+    UNKNOWN_CODE = 0
+
+    def __init__(self, encoders, current_year, unknown='first'):
+        if unknown not in self.UNKNOWN_POLICIES:
+            raise ValueError(f"Unknown category policy must be one of {self.UNKNOWN_POLICIES}")
+
+        self.current_year = current_year
+        self.unknown = unknown
+        self.feature_names = list(FEATURE_NAMES)
+        self.n_features = len(self.feature_names)
+
+        self.classes = {}
+        self.lookup = {}
+        self._sorted = {}
+        for feature in CATEGORICAL_FEATURES:
+            classes = np.asarray(getattr(encoders[feature], 'classes_', encoders[feature]), dtype=str)
+            self.classes[feature] = classes
+            order = np.argsort(classes, kind='stable')
+            if (order[1:] < order[:-1]).any():
+                self._sorted[feature] = (classes[order], order)
+            else:
+                self._sorted[feature] = (classes, None)
+            self.lookup[feature] = {value: float(code) for code, value in enumerate(classes.tolist())}
+
+        self._numeric_columns = [(self.feature_names.index(f), f) for f in NUMERIC_FEATURES]
+        self._categorical_columns = [(self.feature_names.index(f + '_encoded'), f)
+                                     for f in CATEGORICAL_FEATURES]
+
+    def allocate(self, n_rows):
+        """Allocate an output matrix for n_rows"""
+        return np.empty((n_rows, self.n_features), dtype=np.float32)
+
+    def encode_records(self, records, out=None):
+        """Encode a list of raw car dicts into a float32 feature matrix"""
+        if out is None:
+            out = self.allocate(len(records))
+
+        for i, record in enumerate(records):
+            row = out[i]
+            row[0] = self.current_year - float(record['year'])
+            for column, feature in self._numeric_columns:
+                row[column] = float(record[feature])
+            for column, feature in self._categorical_columns:
+                value = str(record[feature])
+                code = self.lookup[feature].get(value)
+                if code is None:
+                    code = self._unknown_code(feature, value)
+                row[column] = code
+
+        return out
+
+    def encode_columns(self, columns, out=None):
+        """Encode column arrays (a DataFrame or dict of arrays) into a float32 feature matrix"""
+        n_rows = len(columns['year'])
+        if out is None:
+            out = self.allocate(n_rows)
+
+        out[:, 0] = self.current_year - np.asarray(columns['year'], dtype=np.float64)
+        for column, feature in self._numeric_columns:
+            out[:, column] = np.asarray(columns[feature], dtype=np.float64)
+
+        for column, feature in self._categorical_columns:
+            out[:, column] = self._encode_column(feature, columns[feature])
+
+        return out
+
+    def _encode_column(self, feature, values):
+        """Codes for one categorical column"""
+        if hasattr(values, 'cat'):
+            # pandas categorical: encode each category once, then gather by code
+            codes = values.cat.codes.to_numpy()
+            if (codes < 0).any():
+                self._unknown_code(feature, None)
+            categories = self._encode_values(feature, np.asarray(values.cat.categories, dtype=str))
+            # Code -1 (missing value) picks up the trailing unknown entry
+            return np.append(categories, self.UNKNOWN_CODE)[codes]
+        return self._encode_values(feature, np.asarray(values, dtype=str))
+
+    def _encode_values(self, feature, values):
+        """Codes for an array of strings via binary search in the sorted classes"""
+        classes, order = self._sorted[feature]
+        codes = np.searchsorted(classes, values)
+        np.minimum(codes, len(classes) - 1, out=codes)
+        unknown = classes[codes] != values
+        if order is not None:
+            codes = order[codes]
+        if unknown.any():
+            if self.unknown == 'error':
+                self._unknown_code(feature, values[unknown][0])
+            codes[unknown] = self.UNKNOWN_CODE
+        return codes
+
+    def _unknown_code(self, feature, value):
+        """Code for a category that was not seen during training"""
+        if self.unknown == 'error':
+            raise ValueError(f"Unknown {feature}: {value}")
+        return float(self.UNKNOWN_CODE)
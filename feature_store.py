@@ -0,0 +1,139 @@
+"""
+On-disk store of encoded training matrices
+
+    feature_store/
+        <key>/
+            manifest.json       # what the entry was built from
+            X_train.npy         # float32 encoded features, FEATURE_NAMES order
+            X_test.npy
+            y_train.npy         # float64 prices
+            y_test.npy
+            folds.npy           # int8 CV fold of every training row
+
+An entry holds everything ModelTrainer derives from a listing file before
+fitting: the encoded features (age and encoded categoricals included), the
+target, the train/test split and the cross-validation fold of every
+training row, plus the encoder categories needed to rebuild the encoders.
+It is keyed by a hash of the listing file's bytes, the encoders it was
+encoded with and the split settings, so a changed file, encoder or split
+never reuses a stale entry.
+
+Arrays are plain .npy files loaded with mmap_mode='r': a training run reads
+zero-copy views of the page cache instead of re-parsing and re-encoding,
+and concurrent runs on the same data share those pages. Entries are
+written to a temporary directory and renamed into place, like registry
+versions.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+from feature_encoder import FEATURE_NAMES
+
+# Bump when the entry layout or the encoding changes, so old entries stop matching
+FORMAT_VERSION = 1
+ARRAYS = ('X_train', 'X_test', 'y_train', 'y_test', 'folds')
+
+
+class FeatureSet:
+    """Encoded train/test matrices, targets and CV fold ids for one dataset"""
+
+    def __init__(self, X_train, X_test, y_train, y_test, folds, categories, reference_year, key=None):
+        self.X_train = X_train
+        self.X_test = X_test
+        self.y_train = y_train
+        self.y_test = y_test
+        self.folds = folds
+        self.categories = categories
+        self.reference_year = reference_year
+        self.key = key
+
+
+class FeatureStore:
+    def __init__(self, root='feature_store'):
+        self.root = root
+
+    @classmethod
+    def from_env(cls):
+        """Store rooted at $FEATURE_STORE_DIR (default feature_store/), or None if set to ''"""
+        root = os.environ.get('FEATURE_STORE_DIR', 'feature_store')
+        return cls(root) if root else None
+
+    def key(self, source, reference_year, categories=None, test_size=0.2, n_splits=5, random_state=42):
+        """Entry key for a dataset and how it is encoded and split
+
+        source identifies the data (see file_fingerprint). categories are
+        the encoder classes the data is encoded with, or None when the
+        encoders are fitted on the data itself.
+        """
+        spec = {
+            'format': FORMAT_VERSION,
+            'source': source,
+            'features': FEATURE_NAMES,
+            'reference_year': reference_year,
+            'categories': categories,
+            'split': [test_size, n_splits, random_state]
+        }
+        return hashlib.sha256(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()[:32]
+
+    def get(self, key):
+        """The stored FeatureSet for key with memory-mapped arrays, or None"""
+        path = os.path.join(self.root, key)
+        try:
+            with open(os.path.join(path, 'manifest.json'), 'r') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in ARRAYS}
+        return FeatureSet(categories=manifest['categories'], reference_year=manifest['reference_year'],
+                          key=key, **arrays)
+
+    def put(self, key, features, metadata=None):
+        """Write features under key and return them re-read as memory-mapped views"""
+        os.makedirs(self.root, exist_ok=True)
+        tmp_dir = os.path.join(self.root, f'.tmp-{uuid.uuid4().hex}')
+        os.makedirs(tmp_dir)
+
+        try:
+            for name in ARRAYS:
+                np.save(os.path.join(tmp_dir, f'{name}.npy'), np.ascontiguousarray(getattr(features, name)))
+
+            manifest = {
+                'key': key,
+                'created_at': datetime.now().isoformat(),
+                'n_train_rows': len(features.X_train),
+                'n_test_rows': len(features.X_test),
+                'feature_names': FEATURE_NAMES,
+                'reference_year': features.reference_year,
+                'categories': features.categories,
+                'metadata': metadata or {}
+            }
+            with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f, indent=2)
+
+            try:
+                os.rename(tmp_dir, os.path.join(self.root, key))
+            except OSError:
+                # Another run stored the same entry first; theirs is identical
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        return self.get(key)
+
+
+def file_fingerprint(path):
+    """sha256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,31 @@
+"""
+Gunicorn configuration for AutoPrice AI
+
+    gunicorn -c gunicorn.conf.py
+
+The app and the current model version are loaded once in the master before
+workers are forked, so worker startup does no unpickling and every worker
+shares the model memory copy-on-write.
+"""
+
+import multiprocessing
+import os
+
+wsgi_app = 'app:app'
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# Threads per worker; more than one is what lets MICRO_BATCH_MAX_ROWS coalesce requests
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+timeout = 60
+preload_app = True
+
+
+def when_ready(server):
+    """Load models in the master, after the app is imported and before workers fork"""
+    from app import preload_models
+
+    if preload_models():
+        server.log.info("Preloaded model version into master process")
+    else:
+        server.log.warning("No published model version; prediction requests get 503 while a background "
+                           "training job (started by the first one, or POST /api/train) publishes one")
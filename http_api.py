@@ -0,0 +1,138 @@
+"""
+Framework-neutral request handling shared by app.py (Flask) and asgi.py
+
+The functions here take what a handler has already read from its request
+(a JSON body, query parameters, a header value) and the serving
+predictor, and return plain documents or raise RequestError. Each app
+only reads its requests and wraps the results in its own response type,
+so both answer with the same validation errors, documents and caching
+headers. Encodings other than JSON live in response_formats.
+"""
+
+import hashlib
+
+from price_predictor import coerce_car
+from response_formats import encode, prediction_columns
+
+
+class RequestError(ValueError):
+    """A request the API answers with {'error': message} and a 4xx status"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def model_selection(args, body=None):
+    """(models, ensemble) from query parameters (?models=a,b&ensemble=1), or from the
+    "models" and "ensemble" keys of a JSON object body, which take precedence
+
+    Raises ValueError for a malformed selection; names are checked by
+    CarPricePredictor.select_models.
+    """
+    models = args.get('models')
+    ensemble = args.get('ensemble')
+    if isinstance(body, dict):
+        models = body.get('models', models)
+        ensemble = body.get('ensemble', ensemble)
+    if isinstance(models, str):
+        models = [name.strip() for name in models.split(',') if name.strip()]
+    if models is not None and not (isinstance(models, list) and all(isinstance(name, str) for name in models)):
+        raise ValueError('models must be a list of model names')
+    if isinstance(ensemble, str):
+        ensemble = ensemble.lower() in ('1', 'true', 'yes', 'on')
+    return models, bool(ensemble)
+
+
+def read_car(data):
+    """The car of a single-car prediction body, with numeric fields coerced
+
+    Raises RequestError unless it is an object with every required field
+    and finite numbers (or numeric strings) in the numeric ones, with the
+    messages validate_batch gives the rows of a batch.
+    """
+    if not isinstance(data, dict):
+        raise RequestError('Expected a JSON object')
+    car, error = coerce_car(data)
+    if error is not None:
+        raise RequestError(error)
+    return car
+
+
+def prediction_options(current, args, body=None, car=None):
+    """(models, ensemble) of a prediction request, checked against the serving predictor
+
+    Raises RequestError when car (if given) fails the catalog check or the
+    model selection is malformed or names an unknown model.
+    """
+    if car is not None:
+        error = current.check_car(car)
+        if error is not None:
+            raise RequestError(error)
+    try:
+        models, ensemble = model_selection(args, body)
+        current.select_models(models)
+    except ValueError as e:
+        raise RequestError(str(e))
+    return models, ensemble
+
+
+def prediction_document(predictions):
+    """JSON document of a single-car prediction"""
+    return {'success': True, 'predictions': predictions}
+
+
+def encode_prediction(fmt, predictions):
+    """Body of a single-car prediction in a negotiated format other than JSON"""
+    if fmt == 'arrow':
+        return encode(fmt, {'success': True}, columns=prediction_columns([predictions]))
+    body = encode(fmt, prediction_document(predictions))
+    return body if isinstance(body, bytes) else b''.join(body)
+
+
+def training_document(jobs):
+    """Start (or join) a training job; the body of the 503 answered until a model is available"""
+    return {
+        'error': 'Models are being trained, please retry shortly',
+        'job_id': jobs.submit()
+    }
+
+
+def performance_document(current):
+    """JSON document of /api/performance"""
+    return {
+        'success': True,
+        'model_version': current.model_version,
+        'performance': current.performance_metrics
+    }
+
+
+def response_etag(version, path):
+    """ETag of a response that only changes with version (of the catalog or models), per request path and query"""
+    return '"' + hashlib.sha256(f'{version}:{path}'.encode()).hexdigest()[:20] + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header value (*, or a comma-separated list of possibly weak ETags) matches etag"""
+    for tag in (if_none_match or '').split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == '*' or tag == etag:
+            return True
+    return False
+
+
+def conditional(version, path, if_none_match, max_age=None):
+    """Caching headers of a response that only changes with version, and whether the client's copy is current
+
+    Returns ({header: value}, not_modified). With max_age clients may
+    reuse the response for that many seconds; without it they must
+    revalidate (no-cache). Responses of an unversioned predictor (never
+    published) get no headers and are never 304.
+    """
+    if version is None:
+        return {}, False
+    etag = response_etag(version, path)
+    cache_control = 'public, no-cache' if max_age is None else f'public, max-age={max_age}'
+    return {'ETag': etag, 'Cache-Control': cache_control}, etag_matches(if_none_match, etag)
@@ -0,0 +1,200 @@
+"""
+Budgeted hyperparameter search for ModelTrainer
+
+Randomized successive halving: a random sample of candidates is scored by
+cross-validation on a small slice of each training fold, the best third
+survive to a slice three times larger, and so on until the survivors are
+scored on the full folds. A time budget stops the search early and keeps
+the best candidate of the last rung reached. XGBoost candidates stop
+adding trees once a slice held out of the fold's training rows stops
+improving; the validation fold is only used for scoring.
+"""
+
+import math
+import threading
+import time
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import r2_score
+from sklearn.model_selection import KFold, ParameterSampler
+
+# Candidate values per model family. XGBoost's n_estimators is an upper
+# bound that early stopping cuts short.
+SEARCH_SPACES = {
+    'random_forest': {
+        'n_estimators': [50, 100, 200],
+        'max_depth': [10, 15, 20, None],
+        'min_samples_split': [2, 5, 10],
+        'min_samples_leaf': [1, 2, 4]
+    },
+    'gradient_boosting': {
+        'n_estimators': [50, 100, 200],
+        'learning_rate': [0.05, 0.1, 0.15],
+        'max_depth': [3, 5, 7],
+        'subsample': [0.8, 0.9, 1.0]
+    },
+    'xgboost': {
+        'learning_rate': [0.05, 0.1, 0.15],
+        'max_depth': [3, 5, 7],
+        'subsample': [0.8, 0.9, 1.0],
+        'colsample_bytree': [0.8, 0.9, 1.0],
+        'min_child_weight': [1, 3, 5]
+    }
+}
+
+XGBOOST_MAX_ESTIMATORS = 1000
+EARLY_STOPPING_ROUNDS = 20
+# Share of each fold's training rows held out to decide when to stop early
+EARLY_STOPPING_FRACTION = 0.1
+
+# Families whose estimators use several threads through n_jobs
+THREADED_FAMILIES = ('random_forest', 'xgboost')
+
+
+def kfold_ids(n_rows, n_splits=5, random_state=42):
+    """Validation fold of every row for shuffled K-fold cross-validation"""
+    fold_ids = np.empty(n_rows, dtype=np.int8)
+    for i, (_, test) in enumerate(KFold(n_splits, shuffle=True, random_state=random_state).split(np.empty(n_rows))):
+        fold_ids[test] = i
+    return fold_ids
+
+
+class FoldCache:
+    """K-fold splits of a training matrix, materialized once and shared
+
+    Each fold's training rows are stored in shuffled order, so the first n
+    rows are a random subsample and halving rungs slice them without
+    copying. Folds are built on first use and reused by every candidate and
+    every model family; access is thread-safe. fold_ids (see kfold_ids)
+    reuses fold assignments computed earlier, e.g. by the feature store.
+    """
+
+    def __init__(self, X, y, n_splits=5, random_state=42, fold_ids=None):
+        self.X = np.asarray(X)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.n_splits = n_splits
+        if fold_ids is None:
+            fold_ids = kfold_ids(len(self.X), n_splits, random_state)
+        rng = np.random.default_rng(random_state)
+        self.splits = [(rng.permutation(np.flatnonzero(fold_ids != i)), np.flatnonzero(fold_ids == i))
+                       for i in range(n_splits)]
+        self.train_rows = min(len(train) for train, _ in self.splits)
+        self._folds = {}
+        self._lock = threading.Lock()
+
+    def fold(self, i):
+        """Return (X_train, y_train, X_val, y_val) for fold i"""
+        with self._lock:
+            if i not in self._folds:
+                train, test = self.splits[i]
+                self._folds[i] = (self.X[train], self.y[train], self.X[test], self.y[test])
+            return self._folds[i]
+
+    def cross_val_score(self, estimator, n_rows=None, early_stopping=False):
+        """R² of estimator on every fold, fitting on the first n_rows training rows
+
+        With early_stopping, the last EARLY_STOPPING_FRACTION of the fold's
+        training rows is the XGBoost eval_set and is never fitted on, so
+        the validation fold that is scored plays no part in choosing the
+        number of trees. Returns (scores, best_iterations); best_iterations
+        is empty without early stopping.
+        """
+        scores, best_iterations = [], []
+        for i in range(self.n_splits):
+            X_train, y_train, X_val, y_val = self.fold(i)
+            model = clone(estimator)
+            if early_stopping:
+                fit_rows = len(X_train) - max(1, int(len(X_train) * EARLY_STOPPING_FRACTION))
+                n = fit_rows if n_rows is None else min(n_rows, fit_rows)
+                model.fit(X_train[:n], y_train[:n], eval_set=[(X_train[fit_rows:], y_train[fit_rows:])],
+                          verbose=False)
+                best_iterations.append(model.best_iteration + 1)
+            else:
+                model.fit(X_train[:n_rows], y_train[:n_rows])
+            scores.append(r2_score(y_val, model.predict(X_val)))
+        return np.array(scores), best_iterations
+
+
+class SuccessiveHalvingSearch:
+    """Randomized successive-halving search over one model family
+
+    estimator is the base estimator; each candidate is a clone with one
+    sample of space applied. The compute budget is n_candidates (fits per
+    rung shrink by factor); time_budget, in seconds, stops the search
+    between candidate evaluations.
+    """
+
+    def __init__(self, estimator, space, folds, n_candidates=27, factor=3, min_rows=200,
+                 time_budget=None, early_stopping=False, random_state=42):
+        self.estimator = estimator
+        self.space = space
+        self.folds = folds
+        self.n_candidates = n_candidates
+        self.factor = factor
+        self.min_rows = min_rows
+        self.time_budget = time_budget
+        self.early_stopping = early_stopping
+        self.random_state = random_state
+
+        self.best_params_ = None
+        self.best_score_ = None
+        self.best_scores_ = None
+        self.best_rows_ = None
+        self.best_n_estimators_ = None
+        self.n_fits_ = 0
+        self.n_rungs_ = 0
+        self.timed_out_ = False
+        self.elapsed_ = 0.0
+
+    def rung_rows(self):
+        """Training rows per fold at each rung, ending with the full folds"""
+        n_rungs = int(math.log(max(self.n_candidates, 1), self.factor) + 1e-9) + 1
+        max_rows = self.folds.train_rows
+        return [max(min(self.min_rows, max_rows), max_rows // self.factor ** (n_rungs - 1 - rung))
+                for rung in range(n_rungs)]
+
+    def run(self):
+        start = time.perf_counter()
+        deadline = start + self.time_budget if self.time_budget else None
+
+        candidates = list(ParameterSampler(self.space, self.n_candidates, random_state=self.random_state))
+        for rung, n_rows in enumerate(self.rung_rows()):
+            results = []
+            for params in candidates:
+                if deadline is not None and time.perf_counter() > deadline and (results or rung > 0):
+                    self.timed_out_ = True
+                    break
+                estimator = clone(self.estimator).set_params(**params)
+                scores, best_iterations = self.folds.cross_val_score(estimator, n_rows, self.early_stopping)
+                self.n_fits_ += len(scores)
+                results.append((scores.mean(), params, scores, best_iterations))
+
+            if results:
+                results.sort(key=lambda result: result[0], reverse=True)
+                self.best_score_, self.best_params_, self.best_scores_, best_iterations = results[0]
+                self.best_rows_ = n_rows
+                if best_iterations:
+                    self.best_n_estimators_ = int(np.mean(best_iterations))
+                self.n_rungs_ = rung + 1
+
+            if self.timed_out_:
+                break
+            candidates = [params for _, params, _, _ in results[:max(1, len(results) // self.factor)]]
+
+        self.elapsed_ = time.perf_counter() - start
+        return self
+
+    def summary(self):
+        """JSON-serializable description of the search, for training metadata"""
+        return {
+            'best_params': self.best_params_,
+            'best_score': float(self.best_score_),
+            'best_rows': int(self.best_rows_),
+            'best_n_estimators': self.best_n_estimators_,
+            'n_candidates': self.n_candidates,
+            'n_rungs': self.n_rungs_,
+            'n_fits': self.n_fits_,
+            'timed_out': self.timed_out_,
+            'seconds': round(self.elapsed_, 3)
+        }
@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from metrics import Histogram
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+QUEUE_WAIT_MS_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100)
+
+
+class _PendingPrediction:
+    __slots__ = ('predictor', 'X', 'enqueued_at', 'done', 'result', 'error')
+
+    def __init__(self, predictor, X):
+        self.predictor = predictor
+        self.X = X
+        self.enqueued_at = time.monotonic()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-car predictions into one scoring call
+
+    Request threads hand their encoded feature rows to submit() and block.
+    A background thread collects rows until max_batch_rows are waiting or
+    the oldest has waited max_wait_ms. It then scores them as one matrix
+    with each predictor's _score_cached and wakes every waiting thread
+    with its own rows' results. Rows for different predictors (a model
+    swap mid-batch) are scored separately, so each request is answered by
+    the predictor it started with.
+
+    Coalescing only helps when one process serves concurrent requests, for
+    example gunicorn's gthread workers. The collector thread is started on
+    first use in each process, so it is never inherited across a fork.
+    """
+
+    def __init__(self, max_batch_rows=64, max_wait_ms=2.0):
+        self.max_batch_rows = max_batch_rows
+        self.max_wait_ms = max_wait_ms
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    @classmethod
+    def from_env(cls):
+        """Build a batcher from MICRO_BATCH_* environment variables, or None if disabled"""
+        max_batch_rows = int(os.environ.get('MICRO_BATCH_MAX_ROWS', 0))
+        if max_batch_rows <= 1:
+            return None
+        return cls(max_batch_rows=max_batch_rows,
+                   max_wait_ms=float(os.environ.get('MICRO_BATCH_WAIT_MS', 2.0)))
+
+    def _reset(self):
+        """Fresh lock, queue and collector state (also run in a forked child)"""
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._pending_rows = 0
+        self._worker = None
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_MS_BUCKETS)
+
+    def submit(self, predictor, X):
+        """Score the encoded rows X with predictor as part of a batch; blocks until done"""
+        item = _PendingPrediction(predictor, X)
+        with self._cond:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._worker.start()
+            self._pending.append(item)
+            self._pending_rows += len(X)
+            self._cond.notify()
+
+        item.done.wait()
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self._score(batch)
+
+    def _collect(self):
+        """Wait for the next batch: max_batch_rows rows, or whatever arrived within max_wait_ms"""
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+
+            deadline = self._pending[0].enqueued_at + self.max_wait_ms / 1000
+            while self._pending_rows < self.max_batch_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch, rows = [], 0
+            while self._pending and (not batch or rows + len(self._pending[0].X) <= self.max_batch_rows):
+                item = self._pending.popleft()
+                batch.append(item)
+                rows += len(item.X)
+            self._pending_rows -= rows
+            return batch
+
+    def _score(self, batch):
+        now = time.monotonic()
+        self.queue_wait_ms.observe_many([(now - item.enqueued_at) * 1000 for item in batch])
+
+        groups = {}
+        for item in batch:
+            groups.setdefault(id(item.predictor), []).append(item)
+
+        for items in groups.values():
+            try:
+                X = np.concatenate([item.X for item in items])
+                results = items[0].predictor._score_cached(X)
+                self.batch_size.observe(len(X))
+                self.batches += 1
+                self.rows += len(X)
+                start = 0
+                for item in items:
+                    item.result = results[start:start + len(item.X)]
+                    start += len(item.X)
+            except Exception as e:
+                for item in items:
+                    item.error = e
+
+        self.requests += len(batch)
+        for item in batch:
+            item.done.set()
+
+    def stats(self):
+        """Settings, counters and batch-size / queue-wait histograms"""
+        return {
+            'max_batch_rows': self.max_batch_rows,
+            'max_wait_ms': self.max_wait_ms,
+            'batches': self.batches,
+            'requests': self.requests,
+            'rows': self.rows,
+            'mean_batch_rows': self.rows / self.batches if self.batches else 0.0,
+            'batch_size': self.batch_size.snapshot(),
+            'queue_wait_ms': self.queue_wait_ms.snapshot()
+        }
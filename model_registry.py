@@ -0,0 +1,335 @@
+import fcntl
+import hashlib
+import json
+import os
+import platform
+import shutil
+import sys
+import threading
+import uuid
+from collections.abc import Mapping
+from contextlib import contextmanager
+from datetime import datetime
+from functools import partial
+
+import joblib
+import numpy as np
+
+
+def training_metadata(**extra):
+    """Metadata stored with every published version: when and with what it was trained"""
+    import sklearn
+    import xgboost as xgb
+
+    metadata = {
+        'trained_at': datetime.now().isoformat(),
+        'python_version': platform.python_version(),
+        'library_versions': {
+            'numpy': np.__version__,
+            'scikit-learn': sklearn.__version__,
+            'xgboost': xgb.__version__
+        }
+    }
+    metadata.update(extra)
+    return metadata
+
+
+def ensemble_weights(performance_metrics):
+    """Blending weight of each model, inversely proportional to its validation error
+
+    The error is 1 - R² over the cross-validation folds (the test set when
+    a version has no CV score of its own, or only one inherited from the
+    version it updates), i.e. the validation MSE relative to the target
+    variance. Weights sum to one.
+    """
+    inverse_errors = {}
+    for name, metrics in performance_metrics.items():
+        score = metrics.get('cv_score', float('nan'))
+        if not np.isfinite(score) or metrics.get('cv_inherited_from'):
+            score = metrics['r2']
+        inverse_errors[name] = 1.0 / max(1.0 - float(score), 1e-6)
+    total = sum(inverse_errors.values())
+    return {name: inverse / total for name, inverse in inverse_errors.items()}
+
+
+class LazyModels(Mapping):
+    """Model name -> estimator mapping that unpickles each model on first access
+
+    Membership, iteration and len() only use the manifest, so serving code
+    that never touches a library model never imports scikit-learn or xgboost.
+    """
+
+    def __init__(self, loaders):
+        self._loaders = dict(loaders)
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        model = self._models.get(name)
+        if model is None:
+            with self._lock:
+                model = self._models.get(name)
+                if model is None:
+                    model = self._models[name] = self._loaders[name]()
+        return model
+
+    def __contains__(self, name):
+        return name in self._loaders
+
+    def __iter__(self):
+        return iter(self._loaders)
+
+    def __len__(self):
+        return len(self._loaders)
+
+    def loaded(self):
+        """Names of the models unpickled so far"""
+        return list(self._models)
+
+
+class ModelRegistry:
+    """Versioned on-disk store for trained model sets
+
+    Layout::
+
+        models/
+            CURRENT                     # id of the active version
+            versions/<version>/
+                manifest.json           # files, sha256 checksums, metadata
+                <name>_model.pkl
+                encoders.pkl
+                scaler.pkl
+                performance_metrics.pkl
+                tree_engine.pkl         # all ensembles compiled to flat arrays
+                valuation_grid.pkl      # precomputed predictions for common configurations
+                feature_names.json
+                categories.json         # LabelEncoder classes, for serving without sklearn
+
+    A version is written into a temporary directory and renamed into place
+    only once every file is on disk, so readers never see a half-written
+    set. Version directories are never modified afterwards. The CURRENT
+    pointer is replaced atomically with os.replace, which is also how
+    activate() and rollback() switch versions. Serving processes compare
+    pointer_stamp() on each request and load the new version when it
+    changes. training_lock() serializes retrains across processes.
+    """
+
+    PICKLE_ARTIFACTS = ('encoders', 'scaler', 'performance_metrics', 'tree_engine', 'valuation_grid')
+    JSON_ARTIFACTS = ('feature_names', 'categories')
+    # Pickles that need the training libraries to unpickle; deferred by load(lazy=True)
+    DEFERRED_ARTIFACTS = ('encoders', 'scaler')
+
+    def __init__(self, root='models'):
+        self.root = root
+        self.versions_dir = os.path.join(root, 'versions')
+        self.pointer_path = os.path.join(root, 'CURRENT')
+        self.lock_path = os.path.join(root, '.training.lock')
+
+    @classmethod
+    def from_env(cls):
+        """The registry at $MODEL_REGISTRY, or models/"""
+        return cls(os.environ.get('MODEL_REGISTRY') or 'models')
+
+    def publish(self, state, metadata=None, activate=True):
+        """Write a new immutable version from a predictor state dict and return its id"""
+        os.makedirs(self.versions_dir, exist_ok=True)
+
+        version = datetime.now().strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:6]
+        tmp_dir = os.path.join(self.versions_dir, f'.tmp-{version}')
+        os.makedirs(tmp_dir)
+
+        try:
+            artifacts = {}
+            for name, model in state['models'].items():
+                artifacts[f'model:{name}'] = f'{name}_model.pkl'
+                joblib.dump(model, os.path.join(tmp_dir, f'{name}_model.pkl'))
+
+            for key in self.PICKLE_ARTIFACTS:
+                if key in state:
+                    artifacts[key] = f'{key}.pkl'
+                    joblib.dump(state[key], os.path.join(tmp_dir, f'{key}.pkl'))
+
+            for key in self.JSON_ARTIFACTS:
+                if key in state:
+                    artifacts[key] = f'{key}.json'
+                    with open(os.path.join(tmp_dir, f'{key}.json'), 'w') as f:
+                        json.dump(state[key], f)
+
+            manifest = {
+                'version': version,
+                'created_at': datetime.now().isoformat(),
+                'models': list(state['models']),
+                'artifacts': artifacts,
+                'checksums': {filename: self._sha256(os.path.join(tmp_dir, filename))
+                              for filename in artifacts.values()},
+                'metadata': metadata or {}
+            }
+            with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f, indent=2)
+
+            os.rename(tmp_dir, self.version_path(version))
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def load(self, version=None, mmap_mode='r', verify=True, lazy=False):
+        """Load a version (the current one by default) into a predictor state dict
+
+        Returns None when there is no version to load. Arrays are memory-mapped
+        read-only so workers loading the same version share pages.
+
+        With lazy, models come back as a LazyModels mapping, and the
+        DEFERRED_ARTIFACTS of versions that also have categories.json are
+        not loaded: state['deferred'] maps their keys to loader functions.
+        
+        With verify, each artifact's checksum is checked when it is read, so
+        a lazy load only hashes the files it actually loads.
+        """
+        if version is None:
+            version = self.current_version()
+            if version is None:
+                return None
+
+        manifest = self.manifest(version)
+        path = self.version_path(version)
+
+        state = {'models': {}, 'model_version': version, 'metadata': manifest['metadata']}
+        model_loaders, deferred = {}, {}
+        defer = lazy and 'categories' in manifest['artifacts']
+        for key, filename in manifest['artifacts'].items():
+            filepath = os.path.join(path, filename)
+            checksum = manifest['checksums'][filename] if verify else None
+            loader = partial(self._load_pickle, filepath, checksum, version, mmap_mode)
+            if key.startswith('model:'):
+                model_loaders[key[len('model:'):]] = loader
+            elif defer and key in self.DEFERRED_ARTIFACTS:
+                deferred[key] = loader
+            elif filename.endswith('.json'):
+                self._verify(filepath, checksum, version)
+                with open(filepath, 'r') as f:
+                    state[key] = json.load(f)
+            else:
+                state[key] = loader()
+
+        if lazy:
+            state['models'] = LazyModels(model_loaders)
+            state['deferred'] = deferred
+        else:
+            state['models'] = {name: load() for name, load in model_loaders.items()}
+        return state
+
+    def current_version(self):
+        """Return the active version id, or None"""
+        try:
+            with open(self.pointer_path, 'r') as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return version or None
+
+    def pointer_stamp(self):
+        """A cheap fingerprint of CURRENT (inode and mtime) that changes whenever it is replaced, or None"""
+        try:
+            stat = os.stat(self.pointer_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    @contextmanager
+    def training_lock(self):
+        """Hold an exclusive lock on the registry while training, blocking until other processes release it"""
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.lock_path, 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def activate(self, version):
+        """Atomically point CURRENT at an existing version"""
+        if not os.path.isfile(os.path.join(self.version_path(version), 'manifest.json')):
+            raise ValueError(f'Unknown model version: {version}')
+
+        tmp_path = f'{self.pointer_path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.pointer_path)
+
+    def rollback(self):
+        """Activate the version published before the current one and return its id"""
+        versions = [manifest['version'] for manifest in self.list_versions()]
+        current = self.current_version()
+        if current not in versions or versions.index(current) == 0:
+            raise ValueError('No earlier model version to roll back to')
+
+        previous = versions[versions.index(current) - 1]
+        self.activate(previous)
+        return previous
+
+    def list_versions(self):
+        """Return the manifests of all published versions, oldest first"""
+        if not os.path.isdir(self.versions_dir):
+            return []
+
+        manifests = []
+        for name in os.listdir(self.versions_dir):
+            if name.startswith('.'):
+                continue
+            try:
+                manifests.append(self.manifest(name))
+            except FileNotFoundError:
+                continue
+        return sorted(manifests, key=lambda manifest: manifest['created_at'])
+
+    def manifest(self, version):
+        """Read a version's manifest"""
+        with open(os.path.join(self.version_path(version), 'manifest.json'), 'r') as f:
+            return json.load(f)
+
+    def version_path(self, version):
+        return os.path.join(self.versions_dir, version)
+
+    @classmethod
+    def _verify(cls, filepath, checksum, version):
+        """Raise ValueError if a file does not match its manifest checksum (None skips the check)"""
+        if checksum is not None and cls._sha256(filepath) != checksum:
+            raise ValueError(f'Checksum mismatch for {os.path.basename(filepath)} in model version {version}')
+
+    @classmethod
+    def _load_pickle(cls, filepath, checksum, version, mmap_mode):
+        cls._verify(filepath, checksum, version)
+        return joblib.load(filepath, mmap_mode=mmap_mode)
+
+    @staticmethod
+    def _sha256(filepath):
+        digest = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+
+if __name__ == '__main__':
+    registry = ModelRegistry.from_env()
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+
+    if command == 'list':
+        current = registry.current_version()
+        for manifest in registry.list_versions():
+            marker = '*' if manifest['version'] == current else ' '
+            print(f"{marker} {manifest['version']}  {manifest['created_at']}  {', '.join(manifest['models'])}")
+    elif command == 'rollback':
+        print(f"Rolled back to {registry.rollback()}")
+    elif command == 'activate' and len(sys.argv) > 2:
+        registry.activate(sys.argv[2])
+        print(f"Activated {sys.argv[2]}")
+    else:
+        print("Usage: python model_registry.py [list | rollback | activate <version>]")
+        sys.exit(1)
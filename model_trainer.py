@@ -1,174 +1,345 @@
-import pandas as pd
+import argparse
+import os
+import time
 import numpy as np
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
+from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
 import xgboost as xgb
-import joblib
-import matplotlib.pyplot as plt
-import seaborn as sns
 from data_processor import DataProcessor
-import os
+from feature_encoder import encoder_categories
+from feature_store import FeatureSet, FeatureStore, file_fingerprint
+from tree_engine import FusedTreeEnsemble
+from valuation_grid import MAX_CONFIGURATIONS
+from model_registry import ModelRegistry, ensemble_weights, training_metadata
+from hyperparameter_search import EARLY_STOPPING_ROUNDS, SEARCH_SPACES, XGBOOST_MAX_ESTIMATORS, kfold_ids
+from training_graph import TrainingGraph
 
 class ModelTrainer:
     def __init__(self):
         self.models = {}
         self.performance_metrics = {}
         self.data_processor = DataProcessor()
+        self.registry = ModelRegistry.from_env()
+        self.model_version = None
+        self.training_metadata = {}
+        self.time_budget = None
+        self.n_candidates = 27
+        self.search_results = {}
+        self.tree_engine = None
+        self.quantize_leaves = False
+        self.valuation_grid = None
+        self.grid_configurations = MAX_CONFIGURATIONS
+        self.feature_store = FeatureStore.from_env()
+        
+    def train_all_models(self, optimize_hyperparameters=False, data_path=None,
+                         time_budget=None, n_candidates=27):
+        """Train all regression models on data_path, or on synthetic data if not given
         
-    def train_all_models(self, optimize_hyperparameters=False):
-        """Train all regression models"""
+        With optimize_hyperparameters, each model family runs a successive
+        halving search over n_candidates sampled settings, stopping after
+        time_budget seconds if given. Searches, fits and CV folds of all
+        families run as one task graph across worker processes (see
+        training_graph).
+        """
         print("Loading and preprocessing data...")
         
-        # Load data
-        df = self.data_processor.load_indian_car_data()
-        X = self.data_processor.prepare_features(df, fit_encoders=True)
-        y = df['price']
+        # Load the encoded, split data (from the feature store if it has it)
+        features = self._load_features(data_path)
+        X_train, X_test, y_train, y_test = features.X_train, features.X_test, features.y_train, features.y_test
         
-        print(f"Dataset shape: {X.shape}")
-        print(f"Target range: ₹{y.min():,.0f} - ₹{y.max():,.0f}")
+        print(f"Dataset shape: {(len(X_train) + len(X_test), X_train.shape[1])}")
+        print(f"Target range: ₹{min(y_train.min(), y_test.min()):,.0f} - "
+              f"₹{max(y_train.max(), y_test.max()):,.0f}")
         
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        self.training_metadata = training_metadata(
+            source='model_trainer.ModelTrainer',
+            data_path=data_path,
+            reference_year=self.data_processor.reference_year,
+            n_train_rows=len(X_train),
+            n_test_rows=len(X_test),
+            optimize_hyperparameters=optimize_hyperparameters,
+            feature_store_key=features.key
+        )
         
         # Scale features
         X_train_scaled = self.data_processor.scaler.fit_transform(X_train)
         X_test_scaled = self.data_processor.scaler.transform(X_test)
         
-        # Train models
-        self._train_random_forest(X_train, X_test, y_train, y_test, optimize_hyperparameters)
-        self._train_gradient_boosting(X_train, X_test, y_train, y_test, optimize_hyperparameters)
-        self._train_xgboost(X_train, X_test, y_train, y_test, optimize_hyperparameters)
+        # Searches, fits and CV fold fits of every family as one process-pool task graph
+        self.time_budget = time_budget
+        self.n_candidates = n_candidates
+        graph = TrainingGraph(X_train, y_train, X_test, y_test, fold_ids=features.folds, n_splits=5)
+        for name, (estimator, search_estimator) in self._build_estimators().items():
+            if optimize_hyperparameters:
+                graph.add_family(name, estimator, search_estimator, SEARCH_SPACES[name],
+                                 n_candidates=n_candidates, time_budget=time_budget)
+            else:
+                graph.add_family(name, estimator)
+        print(f"Training {', '.join(graph.families)} on {graph.max_workers} worker(s)...")
+        self.models, self.performance_metrics, searches = graph.run()
+        graph.print_report()
+        
+        self.search_results = {name: search['summary'] for name, search in searches.items()}
+        for name, summary in self.search_results.items():
+            print(f"Best {name.replace('_', ' ').title()} parameters: {summary['best_params']} "
+                  f"({summary['n_fits']} fits in {summary['seconds']:.1f}s"
+                  f"{', time budget reached' if summary['timed_out'] else ''})")
+        if self.search_results:
+            self.training_metadata['search'] = self.search_results
+        self.training_metadata['training_tasks'] = graph.report()
+        
+        # Compile the ensembles for serving, checked against the held-out set
+        self.export_tree_engine(X_test)
+        self.build_valuation_grid(X_train)
         
         # Save models and preprocessors
         self._save_models()
-        self.data_processor.save_preprocessors()
         
         # Generate performance report
         self._generate_performance_report()
         
         return self.performance_metrics
     
-    def _train_random_forest(self, X_train, X_test, y_train, y_test, optimize=False):
-        """Train Random Forest model"""
-        print("Training Random Forest...")
-        
-        if optimize:
-            param_grid = {
-                'n_estimators': [50, 100, 200],
-                'max_depth': [10, 15, 20, None],
-                'min_samples_split': [2, 5, 10],
-                'min_samples_leaf': [1, 2, 4]
-            }
-            
-            rf = RandomForestRegressor(random_state=42)
-            grid_search = GridSearchCV(rf, param_grid, cv=5, scoring='r2', n_jobs=-1)
-            grid_search.fit(X_train, y_train)
+    def update_models(self, data_path, base_version=None, new_trees=20):
+        """Continue training a published version on a file of new listings
+        
+        Loads base_version (the current one by default) and extends its
+        encoders with categories not seen before, keeping every existing
+        code. Each family then gets new_trees more trees fitted on 80% of
+        the new data: random forest and gradient boosting through
+        warm_start, XGBoost by boosting on from the existing booster.
+        Metrics are measured on the other 20%. CV scores are not re-measured:
+        the base version's are kept, marked with cv_inherited_from, and
+        ensemble weights use the new test R² instead. The result is
+        published as a new version.
+        """
+        print("Loading base model version...")
+        state = self.registry.load(base_version, mmap_mode=None)
+        if state is None:
+            raise ValueError('No published model version to update')
+        
+        processor = self.data_processor
+        processor.encoders = state['encoders']
+        processor.scaler = state['scaler']
+        processor.reference_year = state['metadata'].get('reference_year', processor.reference_year)
+        processor.feature_encoder = None
+        base_categories = encoder_categories(processor.encoders)
+        
+        features = self._load_features(data_path, extend=True)
+        X_train, X_test, y_train, y_test = features.X_train, features.X_test, features.y_train, features.y_test
+        added = {feature: categories[len(base_categories[feature]):]
+                 for feature, categories in features.categories.items()
+                 if len(categories) > len(base_categories[feature])}
+        for feature, categories in added.items():
+            print(f"New {feature} categories: {', '.join(categories)}")
+        uncatalogued = self._uncatalogued(added)
+        if uncatalogued:
+            print(f"Warning: not in the catalog, so the API rejects cars with {', '.join(uncatalogued)}; "
+                  f"add them to the catalog CSV (CATALOG_PATH) or set CATALOG_VALIDATION=0")
+        
+        self.training_metadata = training_metadata(
+            source='model_trainer.ModelTrainer.update_models',
+            data_path=data_path,
+            reference_year=processor.reference_year,
+            n_train_rows=len(X_train),
+            n_test_rows=len(X_test),
+            base_version=state['model_version'],
+            new_trees=new_trees,
+            added_categories=added,
+            uncatalogued=uncatalogued,
+            feature_store_key=features.key
+        )
+        
+        self.models = dict(state['models'])
+        base_metrics = state.get('performance_metrics', {})
+        self.performance_metrics = {}
+        for name, model in self.models.items():
+            print(f"Adding {new_trees} trees to {name.replace('_', ' ').title()}...")
+            start = time.perf_counter()
+            self._extend_model(model, X_train, y_train, new_trees)
             
-            self.models['random_forest'] = grid_search.best_estimator_
-            print(f"Best RF parameters: {grid_search.best_params_}")
+            y_pred = model.predict(X_test)
+            base = base_metrics.get(name, {})
+            self.performance_metrics[name] = {
+                'rmse': np.sqrt(mean_squared_error(y_test, y_pred)),
+                'r2': r2_score(y_test, y_pred),
+                'mae': mean_absolute_error(y_test, y_pred),
+                'cv_score': base.get('cv_score', float('nan')),
+                'cv_std': base.get('cv_std', float('nan')),
+                'cv_inherited_from': base.get('cv_inherited_from', state['model_version']),
+                'train_seconds': time.perf_counter() - start
+            }
+        for name, weight in ensemble_weights(self.performance_metrics).items():
+            self.performance_metrics[name]['ensemble_weight'] = weight
+        
+        self.export_tree_engine(X_test)
+        self.build_valuation_grid(X_train)
+        self._save_models()
+        self._generate_performance_report()
+        
+        return self.performance_metrics
+    
+    @staticmethod
+    def _uncatalogued(added):
+        """Added makes and models that catalog validation (catalog.Catalog.check) would reject"""
+        from catalog import Catalog
+        
+        catalog = Catalog.from_env()
+        known = {'make': set(catalog.makes),
+                 'model': {model for models in catalog.models.values() for model in models}}
+        return [f"{feature} {name}" for feature in ('make', 'model')
+                for name in added.get(feature, []) if name not in known[feature]]
+    
+    def _load_features(self, data_path, extend=False):
+        """Encoded train/test matrices and CV fold ids for data_path (None: synthetic data)
+        
+        The encoders are fitted on the data or, with extend, the loaded ones
+        are extended with its new categories. Entries in the feature store
+        for the same file and encoders are read back memory-mapped instead
+        of re-encoding; new ones are stored. Synthetic data is cheaper to
+        regenerate than to store.
+        """
+        processor = self.data_processor
+        store = self.feature_store if data_path else None
+        key = None
+        if store is not None:
+            source = file_fingerprint(data_path)
+            categories = encoder_categories(processor.encoders) if extend else None
+            key = store.key(source, processor.reference_year, categories)
+            features = store.get(key)
+            if features is not None:
+                print(f"Using encoded features {key} from {store.root}/")
+                processor.restore_encoders(features.categories)
+                return features
+        
+        df = processor.load_indian_car_data(data_path)
+        if extend:
+            processor.extend_encoders(df)
+        X = processor.prepare_features(df, fit_encoders=not extend).to_numpy()
+        y = df['price'].to_numpy(dtype=np.float64)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        features = FeatureSet(X_train, X_test, y_train, y_test, kfold_ids(len(X_train)),
+                              encoder_categories(processor.encoders), processor.reference_year)
+        if store is not None:
+            features = store.put(key, features, metadata={'data_path': data_path})
+        return features
+    
+    @staticmethod
+    def _extend_model(model, X, y, new_trees):
+        """Add new_trees trees fitted on X, y to a trained ensemble, in place"""
+        if isinstance(model, xgb.XGBRegressor):
+            booster = model.get_booster()
+            best_iteration = booster.attr('best_iteration')
+            if best_iteration is not None:
+                # Drop the trees early stopping discarded before boosting on
+                booster = booster[:int(best_iteration) + 1]
+            model.set_params(n_estimators=new_trees)
+            model.fit(X, y, xgb_model=booster)
+            model.set_params(n_estimators=model.get_booster().num_boosted_rounds())
         else:
-            self.models['random_forest'] = RandomForestRegressor(
-                n_estimators=100, max_depth=15, min_samples_split=5, 
-                min_samples_leaf=2, random_state=42
-            )
-            self.models['random_forest'].fit(X_train, y_train)
-        
-        # Calculate metrics
-        y_pred = self.models['random_forest'].predict(X_test)
-        cv_scores = cross_val_score(self.models['random_forest'], X_train, y_train, cv=5)
-        
-        self.performance_metrics['random_forest'] = {
-            'rmse': np.sqrt(mean_squared_error(y_test, y_pred)),
-            'r2': r2_score(y_test, y_pred),
-            'mae': mean_absolute_error(y_test, y_pred),
-            'cv_score': cv_scores.mean(),
-            'cv_std': cv_scores.std()
+            model.set_params(warm_start=True, n_estimators=len(model.estimators_) + new_trees)
+            model.fit(X, y)
+            model.set_params(warm_start=False)
+    
+    def _build_estimators(self):
+        """{family: (estimator, search estimator or None)} with the default settings"""
+        random_forest = RandomForestRegressor(
+            n_estimators=100, max_depth=15, min_samples_split=5,
+            min_samples_leaf=2, random_state=42
+        )
+        gradient_boosting = GradientBoostingRegressor(
+            n_estimators=100, learning_rate=0.1, max_depth=5,
+            subsample=0.9, random_state=42
+        )
+        xgboost = xgb.XGBRegressor(
+            n_estimators=100, learning_rate=0.1, max_depth=5,
+            subsample=0.9, colsample_bytree=0.9, random_state=42
+        )
+        # XGBoost candidates grow up to XGBOOST_MAX_ESTIMATORS trees and stop
+        # early on the validation fold; the final model uses the mean best iteration
+        xgboost_search = clone(xgboost).set_params(
+            n_estimators=XGBOOST_MAX_ESTIMATORS, early_stopping_rounds=EARLY_STOPPING_ROUNDS
+        )
+        return {
+            'random_forest': (random_forest, None),
+            'gradient_boosting': (gradient_boosting, None),
+            'xgboost': (xgboost, xgboost_search)
         }
     
-    def _train_gradient_boosting(self, X_train, X_test, y_train, y_test, optimize=False):
-        """Train Gradient Boosting model"""
-        print("Training Gradient Boosting...")
-        
-        if optimize:
-            param_grid = {
-                'n_estimators': [50, 100, 200],
-                'learning_rate': [0.05, 0.1, 0.15],
-                'max_depth': [3, 5, 7],
-                'subsample': [0.8, 0.9, 1.0]
-            }
-            
-            gb = GradientBoostingRegressor(random_state=42)
-            grid_search = GridSearchCV(gb, param_grid, cv=5, scoring='r2', n_jobs=-1)
-            grid_search.fit(X_train, y_train)
-            
-            self.models['gradient_boosting'] = grid_search.best_estimator_
-            print(f"Best GB parameters: {grid_search.best_params_}")
-        else:
-            self.models['gradient_boosting'] = GradientBoostingRegressor(
-                n_estimators=100, learning_rate=0.1, max_depth=5, 
-                subsample=0.9, random_state=42
-            )
-            self.models['gradient_boosting'].fit(X_train, y_train)
-        
-        # Calculate metrics
-        y_pred = self.models['gradient_boosting'].predict(X_test)
-        cv_scores = cross_val_score(self.models['gradient_boosting'], X_train, y_train, cv=5)
-        
-        self.performance_metrics['gradient_boosting'] = {
-            'rmse': np.sqrt(mean_squared_error(y_test, y_pred)),
-            'r2': r2_score(y_test, y_pred),
-            'mae': mean_absolute_error(y_test, y_pred),
-            'cv_score': cv_scores.mean(),
-            'cv_std': cv_scores.std()
+    def export_tree_engine(self, X_check, rtol=None):
+        """Flatten all trained ensembles into one compact FusedTreeEnsemble
+        
+        Leaf values are quantized to 16 bits when quantize_leaves is set.
+        The engine must reproduce every model's predictions on X_check within
+        rtol (1e-5, or 1e-4 with quantized leaves), otherwise ValueError is
+        raised and nothing is published.
+        """
+        start = time.perf_counter()
+        full = FusedTreeEnsemble.from_models(self.models)
+        self.tree_engine = full.compact(quantize_leaves=self.quantize_leaves)
+        if rtol is None:
+            rtol = 1e-4 if self.quantize_leaves else 1e-5
+        error = self.tree_engine.verify(self.models, X_check, rtol=rtol)
+        self.training_metadata['tree_engine'] = {
+            'models': list(self.tree_engine.groups),
+            'nodes': int(len(self.tree_engine.feature)),
+            'bytes': int(self.tree_engine.nbytes),
+            'uncompacted_bytes': int(full.nbytes),
+            'quantized_leaves': self.quantize_leaves,
+            'max_relative_error': float(error)
         }
+        print(f"Compiled {len(self.tree_engine.feature):,} tree nodes into "
+              f"{self.tree_engine.nbytes / 2**20:.1f} MiB (from {full.nbytes / 2**20:.1f} MiB) in "
+              f"{time.perf_counter() - start:.1f}s (max relative error {error:.1e})")
+        return self.tree_engine
     
-    def _train_xgboost(self, X_train, X_test, y_train, y_test, optimize=False):
-        """Train XGBoost model"""
-        print("Training XGBoost...")
-        
-        if optimize:
-            param_grid = {
-                'n_estimators': [50, 100, 200],
-                'learning_rate': [0.05, 0.1, 0.15],
-                'max_depth': [3, 5, 7],
-                'subsample': [0.8, 0.9, 1.0],
-                'colsample_bytree': [0.8, 0.9, 1.0]
-            }
-            
-            xgb_model = xgb.XGBRegressor(random_state=42)
-            grid_search = GridSearchCV(xgb_model, param_grid, cv=5, scoring='r2', n_jobs=-1)
-            grid_search.fit(X_train, y_train)
-            
-            self.models['xgboost'] = grid_search.best_estimator_
-            print(f"Best XGB parameters: {grid_search.best_params_}")
-        else:
-            self.models['xgboost'] = xgb.XGBRegressor(
-                n_estimators=100, learning_rate=0.1, max_depth=5,
-                subsample=0.9, colsample_bytree=0.9, random_state=42
-            )
-            self.models['xgboost'].fit(X_train, y_train)
-        
-        # Calculate metrics
-        y_pred = self.models['xgboost'].predict(X_test)
-        cv_scores = cross_val_score(self.models['xgboost'], X_train, y_train, cv=5)
-        
-        self.performance_metrics['xgboost'] = {
-            'rmse': np.sqrt(mean_squared_error(y_test, y_pred)),
-            'r2': r2_score(y_test, y_pred),
-            'mae': mean_absolute_error(y_test, y_pred),
-            'cv_score': cv_scores.mean(),
-            'cv_std': cv_scores.std()
+    def build_valuation_grid(self, X_train):
+        """Precompute serving predictions for the most common configurations in X_train
+        
+        The grid is scored by the serving predictor itself, so lookups match
+        live inference up to the mileage interpolation. Skipped when
+        grid_configurations is 0.
+        """
+        from price_predictor import CarPricePredictor
+        
+        self.valuation_grid = None
+        if self.grid_configurations > 0:
+            predictor = CarPricePredictor.from_state(self._export_state())
+            self.valuation_grid = predictor.build_valuation_grid(X_train, self.grid_configurations)
+            stats = self.valuation_grid.stats
+            self.training_metadata['valuation_grid'] = stats
+            print(f"Precomputed {stats['cells']:,} valuations for {stats['configurations']} configurations in "
+                  f"{stats['build_seconds']:.1f}s (interpolation error {stats['relative_error']:.1%})")
+        return self.valuation_grid
+    
+    def _export_state(self):
+        return {
+            'models': self.models,
+            'encoders': self.data_processor.encoders,
+            'scaler': self.data_processor.scaler,
+            'categories': encoder_categories(self.data_processor.encoders),
+            'feature_names': self.data_processor.feature_names,
+            'performance_metrics': self.performance_metrics,
+            'tree_engine': self.tree_engine,
+            'valuation_grid': self.valuation_grid,
+            'metadata': self.training_metadata
         }
     
     def _save_models(self):
-        """Save trained models"""
-        if not os.path.exists('models'):
-            os.makedirs('models')
+        """Publish trained models and preprocessors as a new registry version"""
+        self.model_version = self.registry.publish(self._export_state(), metadata=self.training_metadata)
         
-        for name, model in self.models.items():
-            joblib.dump(model, f'models/{name}_model.pkl')
+        for name in self.models:
             print(f"Saved {name} model")
+        print(f"Published model version {self.model_version}")
+    
+    @staticmethod
+    def _inherited(metrics):
+        """Report suffix for a CV score carried over by update_models"""
+        base = metrics.get('cv_inherited_from')
+        return f" [inherited from {base}]" if base else ""
     
     def _generate_performance_report(self):
         """Generate and save performance report"""
@@ -181,7 +352,9 @@ class ModelTrainer:
             print(f"  RMSE: ₹{metrics['rmse']:,.0f}")
             print(f"  R² Score: {metrics['r2']:.3f}")
             print(f"  MAE: ₹{metrics['mae']:,.0f}")
-            print(f"  CV Score: {metrics['cv_score']:.3f} (±{metrics['cv_std']:.3f})")
+            print(f"  CV Score: {metrics['cv_score']:.3f} (±{metrics['cv_std']:.3f}){self._inherited(metrics)}")
+            print(f"  Train time: {metrics['train_seconds']:.1f}s")
+            print(f"  Ensemble weight: {metrics['ensemble_weight']:.3f}")
         
         # Find best model
         best_model = max(self.performance_metrics.items(), key=lambda x: x[1]['r2'])
@@ -189,7 +362,7 @@ class ModelTrainer:
         print(f"R² Score: {best_model[1]['r2']:.3f}")
         
         # Save report to file
-        with open('models/performance_report.txt', 'w') as f:
+        with open(os.path.join(self.registry.root, 'performance_report.txt'), 'w') as f:
             f.write("MODEL PERFORMANCE REPORT\n")
             f.write("="*60 + "\n\n")
             
@@ -198,19 +371,46 @@ class ModelTrainer:
                 f.write(f"  RMSE: ₹{metrics['rmse']:,.0f}\n")
                 f.write(f"  R² Score: {metrics['r2']:.3f}\n")
                 f.write(f"  MAE: ₹{metrics['mae']:,.0f}\n")
-                f.write(f"  CV Score: {metrics['cv_score']:.3f} (±{metrics['cv_std']:.3f})\n\n")
+                f.write(f"  CV Score: {metrics['cv_score']:.3f} (±{metrics['cv_std']:.3f}){self._inherited(metrics)}\n")
+                f.write(f"  Train time: {metrics['train_seconds']:.1f}s\n")
+                f.write(f"  Ensemble weight: {metrics['ensemble_weight']:.3f}\n\n")
             
             f.write(f"BEST MODEL: {best_model[0].replace('_', ' ').title()}\n")
             f.write(f"R² Score: {best_model[1]['r2']:.3f}\n")
 
 if __name__ == "__main__":
-    trainer = ModelTrainer()
-    
-    print("Starting model training...")
-    print("This may take a few minutes...")
+    parser = argparse.ArgumentParser(description="Train and publish all price models")
+    parser.add_argument('--data', default=None, help="CSV or Parquet training data (default: synthetic)")
+    parser.add_argument('--optimize', action='store_true', help="run the hyperparameter search")
+    parser.add_argument('--time-budget', type=float, default=None,
+                        help="seconds each model family may spend searching")
+    parser.add_argument('--candidates', type=int, default=27, help="candidates sampled per model family")
+    parser.add_argument('--incremental', action='store_true',
+                        help="add trees for the new listings in --data to a published version")
+    parser.add_argument('--base-version', default=None, help="version to update (default: current)")
+    parser.add_argument('--new-trees', type=int, default=20, help="trees added per model family")
+    parser.add_argument('--quantize-leaves', action='store_true',
+                        help="store tree engine leaf values as 16-bit codes")
+    parser.add_argument('--grid-configurations', type=int, default=MAX_CONFIGURATIONS,
+                        help="configurations in the precomputed valuation grid (0 to skip it)")
+    args = parser.parse_args()
     
-    # Train models (set to True for hyperparameter optimization)
-    metrics = trainer.train_all_models(optimize_hyperparameters=False)
+    trainer = ModelTrainer()
+    trainer.grid_configurations = args.grid_configurations
+    trainer.quantize_leaves = args.quantize_leaves
     
-    print("\nTraining completed successfully!")
-    print("Models saved to 'models/' directory")
\ No newline at end of file
+    if args.incremental:
+        if not args.data:
+            parser.error("--incremental needs --data with the new listings")
+        trainer.update_models(args.data, base_version=args.base_version, new_trees=args.new_trees)
+        print(f"\nPublished version {trainer.model_version}, updated from "
+              f"{trainer.training_metadata['base_version']}")
+    else:
+        print("Starting model training...")
+        print("This may take a few minutes...")
+        
+        metrics = trainer.train_all_models(optimize_hyperparameters=args.optimize, data_path=args.data,
+                                           time_budget=args.time_budget, n_candidates=args.candidates)
+        
+        print("\nTraining completed successfully!")
+        print(f"Models saved to '{trainer.registry.root}/' directory")
@@ -0,0 +1,242 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SQLitePredictionStore:
+    """Prediction store shared between processes through a SQLite file
+
+    Used as a second cache tier so gunicorn workers on the same host see
+    each other's entries. Every thread gets its own connection, opened on
+    first use; WAL mode lets readers proceed while another worker writes.
+    The store is built at import time, before gunicorn forks its workers,
+    so the table is created on a connection that is closed straight away
+    and a forked child drops any connection it inherited.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+        conn = sqlite3.connect(path, timeout=5)
+        try:
+            with conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS predictions (
+                        version TEXT NOT NULL,
+                        key BLOB NOT NULL,
+                        value TEXT NOT NULL,
+                        expires_at REAL NOT NULL,
+                        PRIMARY KEY (version, key)
+                    )
+                """)
+        finally:
+            conn.close()
+
+    def _reset(self):
+        """Forget this thread's connections (also run in a forked child, which must open its own)"""
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, version, keys, now):
+        """Return {key: value} for the keys that are present and not expired"""
+        conn = self._connection()
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(
+                f'SELECT key, value FROM predictions WHERE version = ? AND expires_at > ? '
+                f'AND key IN ({placeholders})', [version, now] + chunk)
+            for key, value in rows:
+                found[bytes(key)] = json.loads(value)
+        return found
+
+    def set_many(self, version, items, expires_at):
+        with self._connection() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO predictions (version, key, value, expires_at) VALUES (?, ?, ?, ?)',
+                [(version, key, json.dumps(value), expires_at) for key, value in items])
+
+    def purge(self, keep_version, now):
+        """Drop expired entries and entries from other model versions"""
+        with self._connection() as conn:
+            conn.execute('DELETE FROM predictions WHERE version != ? OR expires_at <= ?', (keep_version, now))
+
+
+class PredictionCache:
+    """In-process LRU/TTL cache of model predictions
+
+    Keys are the bytes of the encoded float32 feature row, so two requests
+    that differ only in formatting (or in an unknown category that falls
+    back to the same code) share an entry. With mileage_bucket > 0 the
+    mileage feature is rounded to that bucket before scoring, so nearby
+    mileages share one prediction for the bucket's representative value.
+
+    Entries belong to a model version. The first lookup for a new version
+    drops everything cached for the previous one, so loading or promoting a
+    model never serves stale prices.
+    """
+
+    def __init__(self, max_size=10000, ttl=3600, mileage_bucket=0, store=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.mileage_bucket = mileage_bucket
+        self.store = store
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build a cache from PREDICTION_CACHE_* environment variables, or None if disabled"""
+        max_size = int(os.environ.get('PREDICTION_CACHE_SIZE', 10000))
+        if max_size <= 0:
+            return None
+
+        db_path = os.environ.get('PREDICTION_CACHE_DB')
+        return cls(
+            max_size=max_size,
+            ttl=float(os.environ.get('PREDICTION_CACHE_TTL', 3600)),
+            mileage_bucket=float(os.environ.get('PREDICTION_CACHE_MILEAGE_BUCKET', 0)),
+            store=SQLitePredictionStore(db_path) if db_path else None
+        )
+
+    def normalize(self, X, feature_names):
+        """Apply mileage bucketing to an encoded feature matrix in place"""
+        if self.mileage_bucket > 0:
+            column = feature_names.index('mileage')
+            X[:, column] = np.round(X[:, column] / self.mileage_bucket) * self.mileage_bucket
+        return X
+
+    def normalize_car(self, car):
+        """normalize() for a raw car dict: a copy with its mileage bucketed"""
+        if self.mileage_bucket > 0:
+            try:
+                mileage = float(car['mileage'])
+            except (KeyError, TypeError, ValueError):
+                return car
+            car = dict(car, mileage=float(np.round(mileage / self.mileage_bucket) * self.mileage_bucket))
+        return car
+
+    def keys(self, X):
+        """Cache keys for the rows of an encoded feature matrix"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        return [row.tobytes() for row in X]
+
+    def get_many(self, version, keys):
+        """Look up keys for a model version; returns a list with None for misses"""
+        now = time.monotonic()
+        results = [None] * len(keys)
+        missing = []
+
+        with self._lock:
+            self._check_version(version)
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is None:
+                    missing.append(i)
+                elif entry[0] <= now:
+                    del self._entries[key]
+                    self.expirations += 1
+                    missing.append(i)
+                else:
+                    self._entries.move_to_end(key)
+                    results[i] = entry[1]
+            self.hits += len(keys) - len(missing)
+
+        if missing and self.store is not None:
+            found = self.store.get_many(version, [keys[i] for i in missing], time.time())
+            if found:
+                with self._lock:
+                    for key, value in found.items():
+                        self._insert(key, value, now)
+                    self.shared_hits += len(found)
+                still_missing = []
+                for i in missing:
+                    value = found.get(keys[i])
+                    if value is None:
+                        still_missing.append(i)
+                    else:
+                        results[i] = value
+                missing = still_missing
+
+        with self._lock:
+            self.misses += len(missing)
+        return results
+
+    def set_many(self, version, keys, values):
+        """Store freshly computed predictions for a model version"""
+        now = time.monotonic()
+        with self._lock:
+            if version != self._version:
+                return
+            for key, value in zip(keys, values):
+                self._insert(key, value, now)
+
+        if self.store is not None:
+            self.store.set_many(version, list(zip(keys, values)), time.time() + self.ttl)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                'model_version': self._version,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'mileage_bucket': self.mileage_bucket,
+                'shared_backend': self.store.path if self.store is not None else None,
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+    def _insert(self, key, value, now):
+        """Insert under the lock, evicting least recently used entries"""
+        self._entries[key] = (now + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _check_version(self, version):
+        """Drop all entries when the model version changes (called under the lock)"""
+        if version == self._version:
+            return
+        if self._version is not None:
+            self.invalidations += 1
+        self._entries.clear()
+        self._version = version
+        if self.store is not None:
+            self.store.purge(version, time.time())
@@ -0,0 +1,64 @@
+import numpy as np
+
+INTERVAL_METHODS = ('normal', 'quantile')
+
+
+def tree_intervals(tree_preds, method='normal', z=1.96, quantiles=(0.025, 0.975)):
+    """Return (prediction, lower, upper) from a (n_samples, n_trees) matrix of per-tree predictions
+
+    method='normal' gives prediction ± z·σ over the trees (the original
+    behaviour with z=1.96); method='quantile' takes the empirical
+    quantiles of the per-tree predictions.
+    """
+    if method not in INTERVAL_METHODS:
+        raise ValueError(f"Unknown interval method: {method}")
+
+    prediction = tree_preds.mean(axis=1)
+
+    if method == 'normal':
+        std = tree_preds.std(axis=1)
+        return prediction, prediction - z * std, prediction + z * std
+
+    lower, upper = np.quantile(tree_preds, quantiles, axis=1)
+    return prediction, lower, upper
+
+
+class ForestIntervalEngine:
+    """Prediction intervals for a fitted random forest in one vectorized pass
+
+    Instead of calling ``tree.predict`` once per estimator, the leaf value of
+    every node of every tree is precomputed into a single padded table. The
+    input is validated and cast to float32 once, the low-level tree objects
+    return the leaf index each row lands in, and a fancy-indexing lookup turns
+    that into the full (n_samples, n_trees) matrix of per-tree predictions.
+    """
+
+    METHODS = INTERVAL_METHODS
+
+    def __init__(self, forest):
+        self.forest = forest
+        self.n_trees = len(forest.estimators_)
+        self._trees = [tree.tree_ for tree in forest.estimators_]
+
+        node_counts = [tree.tree_.node_count for tree in forest.estimators_]
+        self.leaf_values = np.zeros((self.n_trees, max(node_counts)), dtype=np.float64)
+        for t, tree in enumerate(forest.estimators_):
+            self.leaf_values[t, :node_counts[t]] = tree.tree_.value[:, 0, 0]
+
+        self._tree_index = np.arange(self.n_trees)
+
+    def tree_predictions(self, X):
+        """Return the (n_samples, n_trees) matrix of per-tree predictions"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        leaves = np.empty((X.shape[0], self.n_trees), dtype=np.intp)
+        for t, tree in enumerate(self._trees):
+            leaves[:, t] = tree.apply(X)
+        return self.leaf_values[self._tree_index, leaves]
+
+    def predict(self, X):
+        """Forest prediction (mean over trees)"""
+        return self.tree_predictions(X).mean(axis=1)
+
+    def intervals(self, X, method='normal', z=1.96, quantiles=(0.025, 0.975)):
+        """Return (prediction, lower, upper) arrays for a batch of rows, see tree_intervals()"""
+        return tree_intervals(self.tree_predictions(X), method, z, quantiles)
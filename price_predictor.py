@@ -0,0 +1,716 @@
+"""
+Car price predictor: training, model loading and scoring
+
+CarPricePredictor trains the three models, publishes and loads model
+versions through the registry, and scores cars (single cars, batches,
+columns and sweeps) with the fused tree engine, the library models, the
+valuation grid and the prediction cache. It has no web framework
+dependency: app.py (Flask), asgi.py, bulk_valuation.py, model_trainer.py
+and the training job processes all import it from here.
+
+Stage timings are recorded in metrics_registry, which app.py exposes at
+/metrics together with its HTTP metrics.
+"""
+
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+# pandas, scikit-learn, xgboost and dataset are imported where they are used:
+# serving single cars from a published version needs none of them
+from prediction_intervals import ForestIntervalEngine, tree_intervals
+from tree_engine import FusedTreeEnsemble
+from feature_encoder import FeatureEncoder, CATEGORICAL_FEATURES, encoder_categories
+from valuation_grid import MAX_CONFIGURATIONS, ValuationGrid
+from model_registry import ModelRegistry, ensemble_weights, training_metadata
+from response_formats import OUTPUTS
+from metrics import MetricsRegistry
+
+NUMERIC_FIELDS = ['year', 'mileage', 'engine_size', 'previous_owners']
+# Fields a car needs to be priced
+REQUIRED_FIELDS = ['make', 'model', 'year', 'mileage', 'condition', 'fuel_type', 'transmission', 'body_type', 'engine_size', 'previous_owners']
+# Largest batch scored by the fused tree engine; bigger batches use each library's predict
+FUSED_MAX_ROWS = 128
+# Score every batch with the tree engine, so workers never unpickle the library models
+TREE_ENGINE_ONLY = os.environ.get('TREE_ENGINE_ONLY', '') not in ('', '0')
+# Batches of at least this many rows run the library models' predicts concurrently
+PARALLEL_SCORING_MIN_ROWS = 10000
+SCORING_THREADS = int(os.environ.get('SCORING_THREADS') or os.cpu_count() or 1)
+# Inputs /api/predict/curve can sweep, and the feature column each one sets
+CURVE_AXES = {'year': 'age', 'mileage': 'mileage', 'condition': 'condition_encoded',
+              'previous_owners': 'previous_owners'}
+CURVE_MAX_POINTS = 100000
+# Rows per scoring call of a sweep; larger sweeps are streamed chunk by chunk
+CURVE_CHUNK_ROWS = 2048
+
+# Service metrics, exposed at /metrics by app.py
+metrics_registry = MetricsRegistry()
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+stage_seconds = metrics_registry.histogram(
+    'autoprice_stage_seconds', 'Seconds spent in each stage of serving predictions',
+    LATENCY_BUCKETS, ('stage', 'model'))
+parse_stage = stage_seconds.labels('parse', '')
+prepare_stage = stage_seconds.labels('prepare_features', '')
+intervals_stage = stage_seconds.labels('intervals', '')
+serialize_stage = stage_seconds.labels('serialize', '')
+grid_stage = stage_seconds.labels('valuation_grid', '')
+
+_deferred_lock = threading.Lock()
+
+_scoring_pool = None
+_scoring_pool_lock = threading.Lock()
+
+
+def scoring_pool():
+    """Thread pool shared by every predictor for concurrent per-model scoring"""
+    global _scoring_pool
+    if _scoring_pool is None:
+        with _scoring_pool_lock:
+            if _scoring_pool is None:
+                _scoring_pool = ThreadPoolExecutor(max_workers=SCORING_THREADS, thread_name_prefix='scoring')
+    return _scoring_pool
+
+
+def numeric_value(value):
+    """value as a finite number (numeric strings are parsed), or None"""
+    try:
+        number = float(value) if isinstance(value, str) else value
+        if math.isfinite(number):
+            return number
+    except (TypeError, ValueError, OverflowError):
+        pass
+    return None
+
+
+def coerce_car(car, swept=()):
+    """(car with its numeric fields as numbers, None), or (None, error) for a car validate_batch would reject
+
+    Fields in swept (the axes of a curve request) may be left out.
+    """
+    for field in REQUIRED_FIELDS:
+        if car.get(field) is None and field not in swept:
+            return None, f'Missing required field: {field}'
+    car = dict(car)
+    for field in NUMERIC_FIELDS:
+        if field in car and field not in swept:
+            car[field] = numeric_value(car[field])
+            if car[field] is None:
+                return None, f'Invalid numeric value for field: {field}'
+    return car, None
+
+
+class CarPricePredictor:
+    def __init__(self):
+        self.models = {}
+        self._encoders = {}
+        self._scaler = None
+        self._deferred = {}
+        self.categories = None
+        self.feature_names = []
+        self.is_trained = False
+        self.interval_method = 'normal'
+        self.feature_encoder = None
+        self.registry = ModelRegistry.from_env()
+        self.model_version = None
+        self.training_metadata = {}
+        self.performance_metrics = {}
+        self.cache = None
+        self.batcher = None
+        self.catalog = None
+        self.tree_engine = None
+        self.valuation_grid = None
+        self.fused_max_rows = float('inf') if TREE_ENGINE_ONLY else FUSED_MAX_ROWS
+        self.load_seconds = None
+        self._interval_engine = None
+        self._engine_subsets = {}
+    
+    @property
+    def encoders(self):
+        """Fitted LabelEncoders, unpickled on first use after a lazy load"""
+        return self._get_deferred('encoders')
+    
+    @encoders.setter
+    def encoders(self, encoders):
+        self._deferred.pop('encoders', None)
+        self._encoders = encoders
+    
+    @property
+    def scaler(self):
+        """Fitted StandardScaler, unpickled on first use after a lazy load"""
+        return self._get_deferred('scaler')
+    
+    @scaler.setter
+    def scaler(self, scaler):
+        self._deferred.pop('scaler', None)
+        self._scaler = scaler
+    
+    def _get_deferred(self, key):
+        if key in self._deferred:
+            with _deferred_lock:
+                load = self._deferred.get(key)
+                if load is not None:
+                    setattr(self, f'_{key}', load())
+                    del self._deferred[key]
+        return getattr(self, f'_{key}')
+        
+    def load_sample_data(self):
+        """Load the bundled sample car data for training"""
+        import dataset
+        
+        return dataset.load_sample_data()
+    
+    def load_training_data(self, data_path=None):
+        """Load training data from data_path or $TRAINING_DATA, else the bundled sample"""
+        import dataset
+        
+        data_path = data_path or os.environ.get('TRAINING_DATA')
+        if data_path:
+            return dataset.load_dataset(data_path)
+        return self.load_sample_data()
+    
+    def prepare_features(self, df):
+        """Prepare features for training"""
+        import pandas as pd
+        from sklearn.preprocessing import LabelEncoder
+        
+        # Fit label encoders for categorical variables seen for the first time
+        for feature in CATEGORICAL_FEATURES:
+            if feature not in self.encoders:
+                self.encoders[feature] = LabelEncoder().fit(np.asarray(df[feature].unique(), dtype=str))
+                self.categories = None
+                self.feature_encoder = None
+        
+        # Encode into the model feature layout (age + numeric + encoded categoricals)
+        encoder = self.get_feature_encoder()
+        self.feature_names = encoder.feature_names
+        return pd.DataFrame(encoder.encode_columns(df), columns=self.feature_names, index=df.index)
+    
+    def get_feature_encoder(self):
+        """Return the compiled feature encoder for the current label encoders"""
+        if self.feature_encoder is None:
+            reference_year = self.training_metadata.get('reference_year', datetime.now().year)
+            # A loaded version ships its categories, so the LabelEncoders stay on disk
+            categories = self.categories if self.categories is not None else self.encoders
+            self.feature_encoder = FeatureEncoder(categories, reference_year)
+        return self.feature_encoder
+    
+    def train_models(self, data_path=None):
+        """Train all ML models"""
+        from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler
+        import xgboost as xgb
+        from training_graph import TrainingGraph
+        
+        # Age is computed relative to this year at training and prediction time
+        self.training_metadata = {'reference_year': datetime.now().year}
+        self.feature_encoder = None
+        
+        # Load and prepare data
+        data_path = data_path or os.environ.get('TRAINING_DATA')
+        df = self.load_training_data(data_path)
+        X = self.prepare_features(df).to_numpy()
+        y = df['price']
+        
+        # Split data
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        
+        # Scale features
+        self.scaler = StandardScaler()
+        X_train_scaled = self.scaler.fit_transform(X_train)
+        X_test_scaled = self.scaler.transform(X_test)
+        
+        # Fit and cross-validate all three models as one task graph, which also
+        # computes the test-set metrics
+        graph = TrainingGraph(X_train, y_train, X_test, y_test)
+        graph.add_family('random_forest', RandomForestRegressor(n_estimators=100, random_state=42, max_depth=10))
+        graph.add_family('gradient_boosting',
+                         GradientBoostingRegressor(n_estimators=100, learning_rate=0.1, random_state=42))
+        graph.add_family('xgboost', xgb.XGBRegressor(n_estimators=100, learning_rate=0.1, random_state=42))
+        self.models, self.performance_metrics, _ = graph.run()
+        
+        # Compile all three ensembles for single-pass inference and check it
+        # reproduces the library predictions
+        self.tree_engine = FusedTreeEnsemble.from_models(self.models).compact()
+        self.tree_engine.verify(self.models, X_test)
+        
+        self.is_trained = True
+        self.valuation_grid = None
+        
+        self.training_metadata = training_metadata(
+            source='price_predictor.CarPricePredictor',
+            reference_year=self.training_metadata['reference_year'],
+            data_path=data_path,
+            n_train_rows=len(X_train),
+            n_test_rows=len(X_test),
+            training_tasks=graph.report()
+        )
+        
+        # Precompute the common configurations, then save models
+        self.build_valuation_grid(X_train)
+        self.save_models()
+        
+        return self.performance_metrics
+    
+    def predict_price(self, car_data, models=None, ensemble=False):
+        """Predict car price using all models, or only the models named
+        
+        With ensemble, the predictions are blended into one 'ensemble'
+        result (see blend).
+        """
+        if not self.is_trained:
+            self.train_models()
+        selected = self.select_models(models)
+        
+        # Common configurations are answered from the version's precomputed grid
+        predictions = None
+        grid = self.valuation_grid
+        if grid is not None:
+            with grid_stage.time():
+                predictions = grid.lookup(car_data if self.cache is None else self.cache.normalize_car(car_data))
+            if predictions is not None and selected is not None:
+                predictions = {name: predictions[name] for name in selected}
+        
+        if predictions is None:
+            with prepare_stage.time():
+                X = self.get_feature_encoder().encode_records([car_data])
+            
+            # Concurrent single-car requests share one scoring call when batching is on
+            if self.batcher is not None and selected is None:
+                predictions = self.batcher.submit(self, X)[0]
+            else:
+                predictions = self._score_cached(X, selected)[0]
+        
+        return self.blend(predictions) if ensemble else predictions
+    
+    def predict_prices(self, df, models=None, ensemble=False):
+        """Predict prices for a batch of cars with one predict call per model
+        
+        Returns one result per input row, in input order. Rows that fail
+        validation get {'success': False, 'error': ...} instead of predictions.
+        models and ensemble are as for predict_price.
+        """
+        if not self.is_trained:
+            self.train_models()
+        selected = self.select_models(models)
+        
+        df = df.reset_index(drop=True)
+        df, errors = self.validate_batch(df)
+        
+        results = [{'success': False, 'error': error} for error in errors]
+        valid_rows = [i for i, error in enumerate(errors) if error is None]
+        
+        if valid_rows:
+            with prepare_stage.time():
+                X = self.get_feature_encoder().encode_columns(df.iloc[valid_rows])
+            for i, predictions in zip(valid_rows, self._score_cached(X, selected)):
+                results[i] = {'success': True, 'predictions': self.blend(predictions) if ensemble else predictions}
+        
+        return results
+    
+    def predict_columns(self, df, models=None, ensemble=False):
+        """Predict a batch straight into columns, without per-row result dicts
+        
+        Returns the validation errors (one per row, None for valid rows)
+        and {'<model>_price' | '<model>_lower' | '<model>_upper': float64
+        array}, NaN on rows that failed validation; with ensemble the only
+        model is 'ensemble'. Unlike predict_prices, rows are not looked up
+        in the prediction cache.
+        """
+        if not self.is_trained:
+            self.train_models()
+        selected = self.select_models(models)
+        
+        df = df.reset_index(drop=True)
+        df, errors = self.validate_batch(df)
+        valid = np.array([error is None for error in errors], dtype=bool)
+        
+        scores = {}
+        if valid.any():
+            with prepare_stage.time():
+                X = self.normalize_features(self.get_feature_encoder().encode_columns(df[valid]))
+            scores = self.score_matrix(X, selected)
+            if ensemble:
+                scores = {'ensemble': self.blend_matrix(scores)}
+        
+        names = ['ensemble'] if ensemble else selected or list(self.models)
+        columns = {}
+        for name in names:
+            for output, values in zip(OUTPUTS, scores.get(name, (None,) * len(OUTPUTS))):
+                column = np.full(len(df), np.nan)
+                if values is not None:
+                    column[valid] = values
+                columns[f'{name}_{output}'] = column
+        return errors, columns
+    
+    def predict_curve(self, car, axes, chunk_rows=CURVE_CHUNK_ROWS, models=None, ensemble=False):
+        """Price a base car over the Cartesian product of sweep axes
+        
+        axes maps names from CURVE_AXES to lists of values, which replace
+        the car's own values; the last axis varies fastest. The whole grid
+        is encoded up front, so invalid values raise ValueError or TypeError
+        here. Returns the number of points and a generator of point lists,
+        each scored with one score_matrix call of up to chunk_rows rows.
+        models and ensemble are as for predict_price.
+        """
+        if not self.is_trained:
+            self.train_models()
+        selected = self.select_models(models)
+        
+        encoder = self.get_feature_encoder()
+        names = list(axes)
+        base = dict(car, **{name: values[0] for name, values in axes.items()})
+        with prepare_stage.time():
+            row = encoder.encode_records([base])[0]
+            cells = [index.ravel() for index in np.indices([len(axes[name]) for name in names])]
+            X = np.repeat(row[None, :], len(cells[0]) if names else 1, axis=0)
+            for name, index in zip(names, cells):
+                column = encoder.feature_names.index(CURVE_AXES[name])
+                encoded = encoder.encode_records([dict(base, **{name: value}) for value in axes[name]])
+                X[:, column] = encoded[index, column]
+            X = self.normalize_features(X)
+        
+        return len(X), self._curve_points(X, axes, cells, chunk_rows, selected, ensemble)
+    
+    def _curve_points(self, X, axes, cells, chunk_rows, models, ensemble):
+        # Sweep points rarely repeat exactly, so they bypass the prediction cache
+        for start in range(0, len(X), chunk_rows):
+            points = []
+            for i, predictions in enumerate(self._score_features(X[start:start + chunk_rows], models), start):
+                point = {name: axes[name][index[i]] for name, index in zip(axes, cells)}
+                point['predictions'] = self.blend(predictions) if ensemble else predictions
+                points.append(point)
+            yield points
+    
+    def validate_batch(self, df):
+        """Check required fields and coerce numeric columns for a batch
+        
+        Returns the coerced DataFrame and a list with one error message
+        (or None) per row.
+        """
+        import pandas as pd
+        
+        df = df.copy()
+        n_rows = len(df)
+        errors = [None] * n_rows
+        valid = np.ones(n_rows, dtype=bool)
+        
+        for field in REQUIRED_FIELDS:
+            if field in df.columns:
+                missing = df[field].isna().to_numpy()
+            else:
+                missing = np.ones(n_rows, dtype=bool)
+            for i in np.flatnonzero(valid & missing):
+                errors[i] = f'Missing required field: {field}'
+            valid &= ~missing
+        
+        for field in NUMERIC_FIELDS:
+            if field not in df.columns:
+                continue
+            values = pd.to_numeric(df[field], errors='coerce')
+            invalid = ~np.isfinite(values.to_numpy(dtype=np.float64))
+            for i in np.flatnonzero(valid & invalid):
+                errors[i] = f'Invalid numeric value for field: {field}'
+            valid &= ~invalid
+            df[field] = values
+        
+        # Make, model and body type must belong together
+        if self.catalog is not None and valid.any():
+            for i, error in enumerate(self.catalog.check_columns(df)):
+                if error is not None and valid[i]:
+                    errors[i] = error
+        
+        return df, errors
+    
+    def check_car(self, car):
+        """Catalog error for one car (unknown make or model, or a body type it is not sold in), or None"""
+        return self.catalog.check(car) if self.catalog is not None else None
+    
+    def select_models(self, models):
+        """Validate a model selection; returns the names in self.models order, or None for all models
+        
+        Raises ValueError for an empty selection or an unknown name.
+        """
+        if models is None:
+            return None
+        unknown = [name for name in models if name not in self.models]
+        if unknown or not models:
+            raise ValueError(f"Unknown model: {', '.join(map(str, unknown))}; choose from {', '.join(self.models)}"
+                             if unknown else 'Select at least one model')
+        selected = [name for name in self.models if name in models]
+        return None if len(selected) == len(self.models) else selected
+    
+    def blend_weights(self, names):
+        """Ensemble weights of the named models, renormalized to sum to one"""
+        metrics = self.performance_metrics
+        if all('ensemble_weight' in metrics[name] for name in names):
+            weights = {name: metrics[name]['ensemble_weight'] for name in names}
+        else:
+            # Versions published before the trainers stored weights
+            weights = ensemble_weights({name: metrics[name] for name in names})
+        total = sum(weights.values())
+        return {name: weights[name] / total for name in names}
+    
+    def blend(self, predictions):
+        """Blend one car's per-model predictions into a single weighted 'ensemble' result
+        
+        Price, interval bounds and confidence are weighted means over the
+        models, with the weights the trainer learned from validation error.
+        """
+        weights = self.blend_weights(list(predictions))
+        
+        def mean(value):
+            return sum(weights[name] * value(result) for name, result in predictions.items())
+        
+        return {
+            'ensemble': {
+                'predicted_price': mean(lambda result: result['predicted_price']),
+                'confidence_interval': {
+                    'lower': mean(lambda result: result['confidence_interval']['lower']),
+                    'upper': mean(lambda result: result['confidence_interval']['upper'])
+                },
+                'confidence': mean(lambda result: result['confidence']),
+                'weights': weights
+            }
+        }
+    
+    def blend_matrix(self, scores):
+        """blend() for score_matrix output: weighted (price, lower, upper) arrays"""
+        weights = self.blend_weights(list(scores))
+        return tuple(sum(weights[name] * outputs[i] for name, outputs in scores.items())
+                     for i in range(len(OUTPUTS)))
+    
+    def normalize_features(self, X):
+        """Apply the prediction cache's mileage bucketing (if configured) to an encoded matrix in place
+        
+        Every scoring path goes through this (the valuation grid through
+        PredictionCache.normalize_car), so a car gets the same price
+        whichever route or response format asked for it.
+        """
+        if self.cache is not None:
+            X = self.cache.normalize(X, self.feature_names)
+        return X
+    
+    def _score_cached(self, X, models=None):
+        """Score an encoded feature matrix, answering repeated rows from the prediction cache"""
+        X = self.normalize_features(X)
+        cache = self.cache
+        if cache is None or self.model_version is None:
+            return self._score_features(X, models)
+        
+        keys = cache.keys(X)
+        if models is not None:
+            # Model subsets share the version's cache under their own keys
+            suffix = ('|' + ','.join(models)).encode()
+            keys = [key + suffix for key in keys]
+        results = cache.get_many(self.model_version, keys)
+        
+        misses = [i for i, result in enumerate(results) if result is None]
+        if misses:
+            scored = self._score_features(X[misses], models)
+            for i, predictions in zip(misses, scored):
+                results[i] = predictions
+            cache.set_many(self.model_version, [keys[i] for i in misses], scored)
+        
+        return results
+    
+    def score_matrix(self, X, models=None):
+        """Score an encoded feature matrix with every model, or only the models named
+        
+        Returns {model name: (price, lower, upper)} with one float64 array
+        per output, already clipped at zero where the API clips. Batches of
+        up to fused_max_rows rows go through the fused tree engine in one
+        pass, walking only the selected models' trees; larger ones call each
+        library's predict, concurrently from PARALLEL_SCORING_MIN_ROWS rows.
+        """
+        names = list(self.models) if models is None else list(models)
+        tree_values = {}
+        engine = None
+        if len(X) <= self.fused_max_rows:
+            engine = self._get_tree_engine(models)
+            with stage_seconds.labels('predict', 'tree_engine').time():
+                tree_values = engine.tree_values(X)
+        
+        # Library models are only looked up (and so loaded) when the engine did not score them
+        library = [name for name in names if name not in tree_values]
+        if len(library) > 1 and len(X) >= PARALLEL_SCORING_MIN_ROWS and SCORING_THREADS > 1:
+            # The libraries release the GIL while they walk their trees
+            library_values = dict(zip(library, scoring_pool().map(lambda name: self._library_predict(name, X), library)))
+        else:
+            library_values = {name: self._library_predict(name, X) for name in library}
+        
+        predictions = {}
+        for name in names:
+            if name in library_values:
+                predictions[name] = library_values[name]
+            elif name == 'random_forest':
+                # Keep the per-tree predictions for the interval
+                predictions[name] = tree_values[name]
+            else:
+                predictions[name] = engine.reduce(name, tree_values[name])
+        
+        scores = {}
+        with intervals_stage.time():
+            for name, preds in predictions.items():
+                # Calculate confidence interval (simplified)
+                if name == 'random_forest':
+                    # Use tree predictions for variance, all trees in one pass
+                    preds, lower, upper = tree_intervals(preds, method=self.interval_method)
+                else:
+                    # Use RMSE for confidence interval
+                    rmse = self.performance_metrics[name]['rmse']
+                    lower, upper = preds - rmse, preds + rmse
+                
+                scores[name] = (np.maximum(0, preds), np.maximum(0, lower), upper)
+        
+        return scores
+    
+    def _library_predict(self, name, X):
+        """One model's predictions from its library, per tree for the random forest"""
+        with stage_seconds.labels('predict', name).time():
+            if name == 'random_forest':
+                return self._get_interval_engine(self.models[name]).tree_predictions(X)
+            return np.asarray(self.models[name].predict(X), dtype=np.float64)
+    
+    def _score_features(self, X, models=None):
+        """Score a prepared feature matrix with every model (or those named), one result dict per row"""
+        n_rows = len(X)
+        results = [{} for _ in range(n_rows)]
+        
+        for name, (preds, lower, upper) in self.score_matrix(X, models).items():
+            confidence = float(self.performance_metrics[name]['r2'])
+            prices = preds.tolist()
+            lowers = lower.tolist()
+            uppers = upper.tolist()
+            
+            for i in range(n_rows):
+                results[i][name] = {
+                    'predicted_price': prices[i],
+                    'confidence_interval': {
+                        'lower': lowers[i],
+                        'upper': uppers[i]
+                    },
+                    'confidence': confidence
+                }
+        
+        return results
+    
+    def _get_interval_engine(self, forest):
+        """Return the interval engine for the current forest, rebuilding it after a retrain"""
+        if self._interval_engine is None or self._interval_engine.forest is not forest:
+            self._interval_engine = ForestIntervalEngine(forest)
+        return self._interval_engine
+    
+    def _get_tree_engine(self, models=None):
+        """Return the fused tree engine, compiling it if the model version did not ship one
+        
+        With models, returns (and keeps) the engine subset that walks only
+        their trees.
+        """
+        if self.tree_engine is None:
+            self.tree_engine = FusedTreeEnsemble.from_models(self.models)
+        engine = self.tree_engine
+        if models is None:
+            return engine
+        
+        # Subsets are rebuilt after a retrain replaces the engine
+        subsets = self._engine_subsets
+        if subsets.get(None) is not engine:
+            subsets = self._engine_subsets = {None: engine}
+        key = tuple(models)
+        if key not in subsets:
+            subsets[key] = engine.subset(models)
+        return subsets[key]
+    
+    def build_valuation_grid(self, X_train, max_configurations=MAX_CONFIGURATIONS):
+        """Precompute predictions for the most common configurations in an encoded training matrix"""
+        self.valuation_grid = None
+        if max_configurations > 0 and len(X_train):
+            self.valuation_grid = ValuationGrid.build(self, X_train, max_configurations)
+            self.training_metadata['valuation_grid'] = self.valuation_grid.stats
+        return self.valuation_grid
+    
+    def export_state(self):
+        """Return the trained models, preprocessors, metrics and metadata as a picklable dict"""
+        return {
+            'models': {name: self.models[name] for name in self.models},
+            'encoders': self.encoders,
+            'scaler': self.scaler,
+            'categories': encoder_categories(self.encoders),
+            'feature_names': self.feature_names,
+            'performance_metrics': self.performance_metrics,
+            'tree_engine': self._get_tree_engine(),
+            'valuation_grid': self.valuation_grid,
+            'metadata': self.training_metadata,
+            'model_version': self.model_version
+        }
+    
+    @classmethod
+    def from_state(cls, state):
+        """Build a trained predictor from export_state() or ModelRegistry.load() output"""
+        predictor = cls()
+        predictor.set_state(state)
+        return predictor
+    
+    def set_state(self, state):
+        """Replace the models and preprocessors with a saved state"""
+        self.models = state['models']
+        self.encoders = state.get('encoders', {})
+        self.scaler = state.get('scaler')
+        self._deferred = dict(state.get('deferred', {}))
+        self.categories = state.get('categories')
+        self.feature_names = state['feature_names']
+        self.performance_metrics = state.get('performance_metrics', {})
+        self.training_metadata = state.get('metadata', {})
+        self.model_version = state.get('model_version')
+        self.feature_encoder = None
+        self.tree_engine = state.get('tree_engine')
+        self.valuation_grid = state.get('valuation_grid')
+        self._interval_engine = None
+        self._engine_subsets = {}
+        self.is_trained = True
+    
+    def warm_up(self, load_all=True):
+        """Build the feature encoder and tree engine ahead of the first request
+        
+        With load_all, also unpickle the library models and build the
+        interval engine, which batches beyond fused_max_rows need. Models the
+        engine scores are skipped when there is no such batch size
+        (TREE_ENGINE_ONLY).
+        """
+        self.get_feature_encoder()
+        engine = self._get_tree_engine()
+        if load_all:
+            scored = engine.groups if self.fused_max_rows == float('inf') else {}
+            for name in self.models:
+                if name not in scored:
+                    self.models[name]
+            if 'random_forest' in self.models and 'random_forest' not in scored:
+                self._get_interval_engine(self.models['random_forest'])
+    
+    def save_models(self):
+        """Publish trained models to the model registry as a new version"""
+        self.model_version = self.registry.publish(self.export_state(), metadata=self.training_metadata)
+        return self.model_version
+    
+    def load_models(self, version=None):
+        """Load trained models from the model registry (the current version by default)
+        
+        Library models, LabelEncoders and the scaler are unpickled on first
+        use; single-car predictions only need the fused tree engine.
+        """
+        start = time.perf_counter()
+        state = self.registry.load(version, lazy=True)
+        if state is None:
+            return False
+        
+        self.set_state(state)
+        self.load_seconds = time.perf_counter() - start
+        return True
+
@@ -0,0 +1,175 @@
+"""
+Content negotiation for prediction responses
+
+Prediction routes answer in the format the request's ?format= parameter
+or Accept header asks for:
+
+  json     application/json                       one JSON document (default)
+  ndjson   application/x-ndjson                   one JSON object per result, streamed
+  msgpack  application/msgpack                    the JSON document as MessagePack
+  arrow    application/vnd.apache.arrow.stream    an Arrow IPC stream of columns
+
+MessagePack needs the msgpack package and Arrow needs pyarrow; a format
+whose package is not installed is never chosen, and asking for it
+explicitly is answered with 406. The encoders here are framework-neutral
+(bytes or an iterator of bytes), so the Flask app and the ASGI app share
+them.
+
+Arrow responses are columnar: one row per car (or sweep point) with
+<model>_price, <model>_lower and <model>_upper float64 columns and an
+error column, so a 10k-row batch is a few contiguous buffers instead of
+10k nested objects. Fields of the JSON document that are not per row
+(count, failed, axes, ...) go into the schema metadata as JSON.
+"""
+
+import importlib.util
+import json
+
+import numpy as np
+
+FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'msgpack': 'application/msgpack',
+    'arrow': 'application/vnd.apache.arrow.stream'
+}
+# Other media types clients use for the same formats
+ALIASES = {
+    'application/jsonl': 'ndjson',
+    'application/x-msgpack': 'msgpack',
+    'application/vnd.msgpack': 'msgpack',
+    'application/vnd.apache.arrow.file': 'arrow'
+}
+# Package each format needs beyond the standard library
+REQUIRES = {'msgpack': 'msgpack', 'arrow': 'pyarrow'}
+OUTPUTS = ('price', 'lower', 'upper')
+
+# Compact separators, like Flask's JSON responses
+_json_encoder = json.JSONEncoder(separators=(',', ':'))
+_available = None
+
+
+def available_formats():
+    """Format names whose packages are installed, in FORMATS order"""
+    global _available
+    if _available is None:
+        _available = [name for name in FORMATS
+                      if name not in REQUIRES or importlib.util.find_spec(REQUIRES[name]) is not None]
+    return _available
+
+
+def negotiate(accept=None, requested=None):
+    """Format for a request: ?format= if given, else the best available match for the Accept header
+
+    JSON when neither says anything; None when nothing acceptable is
+    available (answer 406). Among equally acceptable formats the order of
+    FORMATS wins, so */* gets JSON.
+    """
+    available = available_formats()
+    if requested:
+        return requested if requested in available else None
+    if not accept:
+        return 'json'
+
+    # q of each format: from the most specific media range that matches it
+    quality = {}
+    for media_range in accept.split(','):
+        media_type, *params = [part.strip() for part in media_range.split(';')]
+        media_type = media_type.lower()
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        for name in available:
+            if media_type == FORMATS[name] or ALIASES.get(media_type) == name:
+                specificity = 2
+            elif media_type in ('*/*', FORMATS[name].split('/')[0] + '/*'):
+                specificity = 1 if media_type != '*/*' else 0
+            else:
+                continue
+            if specificity >= quality.get(name, (-1, 0))[0]:
+                quality[name] = (specificity, q)
+
+    best = max(available, key=lambda name: (quality.get(name, (0, 0.0))[1], -available.index(name)))
+    return best if quality.get(best, (0, 0.0))[1] > 0 else None
+
+
+def not_acceptable():
+    """Body of a 406 response"""
+    return {'error': 'None of the requested formats is available',
+            'formats': {name: FORMATS[name] for name in available_formats()}}
+
+
+def encode(fmt, document, rows_key=None, columns=None):
+    """Encode a response document in a non-JSON format
+
+    rows_key names the document's list of per-row results, which NDJSON
+    writes one per line (a generator of row lists is streamed as it
+    comes). Arrow needs the rows as columns (see prediction_columns);
+    the rest of the document becomes its schema metadata.
+    """
+    if fmt == 'ndjson':
+        return _ndjson(document, rows_key)
+    if fmt == 'msgpack':
+        import msgpack
+
+        if rows_key is not None and not isinstance(document[rows_key], list):
+            document = dict(document, **{rows_key: [row for rows in document[rows_key] for row in rows]})
+        return msgpack.packb(document)
+    if fmt == 'arrow':
+        metadata = {key: value for key, value in document.items() if key != rows_key}
+        return encode_arrow(columns, metadata)
+    raise ValueError(f'Unknown response format: {fmt}')
+
+
+def _ndjson(document, rows_key):
+    if rows_key is None:
+        yield _json_encoder.encode(document).encode() + b'\n'
+        return
+    rows = document[rows_key]
+    chunks = [rows] if isinstance(rows, list) else rows
+    for chunk in chunks:
+        if chunk:
+            yield ''.join([_json_encoder.encode(row) + '\n' for row in chunk]).encode()
+
+
+def encode_arrow(columns, metadata=None):
+    """Arrow IPC stream of {name: column}, with metadata values stored as JSON"""
+    import pyarrow as pa
+
+    table = pa.table(columns)
+    if metadata:
+        table = table.replace_schema_metadata({key: json.dumps(value) for key, value in metadata.items()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def prediction_columns(predictions):
+    """Columns from per-row predictions dicts ({model: {predicted_price, ...}}, None for failed rows)
+
+    Returns {'<model>_price': float64 array, '<model>_lower': ..., ...}
+    with NaN for rows without predictions.
+    """
+    names = []
+    for row in predictions:
+        for name in row or ():
+            if name not in names:
+                names.append(name)
+
+    columns = {}
+    for name in names:
+        values = np.full((len(predictions), 3), np.nan)
+        for i, row in enumerate(predictions):
+            result = row.get(name) if row else None
+            if result is not None:
+                interval = result['confidence_interval']
+                values[i] = (result['predicted_price'], interval['lower'], interval['upper'])
+        for j, output in enumerate(OUTPUTS):
+            columns[f'{name}_{output}'] = values[:, j]
+    return columns
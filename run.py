@@ -6,14 +6,15 @@ Used Car Price Estimator - Flask Application Runner
 import os
 import sys
 from app import app, predictor
+from model_registry import ModelRegistry
 
 def setup_application():
     """Setup the application and train models if needed"""
     print("Setting up AutoPrice AI...")
     
-    # Check if models exist
-    if not os.path.exists('models'):
-        print("Models directory not found. Training models...")
+    # Check if a model version has been published
+    if ModelRegistry.from_env().current_version() is None:
+        print("No published model version found. Training models...")
         try:
             from model_trainer import ModelTrainer
             trainer = ModelTrainer()
@@ -0,0 +1,33 @@
+"""Shared fixtures: one predictor trained on the bundled sample data, published to a throwaway registry"""
+
+import warnings
+
+import pytest
+
+from model_registry import ModelRegistry
+from price_predictor import CarPricePredictor
+
+
+@pytest.fixture(scope='session')
+def trained(tmp_path_factory):
+    """A trained predictor; tests that change its settings work on a copy (see fresh_predictor)"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        predictor = CarPricePredictor()
+        predictor.registry = ModelRegistry(str(tmp_path_factory.mktemp('models')))
+        predictor.train_models()
+    return predictor
+
+
+@pytest.fixture(scope='session')
+def sample_data(trained):
+    """The bundled sample listings the trained predictor was fitted on"""
+    return trained.load_sample_data()
+
+
+@pytest.fixture
+def fresh_predictor(trained):
+    """A new predictor serving the trained version, without cache or batcher"""
+    predictor = CarPricePredictor.from_state(trained.export_state())
+    predictor.registry = trained.registry
+    return predictor
@@ -0,0 +1,44 @@
+"""Ensemble weights from validation error, and blending with them"""
+
+import pytest
+
+from benchmarks.startup import SAMPLE_CAR
+from model_registry import ensemble_weights
+
+
+def test_weights_are_inverse_validation_error():
+    weights = ensemble_weights({
+        'a': {'cv_score': 0.9, 'r2': 0.0},
+        'b': {'cv_score': 0.8, 'r2': 0.0},
+        'c': {'cv_score': float('nan'), 'r2': 0.6},
+        'd': {'cv_score': 0.95, 'cv_inherited_from': 'base', 'r2': 0.5},
+    })
+    # 1 / (1 - score), with test R² when there is no CV score of the version's own
+    inverse = {'a': 10.0, 'b': 5.0, 'c': 2.5, 'd': 2.0}
+    total = sum(inverse.values())
+    assert weights == pytest.approx({name: value / total for name, value in inverse.items()})
+
+
+def test_trained_weights_sum_to_one(trained):
+    weights = {name: metrics['ensemble_weight'] for name, metrics in trained.performance_metrics.items()}
+    assert set(weights) == set(trained.models)
+    assert sum(weights.values()) == pytest.approx(1.0)
+    assert weights == pytest.approx(ensemble_weights(trained.performance_metrics))
+
+
+def test_blend_is_weighted_mean(fresh_predictor):
+    predictions = fresh_predictor.predict_price(SAMPLE_CAR)
+    ensemble = fresh_predictor.predict_price(SAMPLE_CAR, ensemble=True)['ensemble']
+    weights = ensemble['weights']
+    assert ensemble['predicted_price'] == pytest.approx(
+        sum(weights[name] * result['predicted_price'] for name, result in predictions.items()))
+    assert ensemble['confidence_interval']['lower'] == pytest.approx(
+        sum(weights[name] * result['confidence_interval']['lower'] for name, result in predictions.items()))
+
+
+def test_model_subset_weights_are_renormalized(fresh_predictor):
+    names = ['random_forest', 'xgboost']
+    full = fresh_predictor.blend_weights(list(fresh_predictor.models))
+    subset = fresh_predictor.predict_price(SAMPLE_CAR, models=names, ensemble=True)['ensemble']['weights']
+    assert list(subset) == names
+    assert subset == pytest.approx({name: full[name] / sum(full[n] for n in names) for name in names})
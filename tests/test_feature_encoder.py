@@ -0,0 +1,62 @@
+"""FeatureEncoder gives the codes LabelEncoder.transform gives, on every encoding path"""
+
+import numpy as np
+import pytest
+from sklearn.preprocessing import LabelEncoder
+
+from data_processor import DataProcessor
+from feature_encoder import CATEGORICAL_FEATURES, FEATURE_NAMES, NUMERIC_FEATURES, FeatureEncoder, encoder_categories
+
+
+def label_encoded(encoders, df, current_year):
+    """The feature matrix the LabelEncoders themselves produce"""
+    X = np.empty((len(df), len(FEATURE_NAMES)), dtype=np.float32)
+    X[:, 0] = current_year - df['year'].to_numpy(dtype=np.float64)
+    for feature in NUMERIC_FEATURES:
+        X[:, FEATURE_NAMES.index(feature)] = df[feature].to_numpy(dtype=np.float64)
+    for feature in CATEGORICAL_FEATURES:
+        X[:, FEATURE_NAMES.index(feature + '_encoded')] = encoders[feature].transform(df[feature].astype(str))
+    return X
+
+
+def test_matches_label_encoders(trained, sample_data):
+    encoders = trained.encoders
+    encoder = FeatureEncoder(encoders, 2024)
+    expected = label_encoded(encoders, sample_data, 2024)
+    np.testing.assert_array_equal(encoder.encode_columns(sample_data), expected)
+    np.testing.assert_array_equal(encoder.encode_records(sample_data.to_dict('records')), expected)
+    # Stored categories (no scikit-learn at serving time) encode the same way
+    np.testing.assert_array_equal(FeatureEncoder(encoder_categories(encoders), 2024).encode_columns(sample_data),
+                                  expected)
+
+
+def test_matches_extended_label_encoders(sample_data):
+    base = sample_data[sample_data['make'] != 'Toyota']
+    processor = DataProcessor()
+    processor.encoders = {feature: LabelEncoder().fit(base[feature].astype(str)) for feature in CATEGORICAL_FEATURES}
+    old_classes = encoder_categories(processor.encoders)
+
+    added = processor.extend_encoders(sample_data)
+    assert 'Toyota' in added['make']
+    categories = encoder_categories(processor.encoders)
+    for feature, classes in old_classes.items():
+        assert categories[feature][:len(classes)] == classes
+
+    encoder = FeatureEncoder(processor.encoders, 2024)
+    expected = label_encoded(processor.encoders, sample_data, 2024)
+    np.testing.assert_array_equal(encoder.encode_columns(sample_data), expected)
+    np.testing.assert_array_equal(encoder.encode_records(sample_data.to_dict('records')), expected)
+
+
+def test_unknown_categories(trained, sample_data):
+    car = dict(sample_data.iloc[0], make='Unknown Motors')
+    column = FEATURE_NAMES.index('make_encoded')
+    encoder = FeatureEncoder(trained.encoders, 2024)
+    assert encoder.encode_records([car])[0, column] == FeatureEncoder.UNKNOWN_CODE
+    assert encoder.encode_columns({key: [value] for key, value in car.items()})[0, column] == FeatureEncoder.UNKNOWN_CODE
+
+    strict = FeatureEncoder(trained.encoders, 2024, unknown='error')
+    with pytest.raises(ValueError):
+        strict.encode_records([car])
+    with pytest.raises(ValueError):
+        strict.encode_columns({key: [value] for key, value in car.items()})
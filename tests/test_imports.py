@@ -0,0 +1,19 @@
+"""Serving import regression tests (the checks behind python -m benchmarks.imports)"""
+
+import os
+
+import pytest
+
+from benchmarks.imports import IMPORT_BUDGET_S, measure
+
+
+def test_serving_path_skips_training_libraries():
+    result = measure(repeats=1)
+    assert not result['modules'], f"serving path imported {', '.join(result['modules'])}"
+
+
+@pytest.mark.skipif(not os.environ.get('IMPORT_BUDGET_S'), reason="set IMPORT_BUDGET_S to enforce an import time budget")
+def test_serving_imports_within_budget():
+    result = measure()
+    assert result['import_s'] <= IMPORT_BUDGET_S, \
+        f"import app took {result['import_s']:.3f}s, over the {IMPORT_BUDGET_S:.3f}s budget"
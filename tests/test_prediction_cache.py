@@ -0,0 +1,39 @@
+"""Prediction cache: entries belong to one model version and are dropped when it changes"""
+
+from benchmarks.startup import SAMPLE_CAR
+from prediction_cache import PredictionCache
+from price_predictor import CarPricePredictor
+
+
+def test_version_change_invalidates_entries():
+    cache = PredictionCache()
+    cache.get_many('v1', [b'a'])
+    cache.set_many('v1', [b'a'], ['price-v1'])
+    assert cache.get_many('v1', [b'a']) == ['price-v1']
+
+    assert cache.get_many('v2', [b'a']) == [None]
+    assert cache.stats()['invalidations'] == 1
+    # A late write for the old version must not repopulate the new one
+    cache.set_many('v1', [b'a'], ['price-v1'])
+    assert cache.get_many('v2', [b'a']) == [None]
+
+
+def test_predictor_does_not_serve_an_older_versions_prices(trained, fresh_predictor):
+    cache = PredictionCache()
+    fresh_predictor.cache = cache
+    fresh_predictor.valuation_grid = None
+    first = fresh_predictor.predict_price(SAMPLE_CAR)
+    assert fresh_predictor.predict_price(SAMPLE_CAR) == first
+    assert cache.stats()['hits'] == 1
+
+    # The same car priced by another version: a miss, with that version's own prices
+    state = trained.export_state()
+    state['model_version'] = 'other-version'
+    state['performance_metrics'] = {name: dict(metrics, r2=0.5) for name, metrics in state['performance_metrics'].items()}
+    other = CarPricePredictor.from_state(state)
+    other.cache = cache
+    other.valuation_grid = None
+    predictions = other.predict_price(SAMPLE_CAR)
+    assert cache.stats()['invalidations'] == 1
+    assert cache.stats()['hits'] == 1
+    assert all(result['confidence'] == 0.5 for result in predictions.values())
@@ -0,0 +1,50 @@
+"""The fused tree engine reproduces the library models' predictions"""
+
+import numpy as np
+import pytest
+
+from tree_engine import FusedTreeEnsemble
+
+RTOL = 1e-5
+
+
+@pytest.fixture(scope='module')
+def X(trained, sample_data):
+    return trained.get_feature_encoder().encode_columns(sample_data)
+
+
+def assert_close(actual, expected):
+    """Within RTOL of the largest expected magnitude, the tolerance FusedTreeEnsemble.verify uses"""
+    assert np.abs(actual - expected).max() <= RTOL * max(np.abs(expected).max(), 1.0)
+
+
+def test_engine_matches_libraries(trained, X):
+    for engine in (FusedTreeEnsemble.from_models(trained.models), trained.tree_engine):
+        predictions = engine.predict(X)
+        assert set(predictions) == set(trained.models)
+        for name, model in trained.models.items():
+            assert_close(predictions[name], np.asarray(model.predict(X), dtype=np.float64))
+
+
+def test_engine_subset_matches_full_engine(trained, X):
+    full = trained.tree_engine.predict(X)
+    subset = trained.tree_engine.subset(['xgboost']).predict(X)
+    assert list(subset) == ['xgboost']
+    np.testing.assert_array_equal(subset['xgboost'], full['xgboost'])
+
+
+def test_quantized_engine_within_tolerance(trained, X):
+    quantized = FusedTreeEnsemble.from_models(trained.models).compact(quantize_leaves=True)
+    for name, predictions in quantized.predict(X).items():
+        expected = np.asarray(trained.models[name].predict(X), dtype=np.float64)
+        assert np.abs(predictions - expected).max() <= 1e-2 * np.abs(expected).max()
+
+
+def test_engine_and_library_scoring_paths_agree(fresh_predictor, X):
+    rows = X[:fresh_predictor.fused_max_rows]
+    engine_scores = fresh_predictor.score_matrix(rows)
+    fresh_predictor.fused_max_rows = 0
+    library_scores = fresh_predictor.score_matrix(rows)
+    for name, outputs in library_scores.items():
+        for actual, expected in zip(engine_scores[name], outputs):
+            assert_close(actual, expected)
@@ -0,0 +1,59 @@
+"""Valuation grid lookups against live scoring of the same cars"""
+
+import numpy as np
+import pytest
+
+# Mean relative price error allowed between mileage knots (linear interpolation)
+MEAN_INTERPOLATION_ERROR = 0.05
+
+
+@pytest.fixture(scope='module')
+def grid_cars(trained, sample_data):
+    """Sample cars whose configuration, year and condition are on the grid"""
+    grid = trained.valuation_grid
+    cars = [car for car in sample_data.to_dict('records') if grid.lookup(dict(car, mileage=0)) is not None]
+    assert cars, "no sample car is on the grid"
+    return cars
+
+
+@pytest.fixture
+def live(fresh_predictor):
+    fresh_predictor.valuation_grid = None
+    return fresh_predictor
+
+
+def relative_errors(grid, live, cars):
+    errors = []
+    for car in cars:
+        looked_up, scored = grid.lookup(car), live.predict_price(car)
+        for name, result in scored.items():
+            errors.append(abs(looked_up[name]['predicted_price'] - result['predicted_price'])
+                          / max(result['predicted_price'], 1.0))
+    return np.array(errors)
+
+
+def test_knots_match_live_prices(trained, live, grid_cars):
+    grid = trained.valuation_grid
+    cars = [dict(car, mileage=grid.mileage_step * (i % grid.n_knots)) for i, car in enumerate(grid_cars)]
+    assert relative_errors(grid, live, cars).max() <= 1e-5
+    looked_up, scored = grid.lookup(cars[0]), live.predict_price(cars[0])
+    for name, result in scored.items():
+        for bound in ('lower', 'upper'):
+            assert looked_up[name]['confidence_interval'][bound] == pytest.approx(
+                result['confidence_interval'][bound], rel=1e-5)
+
+
+def test_interpolation_error_is_bounded(trained, live, grid_cars):
+    grid = trained.valuation_grid
+    rng = np.random.default_rng(0)
+    cars = [dict(car, mileage=float(rng.uniform(0, grid.max_mileage))) for car in grid_cars]
+    assert relative_errors(grid, live, cars).mean() <= MEAN_INTERPOLATION_ERROR
+    assert grid.stats['relative_error'] <= MEAN_INTERPOLATION_ERROR
+
+
+def test_off_grid_cars_miss(trained, grid_cars):
+    grid = trained.valuation_grid
+    car = grid_cars[0]
+    for change in ({'mileage': grid.max_mileage + 1}, {'year': 1900}, {'year': 2020.5}, {'year': float('inf')},
+                   {'make': 'Unknown Motors'}, {'condition': 'Unknown'}):
+        assert grid.lookup(dict(car, **change)) is None
@@ -0,0 +1,335 @@
+"""
+Process-pool task graph for training the model families
+
+Training three families with 5-fold cross-validation is 18 independent
+fits (plus one hyperparameter search per family when optimizing, which
+the family's fit and fold fits wait for). TrainingGraph schedules all of
+them as one task graph over a pool of worker processes, so a retrain uses
+every core instead of one thread per family:
+
+    search:<family>  ->  fit:<family>          fit on the training set, test metrics
+                     ->  fold:<family>:<i>     fit on fold i's training rows, R² on fold i
+
+The training matrices reach workers as memory-mapped .npy files: arrays
+that are already memory-mapped (feature store entries) are reopened from
+their own file, others are written once to a temporary directory. Workers
+keep what they opened for later tasks, so only estimators, fold numbers
+and results are pickled between processes.
+
+Every task reports its wall time, time spent queued and worker pid. Pools
+use the spawn start method, like training_jobs. With one worker, or less
+than PROCESS_POOL_MIN_ROWS training rows, tasks run in order in the
+calling process.
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+from hyperparameter_search import THREADED_FAMILIES, FoldCache, SuccessiveHalvingSearch, kfold_ids
+from model_registry import ensemble_weights
+
+# Below this many training rows, starting worker processes costs more than it saves
+PROCESS_POOL_MIN_ROWS = 10000
+
+
+def training_workers():
+    """Worker processes for training: $TRAINING_WORKERS, or one per core"""
+    return int(os.environ.get('TRAINING_WORKERS') or os.cpu_count() or 1)
+
+
+class SharedArray:
+    """Picklable handle to a read-only array in a .npy file, opened with np.memmap"""
+
+    def __init__(self, path, dtype, shape, offset, order):
+        self.path = path
+        self.dtype = dtype
+        self.shape = shape
+        self.offset = offset
+        self.order = order
+
+    @classmethod
+    def share(cls, array, directory, name):
+        """Handle for array, writing it under directory unless it is already memory-mapped"""
+        if not cls._whole_file(array):
+            path = os.path.join(directory, f'{name}.npy')
+            np.save(path, np.ascontiguousarray(array))
+            array = np.load(path, mmap_mode='r')
+        order = 'C' if array.flags.c_contiguous else 'F'
+        return cls(array.filename, array.dtype.str, array.shape, array.offset, order)
+
+    @staticmethod
+    def _whole_file(array):
+        """Whether array maps an entire .npy file (a slice of one keeps the file's offset)"""
+        if not isinstance(array, np.memmap) or not array.filename:
+            return False
+        try:
+            whole = np.load(array.filename, mmap_mode='r')
+        except (OSError, ValueError):
+            return False
+        return (whole.shape == array.shape and whole.dtype == array.dtype and whole.offset == array.offset
+                and whole.flags.c_contiguous == array.flags.c_contiguous)
+
+    def open(self):
+        return np.memmap(self.path, dtype=self.dtype, mode='r', offset=self.offset,
+                         shape=self.shape, order=self.order)
+
+
+class TaskGraph:
+    """Named tasks with dependencies, run across a process pool
+
+    A task is a picklable function and arguments; the results of its
+    dependencies are appended to its arguments in the order listed.
+    """
+
+    def __init__(self):
+        self.tasks = {}
+        self.timings = {}
+
+    def add(self, name, func, *args, deps=()):
+        for dep in deps:
+            if dep not in self.tasks:
+                raise ValueError(f'Task {name} depends on unknown task {dep}')
+        self.tasks[name] = (func, args, tuple(deps))
+
+    def run(self, max_workers=1):
+        """Run every task and return {name: result}; timings are left in self.timings"""
+        self.timings = {}
+        if max_workers <= 1:
+            results = {}
+            for name, (func, args, deps) in self.tasks.items():
+                submitted = time.time()
+                results[name], timing = _run_task(func, args + tuple(results[dep] for dep in deps))
+                self._record(name, submitted, timing)
+            return results
+
+        results, pending = {}, {}
+        waiting = dict(self.tasks)
+        executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+        try:
+            while waiting or pending:
+                for name, (func, args, deps) in list(waiting.items()):
+                    if all(dep in results for dep in deps):
+                        del waiting[name]
+                        future = executor.submit(_run_task, func, args + tuple(results[dep] for dep in deps))
+                        pending[future] = (name, time.time())
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, submitted = pending.pop(future)
+                    results[name], timing = future.result()
+                    self._record(name, submitted, timing)
+        finally:
+            executor.shutdown(cancel_futures=True)
+        return results
+
+    def _record(self, name, submitted, timing):
+        self.timings[name] = {
+            'started': timing['started'],
+            'seconds': round(timing['seconds'], 3),
+            'queued_seconds': round(max(0.0, timing['started'] - submitted), 3),
+            'worker': timing['worker']
+        }
+
+
+def _run_task(func, args):
+    started = time.time()
+    start = time.perf_counter()
+    result = func(*args)
+    return result, {'started': started, 'seconds': time.perf_counter() - start, 'worker': os.getpid()}
+
+
+# Arrays and folds opened by this process, by TrainingData token
+_opened = {}
+
+
+class TrainingData:
+    """Shared handles to one training run's arrays, opened once per process"""
+
+    def __init__(self, X_train, y_train, X_test, y_test, fold_ids, n_splits):
+        self.token = uuid.uuid4().hex
+        self.arrays = {'X_train': X_train, 'y_train': y_train, 'X_test': X_test,
+                       'y_test': y_test, 'fold_ids': fold_ids}
+        self.n_splits = n_splits
+
+    def open(self):
+        """({name: array}, FoldCache) in this process"""
+        if self.token not in _opened:
+            _opened.clear()
+            arrays = {name: shared.open() for name, shared in self.arrays.items()}
+            folds = FoldCache(arrays['X_train'], arrays['y_train'], self.n_splits, fold_ids=arrays['fold_ids'])
+            _opened[self.token] = (arrays, folds)
+        return _opened[self.token]
+
+
+def _float64(y):
+    # np.asarray would turn a memory-mapped target into a plain array
+    return y if isinstance(y, np.ndarray) and y.dtype == np.float64 else np.asarray(y, dtype=np.float64)
+
+
+def _with_threads(estimator, threads):
+    if 'n_jobs' in estimator.get_params():
+        estimator = clone(estimator).set_params(n_jobs=threads)
+    return estimator
+
+
+def _final_estimator(estimator, search):
+    """The family's estimator with the search winner's parameters applied"""
+    if search is None:
+        return clone(estimator)
+    model = clone(estimator).set_params(**search['best_params'])
+    if search['best_n_estimators'] is not None:
+        model.set_params(n_estimators=search['best_n_estimators'])
+    return model
+
+
+def search_task(data, estimator, space, options, threads):
+    """Successive-halving search of one family; returns the winner and its summary"""
+    _, folds = data.open()
+    search = SuccessiveHalvingSearch(_with_threads(estimator, threads), space, folds, **options).run()
+    full_folds = search.best_n_estimators_ is None and search.best_rows_ == folds.train_rows
+    return {
+        'best_params': search.best_params_,
+        'best_n_estimators': search.best_n_estimators_,
+        # The winner was already cross-validated on the full folds
+        'cv_scores': search.best_scores_.tolist() if full_folds else None,
+        'summary': search.summary()
+    }
+
+
+def fit_task(data, estimator, threads, search=None):
+    """Fit one family on the training set; returns the model and its test-set metrics"""
+    arrays, _ = data.open()
+    model = _with_threads(_final_estimator(estimator, search), threads)
+    model.fit(arrays['X_train'], arrays['y_train'])
+    y_test = arrays['y_test']
+    y_pred = model.predict(arrays['X_test'])
+
+    # Serving scores a few rows at a time; don't keep the training thread count
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=None)
+    return model, {
+        'rmse': np.sqrt(mean_squared_error(y_test, y_pred)),
+        'r2': r2_score(y_test, y_pred),
+        'mae': mean_absolute_error(y_test, y_pred)
+    }
+
+
+def fold_task(data, estimator, fold, threads, search=None):
+    """R² of one family on one cross-validation fold"""
+    if search is not None and search['cv_scores'] is not None:
+        return search['cv_scores'][fold]
+    _, folds = data.open()
+    X_train, y_train, X_val, y_val = folds.fold(fold)
+    model = _with_threads(_final_estimator(estimator, search), threads)
+    model.fit(X_train, y_train)
+    return r2_score(y_val, model.predict(X_val))
+
+
+class TrainingGraph:
+    """Fits, CV folds and optional searches of several model families as one TaskGraph
+
+    add_family() registers a family; run() returns ({name: fitted model},
+    {name: metrics}, {name: search summary}). Metrics hold test-set rmse,
+    r2 and mae, the mean and std of the fold R² scores, train_seconds,
+    the wall-clock time from the start of the family's first task to the
+    end of its last, and ensemble_weight, the
+    family's share of a blended price (model_registry.ensemble_weights).
+    """
+
+    def __init__(self, X_train, y_train, X_test, y_test, fold_ids=None, n_splits=5, max_workers=None):
+        self.arrays = {'X_train': X_train, 'y_train': _float64(y_train), 'X_test': X_test, 'y_test': _float64(y_test),
+                       'fold_ids': fold_ids if fold_ids is not None else kfold_ids(len(X_train), n_splits)}
+        self.n_splits = n_splits
+        self.max_workers = max_workers or training_workers()
+        if len(X_train) < PROCESS_POOL_MIN_ROWS:
+            self.max_workers = 1
+        self.families = {}
+        self.graph = TaskGraph()
+        self.wall_seconds = None
+
+    def add_family(self, name, estimator, search_estimator=None, space=None, **search_options):
+        """Register a family; with space, a search over it runs first
+
+        search_estimator, if given, is searched instead of estimator (e.g.
+        with early stopping); search_options go to SuccessiveHalvingSearch.
+        """
+        self.families[name] = (estimator, search_estimator, space, search_options)
+
+    def run(self):
+        start = time.perf_counter()
+        workdir = tempfile.mkdtemp(prefix='training-')
+        try:
+            shared = {name: SharedArray.share(array, workdir, name) for name, array in self.arrays.items()}
+            data = TrainingData(n_splits=self.n_splits, **shared)
+            self._build(data)
+            results = self.graph.run(self.max_workers)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+            _opened.clear()
+        self.wall_seconds = time.perf_counter() - start
+
+        models, metrics, searches = {}, {}, {}
+        for name in self.families:
+            models[name], metrics[name] = results[f'fit:{name}']
+            scores = np.array([results[f'fold:{name}:{i}'] for i in range(self.n_splits)])
+            # Wall-clock span of the family's tasks, which may have run in parallel
+            timings = [timing for task, timing in self.graph.timings.items() if task.split(':')[1] == name]
+            metrics[name].update({
+                'cv_score': scores.mean(),
+                'cv_std': scores.std(),
+                'train_seconds': max(timing['started'] + timing['seconds'] for timing in timings)
+                                 - min(timing['started'] for timing in timings)
+            })
+            if f'search:{name}' in results:
+                searches[name] = results[f'search:{name}']
+        for name, weight in ensemble_weights(metrics).items():
+            metrics[name]['ensemble_weight'] = weight
+        return models, metrics, searches
+
+    def _build(self, data):
+        n_cores = os.cpu_count() or 1
+        n_tasks = len(self.families) * (self.n_splits + 1)
+        # Threaded estimators split whatever cores the pool leaves over
+        spare_threads = max(1, n_cores // min(n_tasks, self.max_workers))
+
+        # Full fits first: they are the longest tasks
+        for stage in ('search', 'fit', 'fold'):
+            for name, (estimator, search_estimator, space, options) in self.families.items():
+                threads = spare_threads if name in THREADED_FAMILIES else 1
+                deps = (f'search:{name}',) if space is not None else ()
+                if stage == 'search' and space is not None:
+                    searched = search_estimator if search_estimator is not None else estimator
+                    options = dict(options, early_stopping=search_estimator is not None)
+                    self.graph.add(f'search:{name}', search_task, data, searched, space, options, threads)
+                elif stage == 'fit':
+                    self.graph.add(f'fit:{name}', fit_task, data, estimator, threads, deps=deps)
+                elif stage == 'fold':
+                    for i in range(self.n_splits):
+                        self.graph.add(f'fold:{name}:{i}', fold_task, data, estimator, i, threads, deps=deps)
+
+    def report(self):
+        """JSON-serializable task timings, for training metadata"""
+        busy = sum(timing['seconds'] for timing in self.graph.timings.values())
+        return {
+            'workers': self.max_workers,
+            'wall_seconds': round(self.wall_seconds, 3),
+            'task_seconds': round(busy, 3),
+            'tasks': self.graph.timings
+        }
+
+    def print_report(self):
+        print(f"{len(self.graph.timings)} training tasks on {self.max_workers} worker(s): "
+              f"{self.wall_seconds:.1f}s wall, "
+              f"{sum(timing['seconds'] for timing in self.graph.timings.values()):.1f}s of task time")
+        for name, timing in self.graph.timings.items():
+            print(f"  {name:<28} {timing['seconds']:>8.2f}s  queued {timing['queued_seconds']:>6.2f}s  "
+                  f"pid {timing['worker']}")
@@ -0,0 +1,137 @@
+import multiprocessing
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from model_registry import ModelRegistry
+
+
+def run_training(registry_root, base_version):
+    """Train a fresh predictor in a worker process and return its state
+
+    Holds the registry's training lock, so the serving processes that each
+    start a job on a cold start train once between them: a job that gets
+    the lock after another process has published a version since
+    base_version returns that version's state instead of training again.
+    """
+    registry = ModelRegistry(registry_root)
+    with registry.training_lock():
+        current = registry.current_version()
+        if current is not None and current != base_version:
+            return registry.load(current, mmap_mode=None)
+
+        from price_predictor import CarPricePredictor
+
+        predictor = CarPricePredictor()
+        predictor.registry = registry
+        predictor.train_models()
+        return predictor.export_state()
+
+
+class TrainingJobManager:
+    """Runs model training in a background process pool
+
+    Jobs are identified by an id returned from submit(). Only one job runs at
+    a time; submitting while a job is queued or running returns that job
+    instead of piling up another retrain. When a job succeeds its trained
+    state is handed to on_success, which is expected to swap it in
+    atomically. Jobs publish into registry; run_training makes the jobs
+    that several serving processes start at once share one retrain.
+    """
+
+    MAX_FINISHED_JOBS = 50
+
+    def __init__(self, on_success, registry=None, train_func=run_training):
+        self.on_success = on_success
+        self.registry = registry or ModelRegistry.from_env()
+        self.train_func = train_func
+        self._jobs = OrderedDict()
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._active_job_id = None
+
+    def submit(self):
+        """Start a training job (or return the active one) and return its id"""
+        with self._lock:
+            active = self._jobs.get(self._active_job_id)
+            if active is not None and active['status'] in ('queued', 'running'):
+                return active['job_id']
+
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'status': 'queued',
+                'submitted_at': datetime.now().isoformat(),
+                'finished_at': None,
+                'error': None,
+                'performance': None
+            }
+            self._active_job_id = job_id
+            self._trim_finished_jobs()
+
+            future = self._get_executor().submit(
+                self.train_func, self.registry.root, self.registry.current_version())
+            self._futures[job_id] = future
+
+        future.add_done_callback(lambda f: self._finish(job_id, f))
+        return job_id
+
+    def status(self, job_id):
+        """Return a copy of a job's status dict, or None if unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            future = self._futures.get(job_id)
+            if job['status'] == 'queued' and future is not None and future.running():
+                job['status'] = 'running'
+            return dict(job)
+
+    def shutdown(self, wait=True):
+        """Stop the worker pool"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _get_executor(self):
+        """Create the process pool on first use"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def _finish(self, job_id, future):
+        """Record a finished job and install its models on success"""
+        error = None
+        try:
+            state = future.result()
+            self.on_success(state)
+        except BrokenProcessPool as e:
+            error = f'Training process died: {e}'
+            with self._lock:
+                self._executor = None
+        except Exception as e:
+            error = str(e)
+
+        with self._lock:
+            job = self._jobs[job_id]
+            job['finished_at'] = datetime.now().isoformat()
+            if error is None:
+                job['status'] = 'succeeded'
+                job['performance'] = state.get('performance_metrics')
+            else:
+                job['status'] = 'failed'
+                job['error'] = error
+            self._futures.pop(job_id, None)
+
+    def _trim_finished_jobs(self):
+        """Forget the oldest finished jobs beyond MAX_FINISHED_JOBS"""
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job['status'] in ('succeeded', 'failed')]
+        for job_id in finished[:max(0, len(finished) - self.MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
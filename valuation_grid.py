@@ -0,0 +1,175 @@
+"""
+Precomputed valuations for common car configurations
+
+A configuration is everything about a listing except its year, condition
+and mileage: make, model, fuel type, transmission, body type, engine size
+and number of previous owners. The grid holds every model's prediction and
+interval for the most common configurations in the training data, for
+every training year and condition, at mileage knots MILEAGE_STEP apart.
+Single-car predictions on the grid are answered by a dict lookup and a
+linear interpolation between the two nearest mileage knots, without
+running any model; anything off the grid falls back to live inference.
+
+The grid is built by the trainers from the serving scorer
+(CarPricePredictor.score_matrix) and published as part of each model
+version, so promoting a version always brings its own grid. Its one float32
+array is memory-mapped when the version is loaded.
+"""
+
+import math
+import time
+
+import numpy as np
+
+from feature_encoder import FEATURE_NAMES
+
+CONFIGURATION_FEATURES = ('make', 'model', 'fuel_type', 'transmission', 'body_type',
+                          'engine_size', 'previous_owners')
+MAX_CONFIGURATIONS = 500
+MILEAGE_STEP = 10000
+BUILD_CHUNK_ROWS = 8192
+CHECK_SAMPLES = 1000
+
+
+def _column(feature):
+    name = feature if feature in FEATURE_NAMES else f'{feature}_encoded'
+    return FEATURE_NAMES.index(name)
+
+
+def configuration_key(make, model, fuel_type, transmission, body_type, engine_size, previous_owners):
+    """Hashable key of one configuration; raises ValueError for non-numeric values"""
+    owners = float(previous_owners)
+    if owners != int(owners):
+        raise ValueError('previous_owners must be a whole number')
+    return (str(make), str(model), str(fuel_type), str(transmission), str(body_type),
+            round(float(engine_size), 4), int(owners))
+
+
+class ValuationGrid:
+    """Predictions indexed by (configuration, year, condition, mileage knot)
+
+    values has shape (cells, models, 3) with price, lower and upper bound,
+    cells ordered configuration-major and mileage knot fastest, so the two
+    knots around a mileage are adjacent rows.
+    """
+
+    def __init__(self, configurations, years, conditions, mileage_step, n_knots, model_names,
+                 confidence, values, stats=None):
+        self.index = {key: i for i, key in enumerate(configurations)}
+        self.first_year = int(years[0])
+        self.n_years = len(years)
+        self.condition_index = {condition: i for i, condition in enumerate(conditions)}
+        self.mileage_step = mileage_step
+        self.n_knots = n_knots
+        self.max_mileage = mileage_step * (n_knots - 1)
+        self.model_names = list(model_names)
+        self.confidence = [float(confidence[name]) for name in self.model_names]
+        self.values = values
+        self.stats = stats or {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def build(cls, predictor, X_train, max_configurations=MAX_CONFIGURATIONS, mileage_step=MILEAGE_STEP):
+        """Score the grid for the most common configurations in an encoded training matrix"""
+        start = time.perf_counter()
+        encoder = predictor.get_feature_encoder()
+        X_train = np.asarray(X_train)
+
+        config_columns = [_column(feature) for feature in CONFIGURATION_FEATURES]
+        configurations, counts = np.unique(X_train[:, config_columns], axis=0, return_counts=True)
+        configurations = configurations[np.argsort(-counts, kind='stable')[:max_configurations]]
+
+        ages = X_train[:, _column('age')]
+        years = np.arange(int(encoder.current_year - ages.max()), int(encoder.current_year - ages.min()) + 1)
+        conditions = encoder.classes['condition']
+        n_knots = int(np.ceil(X_train[:, _column('mileage')].max() / mileage_step)) + 1
+        shape = (len(configurations), len(years), len(conditions), n_knots)
+
+        # Every grid cell as a feature row, in values order
+        cells = [index.ravel() for index in np.indices(shape)]
+        X = np.empty((len(cells[0]), len(FEATURE_NAMES)), dtype=np.float32)
+        X[:, config_columns] = configurations[cells[0]]
+        X[:, _column('age')] = encoder.current_year - years[cells[1]]
+        X[:, _column('condition')] = cells[2]
+        X[:, _column('mileage')] = cells[3] * mileage_step
+
+        model_names = list(predictor.models)
+        values = np.empty((len(X), len(model_names), 3), dtype=np.float32)
+        for offset in range(0, len(X), BUILD_CHUNK_ROWS):
+            scores = predictor.score_matrix(X[offset:offset + BUILD_CHUNK_ROWS])
+            for m, name in enumerate(model_names):
+                values[offset:offset + BUILD_CHUNK_ROWS, m] = np.column_stack(scores[name])
+
+        keys = []
+        for row in configurations:
+            decoded = {}
+            for feature, value in zip(CONFIGURATION_FEATURES, row):
+                if feature in encoder.classes:
+                    decoded[feature] = encoder.classes[feature][int(value)]
+                else:
+                    decoded[feature] = float(value)
+            keys.append(configuration_key(**decoded))
+
+        confidence = {name: predictor.performance_metrics[name]['r2'] for name in model_names}
+        grid = cls(keys, years, conditions.tolist(), mileage_step, n_knots, model_names, confidence, values)
+        grid.stats = {
+            'configurations': len(keys),
+            'cells': int(len(X)),
+            'build_seconds': time.perf_counter() - start,
+            'relative_error': grid._check(predictor, X, np.random.default_rng(0))
+        }
+        return grid
+
+    def _check(self, predictor, X, rng):
+        """Mean absolute price error of interpolation against live scoring at random mileages,
+        relative to the mean live price"""
+        rows = rng.integers(0, len(X), CHECK_SAMPLES)
+        rows = rows[rows % self.n_knots < self.n_knots - 1]
+        X_check = X[rows].copy()
+        X_check[:, _column('mileage')] += rng.random(len(rows)).astype(np.float32) * self.mileage_step
+
+        weight = (X_check[:, _column('mileage')] / self.mileage_step - rows % self.n_knots)[:, None]
+        interpolated = self.values[rows, :, 0] * (1 - weight) + self.values[rows + 1, :, 0] * weight
+        live = np.column_stack([predictor.score_matrix(X_check)[name][0] for name in self.model_names])
+        return float(np.abs(interpolated - live).sum() / max(live.sum(), 1.0)) if len(rows) else 0.0
+
+    def lookup(self, car):
+        """Predictions for a raw car dict, in predict_price's format, or None when off the grid"""
+        try:
+            key = configuration_key(car['make'], car['model'], car['fuel_type'], car['transmission'],
+                                    car['body_type'], car['engine_size'], car['previous_owners'])
+            year = float(car['year'])
+            mileage = float(car['mileage'])
+            if not (math.isfinite(year) and math.isfinite(mileage)) or year != int(year):
+                raise ValueError('year and mileage must be finite, and year a whole number')
+            year_index = int(year) - self.first_year
+        except (KeyError, TypeError, ValueError, OverflowError):
+            key, year_index, mileage = None, -1, -1.0
+
+        config = self.index.get(key)
+        condition = self.condition_index.get(str(car.get('condition')))
+        if (config is None or condition is None or not 0 <= year_index < self.n_years
+                or not 0 <= mileage <= self.max_mileage):
+            self.misses += 1
+            return None
+
+        position = mileage / self.mileage_step
+        knot = min(int(position), self.n_knots - 2)
+        weight = position - knot
+        row = ((config * self.n_years + year_index) * len(self.condition_index) + condition) * self.n_knots + knot
+        low, high = self.values[row:row + 2].tolist()
+
+        self.hits += 1
+        predictions = {}
+        for name, confidence, (price0, lower0, upper0), (price1, lower1, upper1) in zip(
+                self.model_names, self.confidence, low, high):
+            predictions[name] = {
+                'predicted_price': price0 + (price1 - price0) * weight,
+                'confidence_interval': {
+                    'lower': lower0 + (lower1 - lower0) * weight,
+                    'upper': upper0 + (upper1 - upper0) * weight
+                },
+                'confidence': confidence
+            }
+        return predictions